@@ -1,6 +1,32 @@
 # flake8: noqa
 __version__ = "1.1.0"
 
-from assumptions.cli import cli
-from assumptions.log import Log
-from assumptions.log_items import LogItem
+import sys
+
+# Public names are imported when first used, so that the command line tool starts quickly
+_LAZY_IMPORTS = {
+    "cli": "assumptions.cli",
+    "Log": "assumptions.log",
+    "LogItem": "assumptions.log_items",
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    value = getattr(importlib.import_module(_LAZY_IMPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_LAZY_IMPORTS])
+
+
+if sys.version_info < (3, 7):
+    # Module __getattr__ isn't supported
+    from assumptions.cli import cli
+    from assumptions.log import Log
+    from assumptions.log_items import LogItem
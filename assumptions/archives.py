@@ -0,0 +1,79 @@
+import tarfile
+import zipfile
+
+# File name endings of the archives that can be searched, including wheels and sdists
+ARCHIVE_EXTENSIONS = (
+    ".zip",
+    ".whl",
+    ".tar",
+    ".tar.gz",
+    ".tgz",
+    ".tar.bz2",
+    ".tbz2",
+    ".tar.xz",
+    ".txz",
+)
+
+# Separates the path of an archive from the path of a file within it, e.g. 'dist/a.whl!a/b.py'
+MEMBER_SEPARATOR = "!"
+
+# Errors raised for archives that are corrupt or use an unsupported compression
+ARCHIVE_ERRORS = (
+    OSError,
+    EOFError,
+    tarfile.TarError,
+    zipfile.BadZipFile,
+    NotImplementedError,
+)
+
+
+def is_archive(path):
+    """Return whether a file is a zip or tar archive that can be searched, by its name."""
+    return path.name.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def archive_members(path, extension: str = "", max_file_size: int = None):
+    """
+    Yield the files in a zip or tar archive, decompressing one file at a time without
+    extracting the archive. Compressed tar archives are read as a stream, in a single pass.
+
+    Parameters
+    ----------
+    path
+        path to the archive.
+    extension
+        file extension to reduce the files to specific file types (e.g. '.py').
+    max_file_size
+        optional size in bytes above which files aren't read.
+
+    Yields
+    ------
+    tuple
+        the path of each file within the archive and its contents, which are None for files
+        larger than ``max_file_size``.
+
+    Raises
+    ------
+    OSError, EOFError, tarfile.TarError, zipfile.BadZipFile or NotImplementedError
+        if the archive is corrupt or its compression isn't supported.
+    """
+    if path.name.lower().endswith((".zip", ".whl")):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not info.filename.endswith(extension):
+                    continue
+                if max_file_size is not None and info.file_size > max_file_size:
+                    yield info.filename, None
+                    continue
+                with archive.open(info) as f:
+                    yield info.filename, f.read()
+        return
+
+    with tarfile.open(path, "r|*") as archive:
+        for info in archive:
+            if not info.isfile() or not info.name.endswith(extension):
+                continue
+            if max_file_size is not None and info.size > max_file_size:
+                yield info.name, None
+                continue
+            yield info.name, archive.extractfile(info).read()
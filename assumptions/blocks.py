@@ -0,0 +1,190 @@
+import re
+import sys
+
+
+def iter_lines(text: str, start: int = 0):
+    """Yield lines of text from an offset, each with its trailing newline if it has one."""
+    while start < len(text):
+        end = text.find("\n", start) + 1
+        if end == 0:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end
+
+
+def _read_body(body: list, line: str, lines, continuation_prefix: str):
+    """
+    Read body lines until the first line that doesn't continue the body. Returns None if the
+    text ends within the body, without a final newline.
+    """
+    while line.startswith(continuation_prefix):
+        if not line.endswith("\n"):
+            return None
+        body.append(line)
+        line = next(lines, "")
+    return "".join(body)
+
+
+class CommentBlock:
+    """
+    Matches a block of comment lines in a single forward pass, as a linear time alternative to
+    a backtracking regex search pattern.
+
+    A block starts with a header line, which gives its indentation and title. The header is
+    followed by a fixed number of field lines and then the body. Field and body lines must
+    start with the header's indentation. The body ends before the first line that doesn't
+    start with the indentation and ``continuation_prefix``, so only the lines of the current
+    block are ever held in memory. Each line is read once, so matching time is linear in the
+    length of the text.
+
+    Matches are the same as ``re.findall`` with the pattern::
+
+        ^([ \\t]*)HEADER\\n(?:^\\1FIELD\\n)*(\\1BODY_PREFIX(?:.|\\n)*?)^(?!\\1CONTINUATION_PREFIX)
+
+    and the ``re.MULTILINE`` and ``re.IGNORECASE`` flags, where the body group is optional if
+    the body isn't required. Matches are tuples of the indentation, title, each field and the
+    body, which is empty if there isn't one.
+
+    Parameters
+    ----------
+    header
+        regex for the header line after the indentation, capturing the title (e.g.
+        ``"# ?Caveat: ?(.+)"``).
+    fields
+        regexes for the field lines after the indentation, each capturing the field's value.
+    body_prefix
+        text that the first body line starts with, after the indentation.
+    continuation_prefix
+        text that following body lines start with, after the indentation.
+    body_required
+        whether a block must have a body.
+    inline_body
+        whether a body can start within the header line, at the last ``body_prefix`` in the
+        title, when the next line doesn't start a body. This matches patterns where the newline
+        after the header is optional (``HEADER\\n?``) and the body is required. Blocks with
+        inline bodies can't have fields.
+
+    Methods
+    -------
+    match(lines)
+        match a block at the start of some lines.
+    header_starts(text)
+        return the offsets of possible header lines in text.
+    unterminated_run(text, indent)
+        return the offset of the body lines that run to the end of text without a final
+        newline.
+    """
+
+    def __init__(
+        self,
+        header: str,
+        fields: list = (),
+        body_prefix: str = "#",
+        continuation_prefix: str = "#",
+        body_required: bool = True,
+        inline_body: bool = False,
+    ):
+        if not body_prefix.startswith(continuation_prefix):
+            raise ValueError("The body prefix must start with the continuation prefix.")
+        if inline_body and fields:
+            raise ValueError("Blocks with inline bodies can't have fields.")
+
+        self.header = re.compile(r"([ \t]*)" + header, re.IGNORECASE)
+        self.fields = [re.compile(field, re.IGNORECASE) for field in fields]
+        self.body_prefix = body_prefix
+        self.continuation_prefix = continuation_prefix
+        self.body_required = body_required
+        self.inline_body = inline_body
+        self._header_search = re.compile(
+            r"^[ \t]*" + header + "$",
+            re.IGNORECASE | re.MULTILINE,
+        )
+
+    def header_starts(self, text: str):
+        """Return the offsets of all lines in text that could be header lines."""
+        return [match.start() for match in self._header_search.finditer(text)]
+
+    def unterminated_run(self, text: str, indent: str):
+        """
+        Return the offset of the first line in the run of lines at the end of text that all
+        continue a body with the given indentation, where the text doesn't end with a newline.
+        A block with this indentation can't match if the line after its header is within the
+        run, as its fields or body would end without a newline. Returns the length of the text
+        if the last line doesn't continue a body or ends with a newline.
+        """
+        if text.endswith("\n"):
+            return len(text)
+        prefix = indent + self.continuation_prefix
+        run_start = len(text)
+        while run_start:
+            line_start = text.rfind("\n", 0, run_start - 1) + 1
+            if not text.startswith(prefix, line_start):
+                break
+            run_start = line_start
+        return run_start
+
+    def match(self, lines):
+        """
+        Match a block that starts at the first line.
+
+        Parameters
+        ----------
+        lines
+            iterable of lines, each with its trailing newline, such as an open file. Lines are
+            only read up to the line after the block.
+
+        Returns
+        -------
+        tuple or None
+            the matched item and the length of the match, which ends at the start of the line
+            after the block. None if there's no match.
+        """
+        lines = iter(lines)
+        # Every line in a block, including the last, must end with a newline
+        header = next(lines, "")
+        if not header.endswith("\n"):
+            return None
+        header_match = self.header.fullmatch(header, 0, len(header) - 1)
+        if header_match is None:
+            return None
+        indent, title = header_match.group(1, 2)
+        # Indentation and field values are repeated across many items, so are shared
+        indent = sys.intern(indent)
+        length = len(header)
+
+        values = []
+        for field in self.fields:
+            line = next(lines, "")
+            if not (line.endswith("\n") and line.startswith(indent)):
+                return None
+            field_match = field.fullmatch(line, len(indent), len(line) - 1)
+            if field_match is None:
+                return None
+            values.append(sys.intern(field_match.group(1)))
+            length += len(line)
+
+        body_prefix = indent + self.body_prefix
+        continuation_prefix = indent + self.continuation_prefix
+        # An empty line marks the end of the text, after the final newline
+        line = next(lines, "")
+        if line.startswith(body_prefix):
+            body = _read_body([], line, lines, continuation_prefix)
+            if body is None:
+                return None
+            return (indent, title, *values, body), length + len(body)
+
+        if not self.body_required:
+            if line.startswith(continuation_prefix):
+                return None
+            return (indent, title, *values, ""), length
+
+        if self.inline_body:
+            body_start = title.rfind(body_prefix, 1)
+            if body_start != -1:
+                inline = title[body_start:] + "\n"
+                body = _read_body([inline], line, lines, continuation_prefix)
+                if body is not None:
+                    length += len(body) - len(inline)
+                    return (indent, title[:body_start], body), length
+        return None
@@ -0,0 +1,156 @@
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+
+class MatchTimeout(Exception):
+    """Raised when matching log items in a file, or a search pattern in a file, takes too long."""
+
+    pass
+
+
+class MatchBudget:
+    """
+    Limits on the time spent matching log items in each file, and on matching each search
+    pattern in a file, so that a search pattern that backtracks catastrophically on some text
+    is stopped rather than hanging the search.
+
+    Matching is interrupted by a ``SIGALRM`` timer when it runs out of time, which is only
+    possible in the main thread of a process on Unix. Elsewhere, matching can't be
+    interrupted, so the time taken is checked once matching has finished.
+
+    Parameters
+    ----------
+    file_seconds
+        optional time limit in seconds for matching all log items in a file.
+    pattern_seconds
+        optional time limit in seconds for matching each search pattern in a file.
+
+    Methods
+    -------
+    file()
+        context manager limiting the time spent matching a file.
+    pattern(name)
+        context manager limiting the time spent matching a search pattern.
+
+    Raises
+    ------
+    ValueError
+        if a time limit isn't positive.
+    """
+
+    def __init__(self, file_seconds: float = None, pattern_seconds: float = None):
+        for seconds in (file_seconds, pattern_seconds):
+            if seconds is not None and seconds <= 0:
+                raise ValueError(f"Time limits must be positive, not {seconds}.")
+        self.file_seconds = file_seconds
+        self.pattern_seconds = pattern_seconds
+        self._file_deadline = None
+        self._pattern_deadline = None
+        self._pattern_name = None
+        self._interrupts = False
+
+    def _file_exceeded(self):
+        return f"matching took longer than {self.file_seconds}s"
+
+    def _pattern_exceeded(self):
+        return f"{self._pattern_name} took longer than {self.pattern_seconds}s"
+
+    def _set_timer(self):
+        deadlines = [
+            deadline
+            for deadline in (self._file_deadline, self._pattern_deadline)
+            if deadline is not None
+        ]
+        if not deadlines:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            return
+        # A delay of zero would stop the timer, rather than raising straight away
+        signal.setitimer(
+            signal.ITIMER_REAL,
+            max(min(deadlines) - time.perf_counter(), 1e-6),
+        )
+
+    def _on_alarm(self, signum, frame):
+        if self._pattern_deadline is None or (
+            self._file_deadline is not None
+            and self._file_deadline < self._pattern_deadline
+        ):
+            raise MatchTimeout(self._file_exceeded())
+        raise MatchTimeout(self._pattern_exceeded())
+
+    @contextmanager
+    def file(self):
+        """
+        Limit the time spent in the context, which matches the log items in a file.
+
+        Raises
+        ------
+        MatchTimeout
+            if the file, or a search pattern in it, runs out of time.
+        """
+        if self.file_seconds is None and self.pattern_seconds is None:
+            yield
+            return
+
+        start = time.perf_counter()
+        if self.file_seconds is not None:
+            self._file_deadline = start + self.file_seconds
+        self._interrupts = (
+            hasattr(signal, "setitimer")
+            and threading.current_thread() is threading.main_thread()
+        )
+        if self._interrupts:
+            previous_handler = signal.signal(signal.SIGALRM, self._on_alarm)
+            self._set_timer()
+        try:
+            yield
+        finally:
+            # The timer fires once, so the handler is restored even if it fires here
+            try:
+                if self._interrupts:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+            finally:
+                if self._interrupts:
+                    signal.signal(signal.SIGALRM, previous_handler)
+                self._interrupts = False
+                self._file_deadline = None
+        if (
+            self.file_seconds is not None
+            and time.perf_counter() - start > self.file_seconds
+        ):
+            raise MatchTimeout(self._file_exceeded())
+
+    @contextmanager
+    def pattern(self, name: str):
+        """
+        Limit the time spent in the context, which matches a search pattern in a file.
+
+        Parameters
+        ----------
+        name
+            description of the search pattern for error messages, e.g. 'Todo pattern 1'.
+
+        Raises
+        ------
+        MatchTimeout
+            if the search pattern runs out of time.
+        """
+        if self.pattern_seconds is None:
+            yield
+            return
+
+        start = time.perf_counter()
+        self._pattern_name = name
+        self._pattern_deadline = start + self.pattern_seconds
+        if self._interrupts:
+            self._set_timer()
+        try:
+            yield
+        finally:
+            self._pattern_deadline = None
+        if self._interrupts:
+            self._set_timer()
+        if time.perf_counter() - start > self.pattern_seconds:
+            raise MatchTimeout(self._pattern_exceeded())
@@ -0,0 +1,273 @@
+import functools
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from assumptions import __version__
+
+# Files modified this recently may change again without their mtime changing
+_RACY_SECONDS = 2
+
+
+def content_digest(data: bytes):
+    """Return a short hex digest of file contents."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def item_type_key(log_item):
+    """
+    Return a key identifying a :class:`LogItem` type, how it matches items and its search
+    patterns, so that cached matches are not reused after any of them change. Search patterns
+    are read from the instance, so that patterns defined by properties are included.
+    """
+    if log_item._comment_blocks is not None:
+        matching = ("comment_blocks", tuple(log_item._comment_blocks))
+    else:
+        matching = ("regex", tuple(log_item.search_patterns))
+    return _item_type_key(log_item.__class__, matching, tuple(log_item.keywords or ()))
+
+
+# Keys are looked up for each file, so are kept for each log item class and definition in use,
+# rather than for each instance, which would be kept alive by the cache
+@functools.lru_cache(maxsize=64)
+def _item_type_key(log_item_class, matching: tuple, keywords: tuple):
+    mode, definitions = matching
+    if mode == "comment_blocks":
+        definitions = [_block_definition(block) for block in definitions]
+    else:
+        definitions = [_pattern_source(pattern) for pattern in definitions]
+    definition = json.dumps([[mode, definitions], list(keywords)])
+    return (
+        f"{log_item_class.__module__}.{log_item_class.__qualname__}"
+        f":{content_digest(definition.encode('utf-8'))}"
+    )
+
+
+def _pattern_source(pattern):
+    # Compiled patterns are identified by their source and flags
+    if isinstance(pattern, str):
+        return pattern
+    return [pattern.pattern, pattern.flags]
+
+
+def _block_definition(block):
+    return [
+        _pattern_source(block.header),
+        [_pattern_source(field) for field in block.fields],
+        block.body_prefix,
+        block.continuation_prefix,
+        block.body_required,
+        block.inline_body,
+    ]
+
+
+def _from_json(item):
+    # JSON has no tuples, but ``re.findall`` gives tuples for multi-group patterns
+    return tuple(item) if isinstance(item, list) else item
+
+
+class ScanCache:
+    """
+    On-disk cache of the log items matched in each file, so that unchanged files are not
+    read and searched again.
+
+    Files are identified by their relative path. A file is unchanged if its size and
+    modification time are the same as when it was cached or, failing that, if its contents
+    have the same digest. Matches are stored separately for each log item type and its
+    search patterns, so changing a :class:`LogItem`'s patterns invalidates its cached
+    matches only.
+
+    Attributes
+    ----------
+    listing
+        description of the search that last listed every file under the search path, with
+        the options that the files were listed with, the git commit checked out and the files
+        that weren't cached, or None. Used to check that the cache holds every file when only
+        the files changed since a commit are listed.
+
+    Methods
+    -------
+    get(relative_path, stat, log_item_types, digest=None)
+        return cached matches for a file, if it is unchanged.
+    digest(relative_path, log_item_types)
+        return the content digest of a cached file.
+    lines(relative_path, log_item_types)
+        return the line numbers of the cached matches for a file.
+    put(relative_path, stat, digest, log_item_types, results, lines=None)
+        store the matches found in a file.
+    prune(relative_paths)
+        forget all files other than those given.
+    save()
+        write the cache to disk.
+    """
+
+    file_name = "scan_cache.json"
+
+    def __init__(self, cache_dir: str = ".assumptions_cache"):
+        self.cache_dir = Path(cache_dir)
+        self.path = self.cache_dir / self.file_name
+        self._entries = {}
+        self.listing = None
+
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    content = json.load(f)
+            except ValueError:
+                print(f"Cache could not be read, ignoring: {self.path}")
+            else:
+                if content.get("version") == __version__:
+                    self._entries = content["entries"]
+                    self.listing = content.get("listing")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, relative_path):
+        return relative_path in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def get(self, relative_path: str, stat, log_item_types: list, digest: str = None):
+        """
+        Return the cached matches for a file, or None if the file has changed or any of the
+        log item types have not been cached for it.
+
+        Parameters
+        ----------
+        relative_path
+            relative path to the file, as used in log item locations.
+        stat
+            ``os.stat_result`` for the file, or None to trust any existing entry.
+        log_item_types
+            :class:`LogItem` instances to return matches for.
+        digest
+            optional :func:`content_digest` of the file's contents, used if the file's size or
+            modification time have changed.
+        """
+        entry = self._entries.get(relative_path)
+        if entry is None:
+            return None
+
+        if stat is not None and (
+            entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns
+        ):
+            if digest is None or entry["digest"] != digest:
+                return None
+            # Contents unchanged, only touched
+            entry["size"] = stat.st_size
+            entry["mtime_ns"] = self._mtime_ns(stat)
+
+        try:
+            return [
+                [_from_json(item) for item in entry["items"][item_type_key(log_item)]]
+                for log_item in log_item_types
+            ]
+        except KeyError:
+            return None
+
+    def digest(self, relative_path: str, log_item_types: list):
+        """
+        Return the content digest of a file when it was cached, or None if it hasn't been
+        cached for all of the log item types.
+        """
+        entry = self._entries.get(relative_path)
+        if entry is None:
+            return None
+        if any(
+            item_type_key(log_item) not in entry["items"] for log_item in log_item_types
+        ):
+            return None
+        return entry["digest"]
+
+    def lines(self, relative_path: str, log_item_types: list):
+        """
+        Return the first and last line numbers of the cached matches for a file, as a list for
+        each log item type, in the same order as the matches returned by :meth:`get`. Line
+        numbers are None where they weren't cached.
+        """
+        entry = self._entries.get(relative_path, {})
+        cached_lines = entry.get("lines", {})
+        lines = []
+        for log_item in log_item_types:
+            key = item_type_key(log_item)
+            item_count = len(entry.get("items", {}).get(key, []))
+            lines.append(cached_lines.get(key) or [None] * item_count)
+        return lines
+
+    def put(
+        self,
+        relative_path: str,
+        stat,
+        digest: str,
+        log_item_types: list,
+        results: list,
+        lines: list = None,
+    ):
+        """
+        Store the matches found in a file.
+
+        Parameters
+        ----------
+        relative_path
+            relative path to the file, as used in log item locations.
+        stat
+            ``os.stat_result`` for the file.
+        digest
+            :func:`content_digest` of the file's contents.
+        log_item_types
+            :class:`LogItem` instances that the file was searched for.
+        results
+            list of matched items for each of the log item types.
+        lines
+            optional list of the first and last line numbers of the matched items for each of
+            the log item types.
+        """
+        entry = self._entries.get(relative_path)
+        if entry is None or entry["digest"] != digest:
+            entry = {"items": {}, "lines": {}}
+            self._entries[relative_path] = entry
+        entry.update(size=stat.st_size, mtime_ns=self._mtime_ns(stat), digest=digest)
+        for idx, (log_item, items) in enumerate(zip(log_item_types, results)):
+            key = item_type_key(log_item)
+            entry["items"][key] = items
+            if lines is not None:
+                entry.setdefault("lines", {})[key] = lines[idx]
+
+    def prune(self, relative_paths):
+        """Forget all files other than those given, such as files that have been deleted."""
+        relative_paths = set(relative_paths)
+        self._entries = {
+            relative_path: entry
+            for relative_path, entry in self._entries.items()
+            if relative_path in relative_paths
+        }
+
+    def save(self):
+        """Write the cache to disk, replacing the previous cache file."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        gitignore = self.cache_dir / ".gitignore"
+        if not gitignore.exists():
+            gitignore.write_text("# Created by assumptions\n*\n", encoding="utf-8")
+
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": __version__,
+                    "listing": self.listing,
+                    "entries": self._entries,
+                },
+                f,
+            )
+        os.replace(temp_path, self.path)
+
+    @staticmethod
+    def _mtime_ns(stat):
+        if time.time() - stat.st_mtime < _RACY_SECONDS:
+            # Don't trust the mtime of a file that could still be changing
+            return None
+        return stat.st_mtime_ns
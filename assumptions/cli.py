@@ -1,8 +1,26 @@
 #!/usr/bin/env python
 import argparse
+import importlib
+import json
+import os
+import sys
+from pathlib import Path
 
-from assumptions.log import _BUILTIN_ITEM_TYPES
-from assumptions.log import Log
+from assumptions.config import CONFIG_FILE
+from assumptions.config import read_config
+
+
+def _write_index(index_path: str, logs, search_path: str):
+    """
+    Write an index of the logs' items, with paths relative to the search path. Like other
+    modules only used by some options, the index module is imported when needed, so that
+    the tool starts quickly.
+    """
+    from assumptions.index import index_records
+    from assumptions.index import write_index
+
+    write_index(index_path, index_records(logs, search_path))
+    print(f"Index written to: {index_path}")
 
 
 def cli():
@@ -16,15 +34,19 @@ def cli():
         "-l",
         "--log-type",
         type=str,
-        default="assumptions_caveats_log",
-        help="type of log to produce. Default is the" " assumptions and caveats log.",
+        action="append",
+        default=None,
+        help="type of log to produce. Can be passed more than once, or as 'all', to produce"
+        " several logs from a single search. Default is the assumptions and caveats log.",
     )
     parser.add_argument(
         "-o",
         "--outfile",
         type=str,
         default=None,
-        help="output Markdown (`.md`) file path. Default is " "'LOG_TYPE.md'.",
+        help="output Markdown (`.md`) file path. Default is "
+        "'LOG_TYPE.md'. Only used"
+        " when producing a single log.",
     )
     parser.add_argument(
         "-p",
@@ -48,7 +70,9 @@ def cli():
         "--template",
         type=str,
         default=None,
-        help="path to custom log template. Overrides template" " from log argument.",
+        help="path to custom log template. Overrides template"
+        " from log argument. Only"
+        " used when producing a single log.",
     )
     parser.add_argument(
         "-d",
@@ -56,29 +80,457 @@ def cli():
         action="store_true",
         help="when flag is passed, no output log is generated.",
     )
+    parser.add_argument(
+        "-c",
+        "--cache",
+        action="store_true",
+        help="when flag is passed, log items found in unchanged files by previous runs"
+        " are reused.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=".assumptions_cache",
+        help="directory to store the cache in. Default is '.assumptions_cache'.",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes used to search files. Use 0 for one process per CPU."
+        " Default is 1.",
+    )
+    parser.add_argument(
+        "-s",
+        "--source",
+        type=str,
+        choices=["walk", "git"],
+        default="walk",
+        help="how to find files to search. 'walk' searches every file under the path,"
+        " 'git' only searches files that are tracked or not ignored by git. Default is"
+        " 'walk'.",
+    )
+    parser.add_argument(
+        "--include",
+        type=str,
+        action="append",
+        default=None,
+        help="glob pattern of files to search, e.g. '*.py' or 'src/*'. Patterns with a '/'"
+        " are matched against paths relative to the path, and others against file names."
+        " Can be passed more than once. Searches all files by default.",
+    )
+    parser.add_argument(
+        "--exclude",
+        type=str,
+        action="append",
+        default=None,
+        help="glob pattern of files and directories not to search, e.g. 'build'. Excluded"
+        " directories aren't walked. Can be passed more than once.",
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        default=None,
+        help="path to a config file setting include and exclude patterns in an [assumptions]"
+        " section. Patterns passed as options are used instead of those in the file. Default"
+        f" is '{CONFIG_FILE}', if it exists.",
+    )
+    parser.add_argument(
+        "--max-file-size",
+        type=int,
+        default=None,
+        help="size in bytes above which files are skipped. No limit by default.",
+    )
+    parser.add_argument(
+        "--file-time-limit",
+        type=float,
+        default=None,
+        help="time limit in seconds for matching log items in each file. Files that take"
+        " longer are reported and skipped. No limit by default.",
+    )
+    parser.add_argument(
+        "--pattern-time-limit",
+        type=float,
+        default=None,
+        help="time limit in seconds for matching each search pattern in a file. Files that"
+        " take longer are reported and skipped. No limit by default.",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="when flag is passed, print counts of the files searched, the time spent"
+        " on each stage of the search and the slowest files to search.",
+    )
+    parser.add_argument(
+        "-i",
+        "--index",
+        type=str,
+        default=None,
+        help="path to write an index of all log items found to, for querying with"
+        " assumptions-query. Written as SQLite for '.db', '.sqlite' and '.sqlite3' files,"
+        " otherwise as JSON Lines.",
+    )
+    parser.add_argument(
+        "-w",
+        "--watch",
+        action="store_true",
+        help="when flag is passed, logs are updated whenever files change, until"
+        " interrupted. Only changed files are searched again.",
+    )
+    parser.add_argument(
+        "-a",
+        "--archives",
+        action="store_true",
+        help="when flag is passed, files in zip, wheel and tar archives are searched without"
+        " extracting them. Their locations are given as 'ARCHIVE!PATH'.",
+    )
+    parser.add_argument(
+        "--since",
+        type=str,
+        default=None,
+        help="git commit to compare to, e.g. 'main'. Only files that have been added,"
+        " changed or renamed since the commit are listed and searched, and all other files"
+        " and their log items are taken from the cache, which should be from a run at that"
+        " commit. Implies --cache.",
+    )
+    parser.add_argument(
+        "--commits",
+        type=str,
+        default=None,
+        help="git commit, or range of commits (e.g. 'v1.0..main'), to write logs for. Files"
+        " are read from git without checking commits out, and each version of a file is"
+        " searched once. Logs are written to the output file name followed by the start of"
+        " each commit's ID, e.g. 'todo_list_1a2b3c4d.md'.",
+    )
+    parser.add_argument(
+        "--packages",
+        type=str,
+        nargs="?",
+        const="",
+        default=None,
+        help="when flag is passed, a log is written in each package directory under the path,"
+        " with the log items in files in that package. Packages are directories containing a"
+        " setup.py, pyproject.toml or DESCRIPTION file, or directories matching an optional"
+        " glob pattern relative to the path, e.g. 'packages/*'. The output file name is used"
+        " for each package.",
+    )
+    parser.add_argument(
+        "filenames",
+        nargs="*",
+        help="files that have changed, such as those passed by pre-commit. Used with"
+        " --cache, log items from all other files are taken from the cache. Each run"
+        " rewrites the whole log, so files that changed must all be passed to one run.",
+    )
     args = parser.parse_args()
 
-    outfile = args.outfile or f"{args.log_type}.md"
+    # Remove duplicates, keeping order
+    log_types = list(dict.fromkeys(args.log_type or ["assumptions_caveats_log"]))
+    if ("all" in log_types or len(log_types) > 1) and (args.outfile or args.template):
+        parser.error("--outfile and --template can only be used with a single log type")
+    if args.watch and args.index:
+        parser.error("--index can't be used with --watch")
+    if args.since and (args.watch or args.filenames):
+        parser.error("--since can't be used with --watch or filenames")
+    if args.packages is not None and args.watch:
+        parser.error("--packages can't be used with --watch")
+    if args.archives and (args.watch or args.packages is not None):
+        parser.error("--archives can't be used with --watch or --packages")
+    if args.commits and (
+        args.watch
+        or args.packages is not None
+        or args.archives
+        or args.since
+        or args.cache
+        or args.index
+        or args.filenames
+    ):
+        parser.error(
+            "--commits can't be used with --watch, --packages, --archives, --since, --cache,"
+            " --index or filenames",
+        )
+
+    config = {}
+    if args.config is not None or Path(CONFIG_FILE).is_file():
+        try:
+            config = read_config(args.config or CONFIG_FILE)
+        except (OSError, ValueError) as error:
+            parser.error(str(error))
+    include = args.include or config.get("include")
+    exclude = args.exclude or config.get("exclude")
+    if args.jobs < 0:
+        parser.error("--jobs must be at least 1, or 0 for one process per CPU")
+    if args.max_file_size is not None and args.max_file_size < 0:
+        parser.error("--max-file-size can't be negative")
+    for time_limit in (args.file_time_limit, args.pattern_time_limit):
+        if time_limit is not None and time_limit <= 0:
+            parser.error("time limits must be positive")
+
+    # The log module imports the scanner, file sources and cache, so it is only imported
+    # once the arguments are known to be valid, keeping help and usage errors quick
+    from assumptions.cache import ScanCache
+    from assumptions.log import _BUILTIN_ITEM_TYPES
+    from assumptions.log import changed_files
+    from assumptions.log import find_log_items
+    from assumptions.log import Log
+    from assumptions.stats import ScanStats
+
+    if "all" in log_types:
+        log_types = list(_BUILTIN_ITEM_TYPES.keys())
+    for log_type in log_types:
+        if log_type not in _BUILTIN_ITEM_TYPES:
+            raise ValueError(
+                f"{log_type} is not a build in log type. Try one of: {','.join(_BUILTIN_ITEM_TYPES.keys())}",
+            )
+
+    # Generate logs
+    logs = {}
+    for log_type in log_types:
+        outfile = args.outfile or f"{log_type}.md"
+        log = Log(log_type, outfile)
+        for item_type_class in _BUILTIN_ITEM_TYPES[log_type]:
+            log.add_log_item_type(item_type_class)
+        logs[log_type] = log
+
+    if args.watch:
+        from assumptions.watch import LogWatcher
+
+        watcher = LogWatcher(
+            list(logs.values()),
+            args.path,
+            args.extension,
+            args.source,
+            args.max_file_size,
+            args.jobs,
+            include,
+            exclude,
+            args.file_time_limit,
+            args.pattern_time_limit,
+        )
+        try:
+            watcher.watch(args.template, args.dry_run)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    stats = ScanStats() if args.stats else None
+    if args.commits:
+        from assumptions.history import GitHistory
+
+        with GitHistory(
+            list(logs.values()),
+            args.path,
+            args.extension,
+            args.max_file_size,
+            stats,
+            include=include,
+            exclude=exclude,
+            file_time_limit=args.file_time_limit,
+            pattern_time_limit=args.pattern_time_limit,
+        ) as history:
+            commits = history.commits(args.commits)
+            print(f"Writing logs for {len(commits)} commits")
+            for commit in commits:
+                history.find_items(commit)
+                history.write_logs(commit, args.template, args.dry_run)
+        if stats is not None:
+            print(f"\n{stats.report()}")
+        return
+
+    cache = ScanCache(args.cache_dir) if args.cache or args.since else None
+    filenames = args.filenames or None
+    if args.packages is not None:
+        from assumptions.packages import find_package_logs
+        from assumptions.packages import write_package_logs
 
-    # Generate log
-    log = Log(args.log_type, outfile)
+        if args.since:
+            # Every file is listed to find package markers, but only changed files are searched
+            search_path = (Path(os.getcwd()) / args.path).resolve()
+            filenames = list(changed_files(search_path, args.since))
+            print(f"Files changed since {args.since}: {len(filenames)}")
 
-    item_types = _BUILTIN_ITEM_TYPES.get(args.log_type)
-    if item_types is None:
-        raise ValueError(
-            f"{args.log_type} is not a build in log type. Try one of: {','.join(_BUILTIN_ITEM_TYPES.keys())}",
+        package_logs = find_package_logs(
+            list(logs.values()),
+            args.path,
+            args.packages or None,
+            args.extension,
+            cache,
+            args.jobs,
+            args.source,
+            filenames,
+            args.max_file_size,
+            stats,
+            include=include,
+            exclude=exclude,
+            file_time_limit=args.file_time_limit,
+            pattern_time_limit=args.pattern_time_limit,
         )
+        if args.index:
+            _write_index(args.index, logs.values(), args.path)
+        changed = write_package_logs(
+            package_logs,
+            args.template,
+            args.dry_run,
+            args.jobs,
+        )
+        print(f"\n{sum(changed.values())} of {len(changed)} package logs changed.")
+        if stats is not None:
+            print(f"\n{stats.report()}")
+        return
+
+    find_log_items(
+        list(logs.values()),
+        args.path,
+        args.extension,
+        cache,
+        args.jobs,
+        args.source,
+        filenames,
+        args.max_file_size,
+        stats,
+        archives=args.archives,
+        include=include,
+        exclude=exclude,
+        file_time_limit=args.file_time_limit,
+        pattern_time_limit=args.pattern_time_limit,
+        since=args.since,
+    )
+    if args.index:
+        _write_index(args.index, logs.values(), args.path)
+    for log_type, log in logs.items():
+        updated = log.write_log(args.template, args.dry_run)
+        if log_type == "assumptions_caveats_log":
+            if not updated:
+                print("\nNUDGE: Have you updated your assumptions and caveats?")
+            else:
+                print("\nAssumptions and caveats documented.")
+    if stats is not None:
+        print(f"\n{stats.report()}")
 
-    for item_type_class in item_types:
-        log.add_log_item_type(item_type_class)
 
-    log.find_items(args.path, args.extension)
-    updated = log.write_log(args.template, args.dry_run)
-    if args.log_type == "assumptions_caveats_log":
-        if not updated:
-            print("\nNUDGE: Have you updated your assumptions and caveats?")
-        else:
-            print("\nAssumptions and caveats documented.")
+def query_cli():
+    """Entry point for querying log item indexes written by ``assumptions --index``."""
+    parser = argparse.ArgumentParser(
+        description="Query log item indexes written by `assumptions --index`, printing"
+        " matching items as JSON Lines.",
+    )
+    parser.add_argument("index", nargs="+", help="paths to index files to query.")
+    parser.add_argument(
+        "-t",
+        "--type",
+        type=str,
+        help="log item type, e.g. Assumption.",
+    )
+    parser.add_argument("-q", "--quality", type=str, help="quality rating, e.g. RED.")
+    parser.add_argument("-i", "--impact", type=str, help="impact rating, e.g. RED.")
+    parser.add_argument(
+        "-p",
+        "--path",
+        type=str,
+        default=None,
+        help="start of the relative paths of the files containing items, e.g. 'src/'.",
+    )
+    parser.add_argument(
+        "-c",
+        "--count",
+        action="store_true",
+        help="when flag is passed, only the number of matching items in each index is"
+        " printed.",
+    )
+    args = parser.parse_args()
+
+    from assumptions.index import query_index
+
+    for index in args.index:
+        records = query_index(index, args.type, args.quality, args.impact, args.path)
+        if args.count:
+            print(f"{index}: {len(records)}")
+            continue
+        for record in records:
+            print(json.dumps(record))
+
+
+def _import_log_item(name: str):
+    """Import a :class:`LogItem` subclass given as 'module:ClassName'."""
+    from assumptions.log_items import LogItem
+
+    module_name, _, class_name = name.partition(":")
+    log_item = getattr(importlib.import_module(module_name), class_name)
+    if not isinstance(log_item, type) or not issubclass(log_item, LogItem):
+        raise TypeError(f"{name} is not a subclass of `assumptions.LogItem`")
+    return log_item
+
+
+def profile_patterns_cli():
+    """
+    Entry point for profiling search patterns, to find patterns whose matching time grows
+    faster than the size of the text searched before they are used.
+    """
+    parser = argparse.ArgumentParser(
+        description="Measure how the time taken to match the search patterns of log item"
+        " types grows with the size of the text searched, flagging patterns that grow faster"
+        " than linearly or run out of time. Exits with status 1 if any are flagged.",
+    )
+    parser.add_argument(
+        "--log-item",
+        type=str,
+        action="append",
+        default=[],
+        help="LogItem subclass to profile, as 'module:ClassName'. Can be passed more than"
+        " once. Built-in log item types are always profiled.",
+    )
+    parser.add_argument(
+        "--time-limit",
+        type=float,
+        default=1.0,
+        help="time limit in seconds for matching a pattern against a sample of text."
+        " Default is 1.",
+    )
+    parser.add_argument(
+        "--max-growth",
+        type=float,
+        default=None,
+        help="power of the size of text above which growth in matching time is flagged."
+        " Default is 1.5, between linear and quadratic growth.",
+    )
+    args = parser.parse_args()
+    if args.time_limit <= 0:
+        parser.error("--time-limit must be positive")
+
+    from assumptions.log import _BUILTIN_ITEM_TYPES
+
+    log_item_types = list(
+        dict.fromkeys(
+            log_item
+            for log_items in _BUILTIN_ITEM_TYPES.values()
+            for log_item in log_items
+        ),
+    )
+    for name in args.log_item:
+        try:
+            log_item_types.append(_import_log_item(name))
+        except (ImportError, AttributeError, TypeError, ValueError) as error:
+            parser.error(f"could not import log item {name}: {error}")
+
+    from assumptions.profiling import format_profiles
+    from assumptions.profiling import MAX_GROWTH
+    from assumptions.profiling import profile_patterns
+
+    profiles = profile_patterns(
+        log_item_types,
+        time_limit=args.time_limit,
+        max_growth=MAX_GROWTH if args.max_growth is None else args.max_growth,
+    )
+    print(format_profiles(profiles))
+    flagged = dict.fromkeys(
+        f"{profile['type']} pattern {profile['pattern'] + 1}"
+        for profile in profiles
+        if profile["flagged"]
+    )
+    if flagged:
+        print(f"\nPatterns flagged: {', '.join(flagged)}")
+        sys.exit(1)
+    print("\nNo patterns flagged.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,59 @@
+from pathlib import Path
+
+# Read from the current directory when no config file is given
+CONFIG_FILE = ".assumptions.cfg"
+CONFIG_SECTION = "assumptions"
+CONFIG_OPTIONS = ("include", "exclude")
+
+
+def read_config(path=CONFIG_FILE):
+    """
+    Read options from the ``[assumptions]`` section of a config file. Options are lists of
+    glob patterns, given one per line or separated by commas, e.g.::
+
+        [assumptions]
+        exclude =
+            build
+            *.min.js
+
+    Parameters
+    ----------
+    path
+        path to the config file.
+
+    Returns
+    -------
+    dict
+        list of patterns for each option that is set, keyed by the option name. Empty if the
+        file has no ``[assumptions]`` section.
+
+    Raises
+    ------
+    ValueError
+        if the file can't be parsed or has options other than ``CONFIG_OPTIONS``.
+    """
+    # Only imported when there is a config file, so that the tool starts quickly
+    import configparser
+
+    parser = configparser.ConfigParser(interpolation=None)
+    try:
+        with open(Path(path), "r", encoding="utf-8") as f:
+            parser.read_file(f)
+    except configparser.Error as error:
+        raise ValueError(f"Could not read config file {path}: {error}") from error
+    if not parser.has_section(CONFIG_SECTION):
+        return {}
+
+    config = {}
+    for option, value in parser.items(CONFIG_SECTION):
+        if option not in CONFIG_OPTIONS:
+            raise ValueError(
+                f"Unknown option in config file {path}: {option}."
+                f" Choose from {', '.join(CONFIG_OPTIONS)}.",
+            )
+        config[option] = [
+            pattern.strip()
+            for pattern in value.replace(",", "\n").splitlines()
+            if pattern.strip()
+        ]
+    return config
@@ -0,0 +1,351 @@
+import os
+import subprocess
+from pathlib import Path
+
+from assumptions.log import _add_matched_items
+from assumptions.log import check_logs
+from assumptions.log import file_items
+from assumptions.log import LogFindError
+from assumptions.log_items import LineNumbers
+from assumptions.log_items import MatchedItems
+from assumptions.scanner import Scanner
+from assumptions.sources import PathFilter
+
+# Git file modes of directories, symbolic links and submodules, which aren't searched
+_TREE_MODE = b"40000"
+_UNSEARCHED_MODES = {b"120000", b"160000"}
+
+
+def _git(command: list, cwd: Path):
+    try:
+        return subprocess.run(
+            command,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=True,
+        ).stdout.decode("utf-8")
+    except subprocess.CalledProcessError as error:
+        raise LogFindError(
+            f"Could not read commits using git: {error.stderr.decode('utf-8').strip()}",
+        ) from error
+
+
+class GitObjects:
+    """
+    Reads objects from a git repository through a single ``git cat-file --batch`` process,
+    rather than starting a process for each object.
+
+    Parameters
+    ----------
+    repo_path
+        path to a directory in the git repository.
+
+    Methods
+    -------
+    read(name)
+        return the type and contents of an object.
+    tree(name)
+        return the entries of a tree object.
+    close()
+        stop the git process.
+    """
+
+    def __init__(self, repo_path):
+        self._process = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            cwd=repo_path,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def read(self, name: str):
+        """
+        Return the type (e.g. 'blob') and contents of an object.
+
+        Raises
+        ------
+        LogFindError
+            if the object doesn't exist.
+        """
+        self._process.stdin.write(name.encode("utf-8") + b"\n")
+        self._process.stdin.flush()
+        header = self._process.stdout.readline().split()
+        if len(header) != 3:
+            raise LogFindError(f"git object not found: {name}")
+        data = self._process.stdout.read(int(header[2]))
+        # Each object is followed by a newline
+        self._process.stdout.read(1)
+        return header[1].decode("ascii"), data
+
+    def tree(self, name: str):
+        """
+        Return the entries of a tree object, as ``(mode, name, object_id)`` tuples with the
+        mode and name as bytes.
+        """
+        object_type, data = self.read(name)
+        if object_type != "tree":
+            raise LogFindError(f"git object is a {object_type}, not a tree: {name}")
+        # Object IDs are 20 bytes for SHA-1 and 32 bytes for SHA-256 repositories
+        id_length = len(name) // 2 if len(name) in (40, 64) else 20
+        entries = []
+        start = 0
+        while start < len(data):
+            space = data.index(b" ", start)
+            end = data.index(b"\0", space)
+            id_start = end + 1
+            id_end = id_start + id_length
+            mode = data[start:space]
+            name_start = space + 1
+            entries.append((mode, data[name_start:end], data[id_start:id_end].hex()))
+            start = id_end
+        return entries
+
+    def close(self):
+        """Stop the git process."""
+        self._process.stdin.close()
+        self._process.wait()
+        self._process.stdout.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class GitHistory:
+    """
+    Finds the log items in commits straight from git objects, without checking the commits
+    out. Files are read from git by object ID, and the log items found in each file are kept
+    by object ID, so that each version of a file is only searched once, however many commits
+    it is in.
+
+    Parameters
+    ----------
+    logs
+        :class:`Log` instances to find log items for.
+    relative_search_path
+        relative path to directory in a git repository that should be searched for log items.
+    extension
+        file extension to reduce search to specific file types (e.g. '.py').
+    max_file_size
+        optional size in bytes above which files are skipped.
+    stats
+        optional :class:`ScanStats` to record counts and timings of the search in.
+    report
+        function called with progress messages, which are printed by default.
+    include
+        optional glob patterns of files to search. See :class:`PathFilter`.
+    exclude
+        optional glob patterns of files and directories not to search, which aren't read
+        from git. See :class:`PathFilter`.
+    file_time_limit
+        optional time limit in seconds for matching the log items in each file. See
+        :func:`find_log_items`.
+    pattern_time_limit
+        optional time limit in seconds for matching each search pattern in a file.
+
+    Methods
+    -------
+    commits(revisions)
+        return the IDs of the commits in a revision range.
+    find_items(commit)
+        set each log's items to those in a commit.
+    write_logs(commit, template_path=None, dry_run=False)
+        write each log for a commit.
+    close()
+        stop reading from git.
+    """
+
+    def __init__(
+        self,
+        logs: list,
+        relative_search_path: str = "",
+        extension: str = "",
+        max_file_size: int = None,
+        stats=None,
+        report=print,
+        include: list = None,
+        exclude: list = None,
+        file_time_limit: float = None,
+        pattern_time_limit: float = None,
+    ):
+        check_logs(logs)
+        self.logs = list(logs)
+        self.search_path = (Path(os.getcwd()) / relative_search_path).resolve()
+        self.extension = extension
+        self.max_file_size = max_file_size
+        self.stats = stats
+        self.report = report
+        self._path_filter = PathFilter(include, exclude) if include or exclude else None
+        top_level = Path(
+            _git(["git", "rev-parse", "--show-toplevel"], self.search_path).strip(),
+        )
+        self._tree_path = self.search_path.relative_to(top_level.resolve()).parts
+        self._log_item_types = [
+            log_item for log in self.logs for log_item in log._log_item_types
+        ]
+        self._scanner = Scanner(
+            self._log_item_types,
+            max_file_size,
+            digests=False,
+            stats=stats,
+            file_time_limit=file_time_limit,
+            pattern_time_limit=pattern_time_limit,
+        )
+        self._objects = GitObjects(self.search_path)
+        # Entries of each tree, which mostly don't change between commits, and the log items
+        # found in each file, by object ID
+        self._trees = {}
+        self._blob_items = {}
+        for log in self.logs:
+            log.stats = stats
+
+    def commits(self, revisions: str):
+        """
+        Return the IDs of the commits in a revision range (e.g. 'v1.0..main'), oldest first, or
+        of a single commit if revisions isn't a range.
+        """
+        if ".." not in revisions:
+            command = ["git", "rev-parse", "--verify", f"{revisions}^{{commit}}"]
+            return [_git(command, self.search_path).strip()]
+        return _git(
+            ["git", "rev-list", "--reverse", revisions, "--"],
+            self.search_path,
+        ).split()
+
+    def _tree(self, tree_id: str):
+        if tree_id not in self._trees:
+            self._trees[tree_id] = self._objects.tree(tree_id)
+        return self._trees[tree_id]
+
+    def _files(self, tree_id: str, prefix: str = ""):
+        """Yield the relative paths and object IDs of the files under a tree."""
+        for mode, name, object_id in self._tree(tree_id):
+            name = name.decode("utf-8", "surrogateescape")
+            relative_path = prefix + name
+            if mode == _TREE_MODE:
+                if self._path_filter is None or not self._path_filter.excludes(
+                    relative_path,
+                    name,
+                ):
+                    yield from self._files(object_id, relative_path + "/")
+            elif (
+                mode not in _UNSEARCHED_MODES
+                and name.endswith(self.extension)
+                and (
+                    self._path_filter is None
+                    or self._path_filter.includes(relative_path, name)
+                )
+            ):
+                yield relative_path, object_id
+
+    def _search_tree(self, commit: str):
+        """Return the ID of the tree for the search path in a commit, or None if it has none."""
+        object_type, data = self._objects.read(commit)
+        if object_type != "commit":
+            raise LogFindError(f"git object is a {object_type}, not a commit: {commit}")
+        tree_id = data.split(b"\n", 1)[0].split()[1].decode("ascii")
+        for part in self._tree_path:
+            entries = {
+                name: (mode, object_id) for mode, name, object_id in self._tree(tree_id)
+            }
+            mode, tree_id = entries.get(
+                part.encode("utf-8", "surrogateescape"),
+                (None, None),
+            )
+            if mode != _TREE_MODE:
+                return None
+        return tree_id
+
+    def find_items(self, commit: str):
+        """
+        Set the matched items of each log to the log items in a commit, replacing any found
+        before. Files are added to the logs in order of their relative paths.
+
+        Parameters
+        ----------
+        commit
+            ID or name of the commit.
+        """
+        for log_item in self._log_item_types:
+            log_item.matched_items = MatchedItems()
+            log_item.matched_lines = LineNumbers()
+            log_item.parsed_items = []
+
+        tree_id = self._search_tree(commit)
+        if tree_id is None:
+            self.report(f"Search path doesn't exist in commit: {commit}")
+            return
+        files = sorted(self._files(tree_id))
+        if self.stats is not None:
+            self.stats.files_visited += len(files)
+            self.stats.files_cached += sum(
+                blob in self._blob_items for _, blob in files
+            )
+
+        for path, blob in files:
+            relative_path = f"{self.search_path.name}/{path}"
+            if blob not in self._blob_items:
+                _, data = self._objects.read(blob)
+                _, results, lines = self._scanner.scan_content(relative_path, data)
+                results, lines = file_items(
+                    f"{commit}:{path}",
+                    results,
+                    lines,
+                    self._log_item_types,
+                    self.max_file_size,
+                    self.report,
+                )
+                # Files without log items are remembered without their empty results
+                self._blob_items[blob] = (results, lines) if any(results) else None
+            if self._blob_items[blob] is not None:
+                _add_matched_items(
+                    self._log_item_types,
+                    relative_path,
+                    *self._blob_items[blob],
+                )
+                if self.stats is not None:
+                    self.stats.files_matched += 1
+
+    def write_logs(self, commit: str, template_path: str = None, dry_run: bool = False):
+        """
+        Write each log with the log items found in a commit by :meth:`find_items`, with the
+        start of the commit's ID added to the log's file name (e.g. 'todo_list_1a2b3c4d.md').
+        See :meth:`Log.write_log`.
+
+        Returns
+        -------
+        list
+            whether each log has changed.
+        """
+        changed = []
+        for log in self.logs:
+            log_file_path = log._log_file_path
+            log._log_file_path = log_file_path.with_name(
+                f"{log_file_path.stem}_{commit[:8]}{log_file_path.suffix}",
+            )
+            try:
+                changed.append(
+                    log.write_log(
+                        template_path,
+                        dry_run,
+                        report=self.report,
+                        reuse_parsed=True,
+                        save_digest=False,
+                    ),
+                )
+            finally:
+                log._log_file_path = log_file_path
+        return changed
+
+    def close(self):
+        """Stop reading from git."""
+        self._objects.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,167 @@
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+INDEX_FIELDS = [
+    "type",
+    "title",
+    "quality",
+    "impact",
+    "path",
+    "first_line",
+    "last_line",
+    "description",
+]
+
+# File extensions of SQLite indexes. All other indexes are JSON Lines
+SQLITE_EXTENSIONS = {".db", ".sqlite", ".sqlite3"}
+
+
+def _is_sqlite(path: Path):
+    return path.suffix.lower() in SQLITE_EXTENSIONS
+
+
+def index_records(logs: list, search_path=None):
+    """
+    Return records of the log items found for several logs, as dictionaries with the fields
+    in ``INDEX_FIELDS``. Must be called after searching for log items.
+
+    Parameters
+    ----------
+    logs
+        :class:`Log` instances that log items have been found for.
+    search_path
+        optional directory that the logs' items were found in. File paths in logs start with
+        the directory's name, which is left out of the records, so that paths are relative to
+        the directory (e.g. 'src/model.py').
+    """
+    prefix = None
+    if search_path is not None:
+        prefix = Path(search_path).resolve().name + "/"
+    records = []
+    for log in logs:
+        for log_item in log._log_item_types:
+            lines = log_item.matched_lines
+            if len(lines) != len(log_item.matched_items):
+                lines = [None] * len(log_item.matched_items)
+            records += [
+                log_item.to_record(file_path, item, item_lines)
+                for (file_path, item), item_lines in zip(log_item.matched_items, lines)
+            ]
+    if prefix is not None:
+        relative_start = len(prefix)
+        for record in records:
+            if record["path"].startswith(prefix):
+                record["path"] = record["path"][relative_start:]
+    return records
+
+
+def write_index(path, records: list):
+    """
+    Write log item records to an index file, replacing any existing index. Indexes with a
+    ``.db``, ``.sqlite`` or ``.sqlite3`` extension are written as SQLite databases, with an
+    ``items`` table. All other indexes are written as JSON Lines, with one record per line.
+
+    Parameters
+    ----------
+    path
+        path to the index file.
+    records
+        records from :func:`index_records`.
+    """
+    path = Path(path)
+    temp_path = path.with_name(path.name + ".tmp")
+    if temp_path.exists():
+        temp_path.unlink()
+
+    if _is_sqlite(path):
+        connection = sqlite3.connect(str(temp_path))
+        try:
+            with connection:
+                connection.execute(
+                    "CREATE TABLE items (type TEXT, title TEXT, quality TEXT, impact TEXT,"
+                    " path TEXT, first_line INTEGER, last_line INTEGER, description TEXT)",
+                )
+                connection.executemany(
+                    f"INSERT INTO items VALUES ({', '.join('?' for _ in INDEX_FIELDS)})",
+                    [[record[field] for field in INDEX_FIELDS] for record in records],
+                )
+                connection.execute("CREATE INDEX items_type ON items (type)")
+                connection.execute("CREATE INDEX items_path ON items (path)")
+        finally:
+            connection.close()
+    else:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+    os.replace(temp_path, path)
+
+
+def _matches(record: dict, filters: dict, path_prefix: str):
+    if path_prefix is not None and not record["path"].startswith(path_prefix):
+        return False
+    return all(
+        record[field] is not None and record[field].lower() == value.lower()
+        for field, value in filters.items()
+    )
+
+
+def query_index(
+    path,
+    item_type: str = None,
+    quality: str = None,
+    impact: str = None,
+    path_prefix: str = None,
+):
+    """
+    Return the log item records in an index that match all of the given filters, without
+    reading the files that the items were found in. Types and ratings are compared ignoring
+    case.
+
+    Parameters
+    ----------
+    path
+        path to an index written by :func:`write_index`.
+    item_type
+        optional log item type (e.g. 'Assumption').
+    quality
+        optional quality rating (e.g. 'RED').
+    impact
+        optional impact rating (e.g. 'RED').
+    path_prefix
+        optional start of the relative paths of files containing the items (e.g. 'src/').
+
+    Returns
+    -------
+    list
+        matching records, as dictionaries with the fields in ``INDEX_FIELDS``.
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Index does not exist: {path}")
+    filters = {"type": item_type, "quality": quality, "impact": impact}
+    filters = {field: value for field, value in filters.items() if value is not None}
+
+    if not _is_sqlite(path):
+        with open(path, "r", encoding="utf-8") as f:
+            records = (json.loads(line) for line in f if line.strip())
+            return [
+                record for record in records if _matches(record, filters, path_prefix)
+            ]
+
+    conditions = [f"{field} = ? COLLATE NOCASE" for field in filters]
+    parameters = list(filters.values())
+    if path_prefix is not None:
+        conditions.append("substr(path, 1, ?) = ?")
+        parameters += [len(path_prefix), path_prefix]
+    query = f"SELECT {', '.join(INDEX_FIELDS)} FROM items"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY rowid"
+    connection = sqlite3.connect(str(path))
+    try:
+        rows = connection.execute(query, parameters).fetchall()
+    finally:
+        connection.close()
+    return [dict(zip(INDEX_FIELDS, row)) for row in rows]
@@ -1,15 +1,33 @@
 import datetime
+import functools
+import hashlib
+import itertools
 import os
 import re
+import subprocess
+import time
+from collections import Counter
 from pathlib import Path
 
-import pkg_resources
-
+from assumptions.cache import ScanCache
 from assumptions.log_items import Assumption
 from assumptions.log_items import Caveat
 from assumptions.log_items import Debt
+from assumptions.log_items import LineNumbers
 from assumptions.log_items import LogItem
+from assumptions.log_items import MatchedItems
 from assumptions.log_items import Todo
+from assumptions.scanner import BINARY
+from assumptions.scanner import Scanner
+from assumptions.scanner import TIMED_OUT
+from assumptions.scanner import TOO_LARGE
+from assumptions.scanner import UNCHANGED
+from assumptions.scanner import UNREADABLE
+from assumptions.sources import FILE_SOURCES
+from assumptions.sources import git_changed_files
+from assumptions.sources import git_commit
+from assumptions.sources import PathFilter
+from assumptions.stats import ScanStats
 
 
 class LogError(Exception):
@@ -20,6 +38,11 @@ class LogFindError(Exception):
     pass
 
 
+# Added to the log file name for the file holding a digest of the log's content
+DIGEST_SUFFIX = ".digest"
+# Added to the log file name for the file that the log is written to before it replaces it
+TEMP_SUFFIX = ".tmp"
+
 _BUILTIN_ITEM_TYPES = {
     "assumptions_caveats_log": [Assumption, Caveat],
     "technical_debt_log": [Debt],
@@ -32,17 +55,27 @@ class Log:
     Searches files for log items and writes them to an output log using a
     template.
 
+    Attributes
+    ----------
+    stats
+        :class:`ScanStats` from the last search for this log's items, which also records the
+        time taken to write the log. None unless statistics were requested.
+
     Methods
     -------
     add_log_item_type(log_item)
         add a :class:`LogItem` subclass, for use when searching for log items.
-    find_items(relative_search_path='', extension='')
+    find_items(relative_search_path='', extension='', cache=None, jobs=1, source='walk',
+               filenames=None, max_file_size=None, stats=None, archives=False, include=None,
+               exclude=None, file_time_limit=None, pattern_time_limit=None, since=None)
         recursively search files under the specificed path for log items.
         Current directory and all file extensions by default.
     write_log(template_path=None, encoding: str='utf-8')
         write an output log file, inserting discovered log items into the
         provided template. Uses the built-in template for the choses log type
         by default.
+    output_paths()
+        return the paths of the files written by :meth:`write_log`.
     """
 
     def __init__(
@@ -56,7 +89,9 @@ class Log:
                 f"Output directory does not exist: {self._log_file_path.parent}",
             )
 
+        self._log_type = log_type
         self._log_item_types = []
+        self.stats = None
 
         if log_type not in _BUILTIN_ITEM_TYPES.keys():
             msg = (
@@ -65,10 +100,17 @@ class Log:
             )
             raise ValueError(msg)
 
-        self._builtin_template = pkg_resources.resource_filename(
-            "assumptions",
-            f"templates/{log_type}.md",
-        )
+    def output_paths(self):
+        """
+        Return the paths of the files written by :meth:`write_log`: the log, the temporary file
+        that the log is written to before it replaces the log, and the log's digest.
+        """
+        log_path = self._log_file_path
+        return [
+            log_path,
+            log_path.with_name(log_path.name + TEMP_SUFFIX),
+            log_path.with_name(log_path.name + DIGEST_SUFFIX),
+        ]
 
     def add_log_item_type(self, log_item: LogItem):
         """
@@ -87,98 +129,1155 @@ class Log:
             )
         self._log_item_types.append(log_item())
 
-    def find_items(self, relative_search_path: str = "", extension: str = ""):
+    def find_items(
+        self,
+        relative_search_path: str = "",
+        extension: str = "",
+        cache: ScanCache = None,
+        jobs: int = 1,
+        source: str = "walk",
+        filenames: list = None,
+        max_file_size: int = None,
+        stats: ScanStats = None,
+        report=print,
+        archives: bool = False,
+        include: list = None,
+        exclude: list = None,
+        file_time_limit: float = None,
+        pattern_time_limit: float = None,
+        since: str = None,
+    ):
         """
         Recursive directory search for the :attribute:`search_pattern` of each :attribute:`log_item`.
         Optionally searches a specific file extension. Also provides the
-        relative path to current file.
+        relative path to current file. See :func:`find_log_items` for details of the
+        parameters, which searches for the items of several logs at once.
+        """
+        find_log_items(
+            [self],
+            relative_search_path,
+            extension,
+            cache,
+            jobs,
+            source,
+            filenames,
+            max_file_size,
+            stats,
+            report,
+            archives=archives,
+            include=include,
+            exclude=exclude,
+            file_time_limit=file_time_limit,
+            pattern_time_limit=pattern_time_limit,
+            since=since,
+        )
 
-        Parameters
-        ----------
-        relative_search_path
-            relative path to directory that should be searched for log items.
-        extension
-            file extension to reduce search to specific file types (e.g. '.py').
-        """
-        if len(self._log_item_types) == 0:
-            raise LogError("No `log_items` have been added to the Log.")
-
-        current_dir = Path(os.getcwd())
-        search_path = (current_dir / relative_search_path).resolve()
-        print(f"Searching for log items under: {search_path}")
-
-        for path in [p for p in search_path.glob("**/*" + extension) if p.is_file()]:
-            try:
-                with path.open("r") as f:
-                    file_contents = f.read()
-            except UnicodeDecodeError:
-                print(f"File could not be read, skipping: {path}")
-
-            for log_item in self._log_item_types:
-                log_item.find_items(
-                    file_contents,
-                    path.relative_to(search_path.parent).as_posix(),
-                )
+    def find_items_in_contents(
+        self,
+        contents,
+        jobs: int = 1,
+        max_file_size: int = None,
+        stats: ScanStats = None,
+        report=print,
+    ):
+        """
+        Search the contents of files that have already been read for log items, without using
+        the file system. See :func:`find_log_items_in_contents` for details of the parameters,
+        which searches for the items of several logs at once.
+        """
+        find_log_items_in_contents([self], contents, jobs, max_file_size, stats, report)
+
+    async def afind_items(
+        self,
+        root,
+        extension: str = "",
+        source: str = "walk",
+        max_file_size: int = None,
+        concurrency: int = 8,
+        report=None,
+        progress=None,
+    ):
+        """
+        Search for log items without blocking the event loop. See :func:`afind_log_items` for
+        details of the parameters, which searches for the items of several logs at once.
+        """
+        await afind_log_items(
+            [self],
+            root,
+            extension,
+            source,
+            max_file_size,
+            concurrency,
+            report,
+            progress,
+        )
+
+    async def awrite_log(
+        self,
+        template_path: str = None,
+        dry_run: bool = False,
+        encoding: str = "utf-8",
+        report=None,
+    ):
+        """
+        Write the log without blocking the event loop, by parsing items and writing the file
+        in the event loop's default executor. See :meth:`write_log` for details of the
+        parameters. Messages are passed to ``report`` in the event loop's thread, and are
+        discarded by default.
+        """
+        # Only imported by the asynchronous API, as asyncio is slow to import
+        import asyncio
+
+        loop = asyncio.get_event_loop()
+        write_log = functools.partial(
+            self.write_log,
+            template_path,
+            dry_run,
+            encoding,
+            _call_soon_threadsafe(loop, report),
+        )
+        return await loop.run_in_executor(None, write_log)
 
     def write_log(
         self,
         template_path: str = None,
         dry_run: bool = False,
         encoding: str = "utf-8",
+        report=print,
+        reuse_parsed: bool = False,
+        keep_parsed: bool = False,
+        save_digest: bool = True,
     ):
         """
         Write log to instance :attribute:`log_file_path`. Inserts matched log items into
         markers in the specified template file.
 
+        The log is rendered straight to a temporary file, without joining the items into one
+        string, and its content other than the date is hashed as it is written. Parsed items
+        are written, followed by matched items, which are parsed one at a time as they are
+        written and not kept unless ``keep_parsed`` is true. If the digest matches the one
+        saved alongside the existing log, in a file named after the log with a ``.digest``
+        suffix, the log hasn't changed and the temporary file is removed. Otherwise it
+        replaces the log. The digest file also holds the size and a digest of the log file,
+        which tell whether the log has been modified since the digest was saved. Logs without
+        a saved digest, or modified since it was saved, are compared line by line, ignoring
+        dates.
+
         Paramters
         ---------
         template_path
             path to the output log template (any plain text file).
         encoding
             encoding used to read and write template and output log.
+        report
+            function called with progress messages, which are printed by default.
+        reuse_parsed
+            when true, matched items are kept with their parsed items until the log is next
+            written, and items with the same file path and matched text aren't parsed again.
+            For writing the same log repeatedly from newly matched items as only some files
+            change, e.g. in watch mode.
+        keep_parsed
+            when true, matched items are moved to :attribute:`LogItem.parsed_items` once
+            written, as :meth:`LogItem.parse_items` does. Otherwise they are left as matched.
+        save_digest
+            whether to save the digest of the log's content alongside the log, for the next
+            write to check. Logs written once, e.g. for each commit, don't need one.
+
+        Returns
+        -------
+        bool
+            whether the log has changed.
         """
         if template_path is None:
-            # Default is assumptions and caveats from package
-            template_path = self._builtin_template
-        with open(template_path, "r", encoding=encoding) as f:
-            template_content = f.read()
-
-        if "{ current_date }" in template_content:
-            template_content = template_content.replace(
-                "{ current_date }",
-                datetime.datetime.today().strftime(r"%d/%m/%Y"),
+            # Default is the built-in template for the log type
+            template_content = _builtin_template(self._log_type).read_text(
+                encoding=encoding,
             )
+        else:
+            with open(template_path, "r", encoding=encoding) as f:
+                template_content = f.read()
+        current_date = datetime.datetime.today().strftime(r"%d/%m/%Y")
 
         for log_item_type in self._log_item_types:
-            log_item_type.parse_items()
-            items = log_item_type.parsed_items
+            if not (log_item_type.parsed_items or log_item_type.matched_items):
+                report(f"Warning: No {log_item_type.__class__.__name__} items found.")
 
-            if len(items) == 0:
-                print(f"Warning: No {log_item_type.__class__.__name__} items found.")
-                items = [log_item_type.empty_message]
+        start = time.perf_counter()
+        parser = _ItemParser(self._log_item_types, reuse_parsed, keep_parsed)
+        _, temp_path, digest_path = self.output_paths()
+        segments = _template_segments(template_content, self._log_item_types)
+        try:
+            # Rendered once, hashing each piece as it's written, so items are only parsed once
+            digest = hashlib.blake2b(digest_size=16)
+            with open(temp_path, "w", encoding=encoding) as f:
+                for literal, piece in _render_log(segments, parser.items):
+                    digest.update(piece.encode("utf-8"))
+                    if literal:
+                        piece = piece.replace("{ current_date }", current_date)
+                    f.write(piece)
+            digest = digest.hexdigest()
+            parser.finish()
 
-            template_content = template_content.replace(
-                log_item_type.template_marker,
-                "\n".join(items).strip(),
-            )
+            changed = True
+            if self._log_file_path.exists():
+                report("Log exists, checking for changes...")
+                saved_digest = _read_digest(digest_path, self._log_file_path)
+                if saved_digest == digest:
+                    report("No change to log items, log not updated.")
+                    return False
+                if saved_digest is None:
+                    # No saved digest, or the log has been modified since it was saved
+                    changed = not _same_other_than_dates(
+                        self._log_file_path,
+                        temp_path,
+                        encoding,
+                    )
+                    if not changed:
+                        report("No change to log items, log not updated.")
+
+            if not dry_run:
+                if changed:
+                    report(f"Writing log to: {self._log_file_path}")
+                    os.replace(temp_path, self._log_file_path)
+                if save_digest:
+                    _save_digest(digest_path, self._log_file_path, digest)
+            return changed
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+            if self.stats is not None:
+                self.stats.parse_times.update(parser.parse_times)
+                write_time = (
+                    time.perf_counter() - start - sum(parser.parse_times.values())
+                )
+                self.stats.write_times[str(self._log_file_path)] += write_time
 
-        if self._log_file_path.exists():
-            print("Log exists, checking for changes...")
-            with open(self._log_file_path, "r", encoding=encoding) as f:
-                old_template_content = f.read()
 
-            # Check if output has changed, other than dates
-            date_format = r"[0-9]{2}/[0-9]{2}/[0-9]{4}"
-            if re.sub(date_format, "", old_template_content) == re.sub(
-                date_format,
+def _builtin_template(log_type: str):
+    """
+    Return the built-in template for a log type, as an object with a ``read_text`` method.
+    Found using ``importlib.resources`` where available, which unlike ``pkg_resources``
+    doesn't need to scan every installed distribution when imported.
+    """
+    try:
+        from importlib.resources import files
+    except ImportError:
+        # Python < 3.9
+        return Path(__file__).parent / "templates" / f"{log_type}.md"
+    return files("assumptions") / "templates" / f"{log_type}.md"
+
+
+def _template_segments(template_content: str, log_item_types: list):
+    """
+    Split a template into literal text and the log item types whose items replace each
+    marker. Where several log item types share a marker, the first is used.
+    """
+    marker_types = {}
+    for log_item_type in log_item_types:
+        marker_types.setdefault(log_item_type.template_marker, log_item_type)
+    if not marker_types:
+        return [template_content]
+    markers = re.compile("|".join(re.escape(marker) for marker in marker_types))
+
+    segments = []
+    position = 0
+    for match in markers.finditer(template_content):
+        match_start = match.start()
+        segments += [
+            template_content[position:match_start],
+            marker_types[match.group()],
+        ]
+        position = match.end()
+    segments.append(template_content[position:])
+    return segments
+
+
+class _ItemParser:
+    """
+    Parses the items of log item types as a log is rendered, so that parsed items are written
+    one at a time rather than all held in memory. Each type's parsed items are followed by its
+    matched items, parsed as they are rendered and numbered by their index, as
+    :meth:`LogItem.parse_items` does. Matched items are parsed again for each marker of their
+    type in the template. Parsing time is added to :attribute:`parse_times`.
+
+    With ``reuse_parsed``, parsed items are kept by file path and matched text until the log
+    item type is next written, and are numbered as they are rendered, so items are reused when
+    items before them are added or removed. The matched text is the whole comment block, so an
+    item is only reused if its block is unchanged. Items of log item types that can't parse
+    items without their numbers (see :meth:`LogItem.parse_unnumbered`) are kept along with the
+    index they were parsed with, and are only reused if their index is unchanged.
+
+    With ``keep_parsed``, matched items are moved to the parsed items once the log has been
+    rendered, as :meth:`LogItem.parse_items` does.
+    """
+
+    def __init__(self, log_item_types: list, reuse_parsed: bool, keep_parsed: bool):
+        self.log_item_types = log_item_types
+        self.reuse_parsed = reuse_parsed
+        self.keep_parsed = keep_parsed
+        self.parse_times = Counter()
+        self._previous = {}
+        self._rendered = {}
+        self._kept = {}
+        for log_item_type in log_item_types:
+            self._previous[log_item_type] = log_item_type._rendered
+            self._rendered[log_item_type] = {}
+            # Without reuse, parsed items from an earlier write are released straight away
+            log_item_type._rendered = {}
+
+    def items(self, log_item_type: LogItem):
+        """Yield the parsed items of a log item type, or its empty message if it has none."""
+        if not (log_item_type.parsed_items or log_item_type.matched_items):
+            yield log_item_type.empty_message
+            return
+        yield from log_item_type.parsed_items
+        yield from self._parse(log_item_type)
+
+    def _parse(self, log_item_type: LogItem):
+        class_name = log_item_type.__class__.__name__
+        previous = self._previous[log_item_type]
+        rendered = self._rendered[log_item_type]
+        kept = None
+        if self.keep_parsed and log_item_type not in self._kept:
+            kept = self._kept[log_item_type] = []
+        unnumbered = log_item_type._parse_unnumbered
+        for idx, (file_path, item) in enumerate(log_item_type.matched_items):
+            key = (file_path, item)
+            parsed = rendered.get(key, previous.get(key))
+            if unnumbered:
+                if parsed is None:
+                    parse_start = time.perf_counter()
+                    parsed = log_item_type.parse_unnumbered(file_path, item)
+                    self.parse_times[class_name] += time.perf_counter() - parse_start
+                parsed_item = log_item_type.number_item(idx, parsed)
+            elif parsed is not None and parsed[0] == idx:
+                parsed_item = parsed[1]
+            else:
+                parse_start = time.perf_counter()
+                parsed_item = log_item_type.parse(idx, file_path, item)
+                self.parse_times[class_name] += time.perf_counter() - parse_start
+                parsed = (idx, parsed_item)
+            if self.reuse_parsed:
+                rendered[key] = parsed
+            if kept is not None:
+                kept.append(parsed_item)
+            yield parsed_item
+
+    def finish(self):
+        """
+        Keep the items parsed in this write for reuse, and move matched items to the parsed
+        items if they are kept.
+        """
+        for log_item_type in self.log_item_types:
+            if self.keep_parsed:
+                if log_item_type not in self._kept:
+                    # Not in the template, but parsed as parse_items would
+                    for _ in self._parse(log_item_type):
+                        pass
+                log_item_type.parsed_items += self._kept[log_item_type]
+                log_item_type.matched_items = MatchedItems()
+                log_item_type.matched_lines = LineNumbers()
+            # Only the items from this write are kept, so the memo doesn't grow between writes
+            log_item_type._rendered = self._rendered[log_item_type]
+
+
+def _render_log(segments: list, items):
+    """
+    Yield the text of a log in pieces, as ``(literal, piece)`` pairs, where literal pieces are
+    from the template, with placeholders not yet replaced, and the others are the parsed
+    items of a log item type, from ``items(log_item_type)``.
+    """
+    for segment in segments:
+        if isinstance(segment, str):
+            yield True, segment
+            continue
+        for piece in _strip_joined(items(segment)):
+            yield False, piece
+
+
+def _strip_joined(items):
+    """
+    Yield the text of ``"\n".join(items).strip()`` in pieces, without joining the items.
+    Whitespace at the end of each item is held back until it is known not to be at the end
+    of the text.
+    """
+    started = False
+    trailing_space = ""
+    for item in items:
+        if not started:
+            item = item.lstrip()
+            if not item:
+                continue
+            started = True
+        else:
+            trailing_space += "\n"
+        content = item.rstrip()
+        if content:
+            yield trailing_space + content
+            trailing_space = ""
+        content_end = len(content)
+        trailing_space += item[content_end:]
+
+
+def _file_digest(path: Path):
+    """Return a digest of the bytes of a file, which is read a block at a time."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(65536), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_digest(digest_path: Path, log_path: Path):
+    """
+    Return the digest of a log's content saved alongside it, or None if there isn't one, or if
+    the log has changed since it was saved. The size and a digest of the log file are saved
+    with it and checked against the log, rather than modification times, which change when
+    files are checked out or copied.
+    """
+    try:
+        digest, size, file_digest = digest_path.read_text(encoding="utf-8").split()
+        if (
+            log_path.stat().st_size != int(size)
+            or _file_digest(log_path) != file_digest
+        ):
+            return None
+    except (OSError, ValueError):
+        # Missing or unreadable, or saved in an older format
+        return None
+    return digest
+
+
+def _save_digest(digest_path: Path, log_path: Path, digest: str):
+    """Save the digest of a log's content, along with the size and digest of the log file."""
+    digest_path.write_text(
+        f"{digest} {log_path.stat().st_size} {_file_digest(log_path)}\n",
+        encoding="utf-8",
+    )
+
+
+def _same_other_than_dates(path_a, path_b, encoding: str = "utf-8"):
+    """Compare two text files line by line, ignoring any dates."""
+    date_format = re.compile(r"[0-9]{2}/[0-9]{2}/[0-9]{4}")
+    with open(path_a, "r", encoding=encoding) as file_a, open(
+        path_b,
+        "r",
+        encoding=encoding,
+    ) as file_b:
+        for line_a, line_b in itertools.zip_longest(file_a, file_b):
+            if line_a is None or line_b is None:
+                return False
+            if line_a != line_b and date_format.sub("", line_a) != date_format.sub(
                 "",
-                template_content,
+                line_b,
             ):
-                print("No change to log items, log not updated.")
                 return False
+    return True
+
 
-        if not dry_run:
-            print(f"Writing log to: {self._log_file_path}")
-            with open(self._log_file_path, "w", encoding=encoding) as f:
-                f.write(template_content)
-        return True
+def check_logs(logs: list, source: str = "walk"):
+    """Check that logs can be searched for, raising an error if not."""
+    if any(len(log._log_item_types) == 0 for log in logs):
+        raise LogError("No `log_items` have been added to the Log.")
+    if source not in FILE_SOURCES:
+        raise ValueError(
+            f"{source} is not a valid file source. Choose from {', '.join(FILE_SOURCES)}.",
+        )
+
+
+def _add_matched_items(
+    log_item_types: list,
+    relative_path: str,
+    results: list,
+    lines: list,
+):
+    for log_item, items, item_lines in zip(log_item_types, results, lines):
+        log_item.matched_items += [(relative_path, item) for item in items]
+        log_item.matched_lines += item_lines
+
+
+def _call_soon_threadsafe(loop, callback):
+    """
+    Return a function that schedules calls to callback in the event loop's thread, so that it
+    can be called from other threads. Calls are discarded if callback is None.
+    """
+    if callback is None:
+        return lambda *args: None
+    return lambda *args: loop.call_soon_threadsafe(callback, *args)
+
+
+def iter_files(
+    search_path: Path,
+    extension: str = "",
+    source: str = "walk",
+    paths: list = None,
+    exclude: set = frozenset(),
+    path_filter: PathFilter = None,
+):
+    """
+    Yield the files to search for log items as they are found, in no particular order, so
+    that files can be searched before they have all been listed. See :func:`list_files` for
+    details of the parameters.
+
+    Yields
+    ------
+    tuple
+        ``(relative_path, path)`` pairs.
+    """
+    # Paths are all under the search path, so excluded paths are compared as relative paths
+    excluded = [
+        path.relative_to(search_path.parent).as_posix()
+        for path in exclude
+        if path == search_path or search_path in path.parents
+    ]
+    try:
+        for path in FILE_SOURCES[source](search_path, extension, paths, path_filter):
+            relative_path = path.relative_to(search_path.parent).as_posix()
+            if excluded and any(
+                relative_path == excluded_path
+                or relative_path.startswith(excluded_path + "/")
+                for excluded_path in excluded
+            ):
+                continue
+            yield relative_path, path
+    except subprocess.CalledProcessError as error:
+        raise LogFindError(
+            f"Could not list files using git: {error.stderr.decode('utf-8').strip()}",
+        ) from error
+
+
+def list_files(
+    search_path: Path,
+    extension: str = "",
+    source: str = "walk",
+    paths: list = None,
+    exclude: set = frozenset(),
+    path_filter: PathFilter = None,
+):
+    """
+    List the files to search for log items, sorted by their paths relative to the parent of
+    the search path.
+
+    Parameters
+    ----------
+    search_path
+        absolute path to the directory to search.
+    extension
+        file extension to reduce search to specific file types (e.g. '.py').
+    source
+        how files are found, from ``FILE_SOURCES``.
+    paths
+        optional absolute paths to list, if they would be listed by the source, instead of
+        listing every file under the search path.
+    exclude
+        absolute paths of files and directories to leave out.
+    path_filter
+        optional :class:`PathFilter` of glob patterns of files to include and exclude.
+
+    Returns
+    -------
+    list
+        ``(relative_path, path)`` pairs.
+    """
+    return sorted(
+        iter_files(search_path, extension, source, paths, exclude, path_filter),
+    )
+
+
+def _timed_walk(files, stats: ScanStats):
+    """Yield files as they are listed, adding the time spent listing them to the walk time."""
+    files = iter(files)
+    while True:
+        start = time.perf_counter()
+        try:
+            file = next(files)
+        except StopIteration:
+            return
+        finally:
+            stats.walk_time += time.perf_counter() - start
+        yield file
+
+
+def changed_files(search_path: Path, ref: str):
+    """
+    Return the files under the search path that differ from a git commit. See
+    :func:`git_changed_files`.
+
+    Raises
+    ------
+    LogFindError
+        if git can't compare the files, e.g. because ref doesn't exist.
+    """
+    try:
+        return git_changed_files(search_path, ref)
+    except subprocess.CalledProcessError as error:
+        raise LogFindError(
+            f"Could not compare files to {ref} using git: {error.stderr.decode('utf-8').strip()}",
+        ) from error
+
+
+def _commit(search_path: Path, ref: str):
+    """Return the full ID of a git commit, or None if it can't be found."""
+    try:
+        return git_commit(search_path, ref)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _listing(
+    search_path: Path,
+    extension: str,
+    source: str,
+    include: list,
+    exclude: list,
+):
+    """Return a description of the options that every file under a path is listed with."""
+    return {
+        "root": search_path.name,
+        "extension": extension,
+        "source": source,
+        "include": sorted(include or []),
+        "exclude": sorted(exclude or []),
+    }
+
+
+def _listed_at(cache: ScanCache, listing: dict, search_path: Path, ref: str):
+    """
+    Return whether a cache was last saved by a search that listed every file with the same
+    options, when the git commit ``ref`` was checked out, so that it holds every file that
+    hasn't changed since the commit.
+    """
+    saved = cache.listing
+    if (
+        saved is None
+        or {
+            option: value
+            for option, value in saved.items()
+            if option not in ("commit", "uncached")
+        }
+        != listing
+    ):
+        return False
+    return saved["commit"] is not None and saved["commit"] == _commit(search_path, ref)
+
+
+def _files_since(
+    search_path: Path,
+    changed: dict,
+    cache: ScanCache,
+    extension: str,
+    source: str,
+    exclude: set,
+    path_filter: PathFilter,
+):
+    """
+    List the files to search when only the files changed since a git commit are searched,
+    without listing every file under the search path. Changed files are listed by the file
+    source, and all other files are those the cache was last listed with, which git found to
+    be unchanged. The cache must have been listed at the commit, see :func:`_listed_at`.
+    Deleted files and the old paths of renamed files are left out. See :func:`list_files`
+    for details of the other parameters.
+
+    Parameters
+    ----------
+    changed
+        git status of each changed file, keyed by its absolute path, from
+        :func:`changed_files`.
+    """
+    changed_paths = [path for path, status in changed.items() if status != "D"]
+    files = dict(
+        iter_files(search_path, extension, source, changed_paths, exclude, path_filter),
+    )
+    prefix = search_path.name + "/"
+    # Files that were listed but not cached, e.g. because they were too large, are listed too
+    for relative_path in [*cache, *cache.listing["uncached"]]:
+        if relative_path in files or not relative_path.startswith(prefix):
+            continue
+        path = search_path.parent / relative_path
+        # Changed files that weren't listed have been deleted, or aren't listed by the source
+        if path not in changed:
+            files[relative_path] = path
+    return sorted(files.items())
+
+
+def file_items(
+    path: Path,
+    results,
+    lines: list,
+    log_item_types: list,
+    max_file_size: int = None,
+    report=print,
+):
+    """
+    Return the log items found in a file by :meth:`Scanner.scan_file` and their line numbers,
+    with no items for each log item type if the file was skipped. Files that were skipped
+    because they are too large, couldn't be read or took too long to search are reported.
+    """
+    if results == TOO_LARGE:
+        report(f"File is larger than {max_file_size} bytes, skipping: {path}")
+    elif results == UNREADABLE:
+        report(f"File could not be read, skipping: {path}")
+    elif results == TIMED_OUT:
+        # Line numbers hold the time limit that was exceeded
+        report(f"File search timed out, {lines}, skipping: {path}")
+    if results in (TOO_LARGE, UNREADABLE, BINARY, TIMED_OUT):
+        return [[] for _ in log_item_types], [[] for _ in log_item_types]
+    return results, lines
+
+
+def find_log_items(
+    logs: list,
+    relative_search_path: str = "",
+    extension: str = "",
+    cache: ScanCache = None,
+    jobs: int = 1,
+    source: str = "walk",
+    filenames: list = None,
+    max_file_size: int = None,
+    stats: ScanStats = None,
+    report=print,
+    files: list = None,
+    archives: bool = False,
+    include: list = None,
+    exclude: list = None,
+    file_time_limit: float = None,
+    pattern_time_limit: float = None,
+    since: str = None,
+):
+    """
+    Recursive directory search for the log items of several logs at once. Each file is read
+    and searched once for the log item types of all logs, so that several logs can be
+    generated from a single search. Files that contain none of the log items'
+    :attribute:`keywords` are skipped after a single scan. When a cache is given, matches are
+    reused for files that haven't changed since the cache was saved. Files are searched as
+    they are found, rather than after listing every file.
+
+    Parameters
+    ----------
+    logs
+        :class:`Log` instances to find log items for.
+    relative_search_path
+        relative path to directory that should be searched for log items.
+    extension
+        file extension to reduce search to specific file types (e.g. '.py').
+    cache
+        optional :class:`ScanCache` of matches from previous searches, which is updated and
+        saved.
+    jobs
+        number of processes used to read and search files. Zero uses one process per CPU.
+        Files are always added to the log in order of their relative paths.
+    source
+        how files are found. Either 'walk', to search all files in the directory, or 'git',
+        to list files that are tracked by git or untracked and not ignored.
+    filenames
+        optional paths to files that have changed, such as the files passed by pre-commit.
+        When used with a cache, cached matches for all other files are reused without
+        checking the files for changes.
+    max_file_size
+        optional size in bytes above which files are skipped.
+    stats
+        optional :class:`ScanStats` to record counts and timings of the search in. Also set as
+        the :attribute:`stats` of each log, so that the time taken to write logs is recorded.
+    report
+        function called with progress messages, which are printed by default.
+    files
+        optional ``(relative_path, path)`` pairs from :func:`list_files` to search, when the
+        files under the search path have already been listed.
+    archives
+        whether to search the files in zip, wheel and tar archives, without extracting them.
+        Files in archives are given paths such as 'dist/package.whl!package/module.py', and
+        are never cached.
+    include
+        optional glob patterns of files to search, e.g. '*.py' or 'src/*'. See
+        :class:`PathFilter`.
+    exclude
+        optional glob patterns of files and directories not to search, e.g. 'build'.
+        Excluded directories aren't walked. See :class:`PathFilter`.
+    file_time_limit
+        optional time limit in seconds for matching the log items in each file. Files that
+        take longer, e.g. because a search pattern backtracks catastrophically, are reported
+        and skipped rather than hanging the search. See :class:`MatchBudget`.
+    pattern_time_limit
+        optional time limit in seconds for matching each search pattern in a file. Files that
+        take longer are reported and skipped.
+    since
+        optional git commit, e.g. 'origin/main'. Only the files that have changed since the
+        commit are searched, and all other files are taken from the cache, which is required.
+        Files are only listed from git and the cache if the cache was saved by a search of
+        every file with the same options at that commit. Otherwise, and with ``archives``, as
+        files in archives aren't cached, every file is listed. See :func:`changed_files`.
+
+    Raises
+    ------
+    LogError
+        if ``since`` is given without a cache.
+    """
+    check_logs(logs, source)
+    if since is not None and cache is None:
+        raise LogError(
+            "A cache is needed to search only the files changed since a commit.",
+        )
+    log_item_types = [log_item for log in logs for log_item in log._log_item_types]
+
+    current_dir = Path(os.getcwd())
+    search_path = (current_dir / relative_search_path).resolve()
+    report(f"Searching for log items under: {search_path}")
+
+    excluded_paths = set() if cache is None else {cache.cache_dir.resolve()}
+    path_filter = PathFilter(include, exclude) if include or exclude else None
+    walk_start = time.perf_counter()
+    listing = None
+    if cache is not None and files is None:
+        listing = _listing(search_path, extension, source, include, exclude)
+    changed = None
+    if since is not None:
+        changed = changed_files(search_path, since)
+        # Old paths of renamed files are deleted
+        filenames = [path for path, status in changed.items() if status != "D"]
+        report(f"Files changed since {since}: {len(filenames)}")
+        if archives or not _listed_at(cache, listing, search_path, since):
+            if not archives:
+                report(
+                    f"Cache isn't from a search of every file at {since},"
+                    " listing every file.",
+                )
+            changed = None
+    archive_files = []
+    if archives:
+        from assumptions.archives import is_archive
+        from assumptions.archives import MEMBER_SEPARATOR
+
+        if files is None:
+            # Archives are listed whatever their extension, which applies to their files
+            files = list_files(
+                search_path,
+                "",
+                source,
+                exclude=excluded_paths,
+                path_filter=path_filter,
+            )
+            files = [
+                (relative_path, path)
+                for relative_path, path in files
+                if path.name.endswith(extension) or is_archive(path)
+            ]
+        archive_files = [
+            (relative_path, path) for relative_path, path in files if is_archive(path)
+        ]
+        files = [
+            (relative_path, path)
+            for relative_path, path in files
+            if not is_archive(path)
+        ]
+    elif files is None and changed is not None:
+        files = _files_since(
+            search_path,
+            changed,
+            cache,
+            extension,
+            source,
+            excluded_paths,
+            path_filter,
+        )
+    elif files is None:
+        files = iter_files(
+            search_path,
+            extension,
+            source,
+            exclude=excluded_paths,
+            path_filter=path_filter,
+        )
+        if stats is not None:
+            files = _timed_walk(files, stats)
+    if stats is not None:
+        stats.walk_time += time.perf_counter() - walk_start
+        for log in logs:
+            log.stats = stats
+
+    changed_paths = None
+    if filenames is not None:
+        changed_paths = {
+            Path(os.path.abspath(current_dir / filename)) for filename in filenames
+        }
+
+    file_results = {}
+    file_stats = {}
+    to_scan = []
+
+    def scan_tasks():
+        for relative_path, path in files:
+            if cache is not None:
+                file_results[relative_path] = None
+                if changed_paths is not None and path not in changed_paths:
+                    # Trust the cache for files that haven't changed
+                    file_results[relative_path] = cache.get(
+                        relative_path,
+                        None,
+                        log_item_types,
+                    )
+                if file_results[relative_path] is None:
+                    file_stats[relative_path] = path.stat()
+                    file_results[relative_path] = cache.get(
+                        relative_path,
+                        file_stats[relative_path],
+                        log_item_types,
+                    )
+                if file_results[relative_path] is not None:
+                    continue
+                cached_digest = cache.digest(relative_path, log_item_types)
+            else:
+                cached_digest = None
+            to_scan.append((relative_path, path, cached_digest))
+            yield path, cached_digest
+
+    scanner = Scanner(
+        log_item_types,
+        max_file_size,
+        digests=cache is not None,
+        stats=stats,
+        file_time_limit=file_time_limit,
+        pattern_time_limit=pattern_time_limit,
+    )
+    # Files that are still being listed are scanned as they are found, in batches when
+    # several jobs are used
+    tasks = list(scan_tasks()) if isinstance(files, list) else scan_tasks()
+    file_lines = {}
+    for idx, (digest, results, lines) in enumerate(scanner.scan_files(tasks, jobs)):
+        relative_path, path, _ = to_scan[idx]
+        if results == UNCHANGED:
+            results = cache.get(
+                relative_path,
+                file_stats[relative_path],
+                log_item_types,
+                digest,
+            )
+        else:
+            # Skipped files are cached as empty, so that they aren't read again until they
+            # change, other than files that are too large or too slow to search, as the limits
+            # can change
+            cacheable = results not in (TOO_LARGE, TIMED_OUT)
+            results, lines = file_items(
+                path,
+                results,
+                lines,
+                log_item_types,
+                max_file_size,
+                report,
+            )
+            if cache is not None and cacheable:
+                cache.put(
+                    relative_path,
+                    file_stats[relative_path],
+                    digest,
+                    log_item_types,
+                    results,
+                    lines,
+                )
+            file_lines[relative_path] = lines
+        file_results[relative_path] = results
+
+    archive_items = {}
+    scanned = scanner.scan_archives(
+        [path for _, path in archive_files],
+        extension,
+        jobs,
+    )
+    for (relative_path, path), members in zip(archive_files, scanned):
+        for member, (_, results, lines) in members:
+            # Files in archives that can't be read are reported as the archive
+            suffix = "" if member is None else f"{MEMBER_SEPARATOR}{member}"
+            archive_items[relative_path + suffix] = file_items(
+                f"{path}{suffix}",
+                results,
+                lines,
+                log_item_types,
+                max_file_size,
+                report,
+            )
+
+    if stats is not None:
+        stats.files_visited += len(file_results)
+        stats.files_cached += len(file_results) - len(to_scan)
+
+    for relative_path in sorted([*file_results, *archive_items]):
+        if relative_path in archive_items:
+            results, lines = archive_items[relative_path]
+        else:
+            results = file_results[relative_path]
+            lines = file_lines.get(relative_path)
+            if lines is None:
+                lines = cache.lines(relative_path, log_item_types)
+        _add_matched_items(log_item_types, relative_path, results, lines)
+        if stats is not None and any(results):
+            stats.files_matched += 1
+
+    if cache is not None:
+        if changed is not None:
+            # Entries now hold the working tree rather than a commit
+            cache.listing = None
+        elif listing is not None:
+            cache.listing = {
+                **listing,
+                "commit": _commit(search_path, "HEAD"),
+                "uncached": sorted(
+                    relative_path
+                    for relative_path in file_results
+                    if relative_path not in cache
+                ),
+            }
+        cache.prune(file_results)
+        cache.save()
+
+
+def find_log_items_in_contents(
+    logs: list,
+    contents,
+    jobs: int = 1,
+    max_file_size: int = None,
+    stats: ScanStats = None,
+    report=print,
+):
+    """
+    Search the contents of files for the log items of several logs at once, for files that
+    are already in memory, such as files from a database or a code review. Nothing is read
+    from or written to the file system. Contents are searched as they are taken from the
+    iterable, so a generator can be used to avoid holding every file in memory at once.
+
+    Parameters
+    ----------
+    logs
+        :class:`Log` instances to find log items for.
+    contents
+        iterable of ``(relative_path, data)`` pairs, where data is the file's text or its
+        bytes in the locale's preferred encoding. Relative paths are used as the locations of
+        log items.
+    jobs
+        number of processes used to search files. Zero uses one process per CPU. As with
+        :func:`find_log_items`, files are always added to the log in order of their relative
+        paths.
+    max_file_size
+        optional size in bytes (or characters, for text) above which files are skipped.
+    stats
+        optional :class:`ScanStats` to record counts and timings of the search in.
+    report
+        function called with progress messages, which are printed by default.
+    """
+    check_logs(logs)
+    log_item_types = [log_item for log in logs for log_item in log._log_item_types]
+    if stats is not None:
+        for log in logs:
+            log.stats = stats
+
+    # Paths are recorded as contents are read, as they aren't included in scan results
+    relative_paths = []
+
+    def read_contents():
+        for relative_path, data in contents:
+            relative_paths.append(str(relative_path))
+            yield relative_path, data
+
+    scanner = Scanner(log_item_types, max_file_size, digests=False, stats=stats)
+    found = []
+    for idx, (_, results, lines) in enumerate(
+        scanner.scan_contents(read_contents(), jobs),
+    ):
+        results, lines = file_items(
+            relative_paths[idx],
+            results,
+            lines,
+            log_item_types,
+            max_file_size,
+            report,
+        )
+        if any(results):
+            found.append((relative_paths[idx], results, lines))
+    if stats is not None:
+        stats.files_visited += len(relative_paths)
+        stats.files_matched += len(found)
+
+    # Sorting is stable, so files with the same path stay in the order they were given
+    found.sort(key=lambda file: file[0])
+    for relative_path, results, lines in found:
+        _add_matched_items(log_item_types, relative_path, results, lines)
+
+
+async def afind_log_items(
+    logs: list,
+    root,
+    extension: str = "",
+    source: str = "walk",
+    max_file_size: int = None,
+    concurrency: int = 8,
+    report=None,
+    progress=None,
+):
+    """
+    Search for the log items of several logs without blocking the event loop, for use in
+    asynchronous applications. Listing, reading and matching files is run in the event loop's
+    default executor, with several files searched at once, so that reading one file overlaps
+    with matching another. Unlike :func:`find_log_items`, the search path is not relative to
+    the current working directory and nothing is printed.
+
+    Parameters
+    ----------
+    logs
+        :class:`Log` instances to find log items for.
+    root
+        path to the directory that should be searched for log items.
+    extension
+        file extension to reduce search to specific file types (e.g. '.py').
+    source
+        how files are found. See :func:`find_log_items`.
+    max_file_size
+        optional size in bytes above which files are skipped.
+    concurrency
+        maximum number of files to read and search at once.
+    report
+        optional function called with progress messages, such as files that were skipped.
+    progress
+        optional function called with the number of files searched so far and the total
+        number of files, after each file is searched.
+    """
+    import asyncio
+
+    check_logs(logs, source)
+    if concurrency < 1:
+        raise ValueError("Concurrency must be at least 1.")
+    report = report or (lambda message: None)
+    log_item_types = [log_item for log in logs for log_item in log._log_item_types]
+    loop = asyncio.get_event_loop()
+
+    search_path = await loop.run_in_executor(None, Path(root).resolve)
+    report(f"Searching for log items under: {search_path}")
+    files = await loop.run_in_executor(None, list_files, search_path, extension, source)
+
+    scanner = Scanner(log_item_types, max_file_size, digests=False)
+    scanned = [None] * len(files)
+    # Shared by all workers, so that each file is searched once
+    file_indices = iter(range(len(files)))
+    searched = 0
+
+    async def search_files():
+        nonlocal searched
+        for idx in file_indices:
+            scanned[idx] = await loop.run_in_executor(
+                None,
+                scanner.scan_file,
+                files[idx][1],
+            )
+            searched += 1
+            if progress is not None:
+                progress(searched, len(files))
+
+    await asyncio.gather(*(search_files() for _ in range(min(concurrency, len(files)))))
+
+    for (relative_path, path), (_, results, lines) in zip(files, scanned):
+        results, lines = file_items(
+            path,
+            results,
+            lines,
+            log_item_types,
+            max_file_size,
+            report,
+        )
+        _add_matched_items(log_item_types, relative_path, results, lines)
@@ -1,8 +1,241 @@
+import functools
 import re
+import time
 from abc import ABC
 from abc import abstractmethod
+from array import array
 from pathlib import Path
 
+from assumptions.blocks import CommentBlock
+from assumptions.blocks import iter_lines
+
+
+def _defined_by(cls, name):
+    """Return the class in the method resolution order that defines an attribute."""
+    for base in cls.__mro__:
+        if name in vars(base):
+            return base
+
+
+def _findall_item(match):
+    """Return a match in the form that ``re.findall`` would give it."""
+    if match.re.groups == 0:
+        return match.group(0)
+    if match.re.groups == 1:
+        return match.group(1) or ""
+    return match.groups("")
+
+
+def line_numbers(text: str, spans: list):
+    """
+    Return the first and last line numbers, counting from one, of each ``(start, end)`` span of
+    offsets in text. The last line is the line containing the final character of the span.
+    """
+    offsets = sorted(
+        {offset for start, end in spans for offset in (start, max(start, end - 1))},
+    )
+    numbers = {}
+    line = 1
+    previous = 0
+    for offset in offsets:
+        line += text.count("\n", previous, offset)
+        numbers[offset] = line
+        previous = offset
+    return [[numbers[start], numbers[max(start, end - 1)]] for start, end in spans]
+
+
+class LineNumbers:
+    """
+    Sequence of the first and last line numbers of matched items, each given as a
+    ``[first, last]`` list. The numbers are stored in a single array, rather than a list for
+    each item, as there is one pair for every item found.
+
+    Methods
+    -------
+    append(lines)
+        add the line numbers of an item.
+    extend(lines)
+        add the line numbers of several items.
+    """
+
+    __slots__ = ("_numbers",)
+
+    def __init__(self, lines=()):
+        self._numbers = array("L")
+        self.extend(lines)
+
+    def append(self, lines):
+        """Add the first and last line numbers of an item."""
+        first, last = lines
+        self._numbers.append(first)
+        self._numbers.append(last)
+
+    def extend(self, lines):
+        """Add the first and last line numbers of several items."""
+        if isinstance(lines, LineNumbers):
+            self._numbers.extend(lines._numbers)
+            return
+        for item_lines in lines:
+            self.append(item_lines)
+
+    def __iadd__(self, lines):
+        self.extend(lines)
+        return self
+
+    def __len__(self):
+        return len(self._numbers) // 2
+
+    def __getitem__(self, idx: int):
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("line numbers index out of range")
+        return [self._numbers[2 * idx], self._numbers[2 * idx + 1]]
+
+    def __iter__(self):
+        numbers = iter(self._numbers)
+        return ([first, last] for first, last in zip(numbers, numbers))
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(self)})"
+
+
+class MatchedItems:
+    """
+    Sequence of matched items, each given as a ``(file_path, item)`` pair. Each file path is
+    stored once, with the index of its path stored for each item in a single array, rather
+    than a pair for each item, as files often have several items.
+
+    Methods
+    -------
+    append(matched_item)
+        add a matched item.
+    extend(matched_items)
+        add several matched items.
+    """
+
+    __slots__ = ("_paths", "_path_ids", "_path_idx", "_items")
+
+    def __init__(self, matched_items=()):
+        self._paths = []
+        self._path_ids = {}
+        self._path_idx = array("L")
+        self._items = []
+        self.extend(matched_items)
+
+    def append(self, matched_item):
+        """Add a ``(file_path, item)`` pair."""
+        file_path, item = matched_item
+        path_id = self._path_ids.get(file_path)
+        if path_id is None:
+            path_id = self._path_ids[file_path] = len(self._paths)
+            self._paths.append(file_path)
+        self._path_idx.append(path_id)
+        self._items.append(item)
+
+    def extend(self, matched_items):
+        """Add several ``(file_path, item)`` pairs."""
+        for matched_item in matched_items:
+            self.append(matched_item)
+
+    def __iadd__(self, matched_items):
+        self.extend(matched_items)
+        return self
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, idx: int):
+        return self._paths[self._path_idx[idx]], self._items[idx]
+
+    def __iter__(self):
+        paths = self._paths
+        return (
+            (paths[path_id], item) for path_id, item in zip(self._path_idx, self._items)
+        )
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(self)})"
+
+
+_MULTIPLE_SPACES = re.compile("[ ]{2,}")
+_INDENT = re.compile("[ \t]*")
+
+
+@functools.lru_cache(maxsize=None)
+def compile_search_pattern(pattern: str):
+    """
+    Compile a search pattern with the flags used for matching log items. Each pattern is
+    compiled once and kept for the life of the process, as the patterns of all log item types
+    are a small fixed set.
+
+    Raises
+    ------
+    ValueError
+        if the pattern isn't a valid regular expression.
+    """
+    if not isinstance(pattern, str):
+        raise ValueError(
+            f"Search patterns must be strings, not {type(pattern).__name__}.",
+        )
+    try:
+        return re.compile(pattern, re.MULTILINE | re.IGNORECASE)
+    except re.error as error:
+        raise ValueError(f"Invalid search pattern {pattern!r}: {error}") from error
+
+
+@functools.lru_cache(maxsize=256)
+def _comment_prefix(indent: str, comment: str = "#'? ?"):
+    """
+    Return a regex matching the newline, indentation and comment marker at the start of each
+    line of a comment block. Few distinct indentations are used, so these are cached rather
+    than compiled for each item.
+    """
+    return re.compile(f"\n?{re.escape(indent)}{comment}")
+
+
+def _collapse_spaces(text: str):
+    """
+    Strip text and reduce runs of spaces to single spaces. Most text has no runs of spaces, so
+    it is only searched for them by the regex if it contains two spaces in a row.
+    """
+    text = text.strip()
+    if "  " in text:
+        return _MULTIPLE_SPACES.sub(" ", text)
+    return text
+
+
+@functools.lru_cache(maxsize=256)
+def _description_cleanup(indent: str):
+    """
+    Return a regex matching either the comment marker at the start of each line of a detailed
+    description, as :func:`_comment_prefix` does, or a run of spaces elsewhere. Runs of spaces
+    don't include the start of a comment marker, so the text is the same as if markers were
+    removed before runs of spaces were reduced.
+    """
+    comment = f"{re.escape(indent)}#'? ?"
+    return re.compile(f"(\n?{comment})|(?:(?!{comment})[ ]){{2,}}")
+
+
+def _cleaned(match):
+    return "\n" if match.lastindex else " "
+
+
+def _clean_description(indent: str, description: str):
+    """
+    Remove indentation and comment hashes from a detailed description, and reduce runs of
+    spaces to single spaces, in one search of the description.
+    """
+    if not description:
+        return ""
+    return _description_cleanup(indent).sub(_cleaned, description).strip()
+
 
 class _AbstractLogItem(ABC):
     """
@@ -69,22 +302,192 @@ class LogItem(_AbstractLogItem):
 
     Attributes
     ----------
+    keywords
+        optional list of literal strings, one of which appears (ignoring case) on the first
+        line of every match. Used to skip text that can't contain the item. Subclasses that
+        don't set keywords are always searched with their full patterns.
+    comment_blocks
+        optional list of :class:`CommentBlock` matchers, equivalent to
+        :attribute:`search_patterns`, which are used instead of the patterns to match items in
+        linear time. Ignored by subclasses that override :attribute:`search_patterns`.
     matched_items
-        list of log item matches that have been found.
+        :class:`MatchedItems` with the ``(file_path, item)`` pair of each log item match that
+        has been found.
+    matched_lines
+        :class:`LineNumbers` with the first and last line numbers of each of
+        :attribute:`matched_items`.
     parsed_items
         list of parsed log items, which can be inserted into log outputs.
 
     Methods
     -------
+    match(text, line_starts=None, pattern_times=None, spans=None, budget=None)
+        return log items matched in text.
     find_items(text, path)
         search for and store log items from text.
     parse_items()
         parse matched log items into strings.
+    parse_unnumbered(file_path, item)
+        parse a log item without its number.
+    number_item(idx, parsed_item)
+        add an item's number to an item parsed without it.
+    to_record(file_path, item, lines=None)
+        return a matched log item as a dictionary.
     """
 
+    keywords = None
+    comment_blocks = None
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        Compile the subclass' search patterns when it is defined, so that invalid patterns are
+        reported straight away and patterns aren't compiled for each instance.
+        """
+        super().__init_subclass__(**kwargs)
+        search_patterns = vars(cls).get("search_patterns")
+        if isinstance(search_patterns, (list, tuple)):
+            try:
+                for pattern in search_patterns:
+                    compile_search_pattern(pattern)
+            except ValueError as error:
+                raise ValueError(f"{cls.__name__}: {error}") from error
+        elif search_patterns is not None and not isinstance(search_patterns, property):
+            raise TypeError(
+                f"{cls.__name__}: search_patterns must be a list of strings.",
+            )
+
+        if cls.keywords is not None and (
+            isinstance(cls.keywords, str)
+            or not all(isinstance(keyword, str) for keyword in cls.keywords)
+        ):
+            raise TypeError(f"{cls.__name__}: keywords must be a list of strings.")
+
+        # Comment blocks must be defined alongside or after the patterns that they replace
+        cls._use_comment_blocks = cls.comment_blocks is not None and issubclass(
+            _defined_by(cls, "comment_blocks"),
+            _defined_by(cls, "search_patterns"),
+        )
+        # Items are parsed without their numbers unless parse is overridden after
+        # parse_unnumbered, as parse may then do more than number the item
+        cls._parse_unnumbered = (
+            issubclass(
+                _defined_by(cls, "parse_unnumbered"),
+                _defined_by(cls, "parse"),
+            )
+            and _defined_by(cls, "parse_unnumbered") is not LogItem
+        )
+
     def __init__(self):
-        self.matched_items = []
+        self.matched_items = MatchedItems()
+        self.matched_lines = LineNumbers()
         self.parsed_items = []
+        # Items parsed without their numbers, or with their index where they can't be, by file
+        # path and item, from the last write of the log that reused parsed items
+        self._rendered = {}
+        self._patterns = [
+            compile_search_pattern(pattern) for pattern in self.search_patterns
+        ]
+        self._comment_blocks = self.comment_blocks if self._use_comment_blocks else None
+
+    def match(
+        self,
+        text: str,
+        line_starts=None,
+        pattern_times: list = None,
+        spans: list = None,
+        budget=None,
+    ):
+        """
+        Return the log items matched by each of :attribute:`search_patterns` in text, in the
+        same order as ``re.findall``.
+
+        Parameters
+        ----------
+        text
+            a string of text to be searched for log items.
+        line_starts
+            optional sorted offsets of the lines in text that contain one of
+            :attribute:`keywords`. When given, patterns are only tried from these lines.
+        pattern_times
+            optional list with a number of seconds for each of :attribute:`search_patterns`,
+            which the time spent matching each pattern is added to.
+        spans
+            optional list, which the start and end offsets of each match are added to.
+        budget
+            optional :class:`MatchBudget` limiting the time spent matching each pattern.
+
+        Raises
+        ------
+        MatchTimeout
+            if a pattern runs out of time.
+        """
+        items = []
+        for idx, (match, matcher) in enumerate(self._matchers()):
+            start = time.perf_counter()
+            if budget is None:
+                items += match(matcher, text, line_starts, spans)
+            else:
+                with budget.pattern(f"{self.__class__.__name__} pattern {idx + 1}"):
+                    items += match(matcher, text, line_starts, spans)
+            if pattern_times is not None:
+                pattern_times[idx] += time.perf_counter() - start
+        return items
+
+    def _matchers(self):
+        """
+        Return a ``(match, matcher)`` pair for each of :attribute:`search_patterns`, where
+        ``match(matcher, text, line_starts, spans)`` returns the items matched. Comment blocks
+        are used in place of the patterns when they are defined.
+        """
+        if self._comment_blocks is not None:
+            return [(self._match_block, block) for block in self._comment_blocks]
+        return [(self._match_pattern, pattern) for pattern in self._patterns]
+
+    @staticmethod
+    def _match_pattern(pattern, text: str, line_starts=None, spans: list = None):
+        if line_starts is None:
+            if spans is None:
+                return pattern.findall(text)
+            matches = list(pattern.finditer(text))
+        else:
+            matches = []
+            end = 0
+            for start in line_starts:
+                if start < end:
+                    # Already part of the previous match, as with ``re.findall``
+                    continue
+                match = pattern.match(text, start)
+                if match is not None:
+                    matches.append(match)
+                    end = match.end()
+
+        if spans is not None:
+            spans += [match.span() for match in matches]
+        return [_findall_item(match) for match in matches]
+
+    @staticmethod
+    def _match_block(block, text: str, line_starts=None, spans: list = None):
+        items = []
+        end = 0
+        # Headers in a run of comment lines that ends without a newline can't match, so the
+        # run is found once for each indentation rather than read again for every header
+        runs = None if text.endswith("\n") else {}
+        for start in block.header_starts(text) if line_starts is None else line_starts:
+            if start < end:
+                continue
+            if runs is not None:
+                indent = _INDENT.match(text, start).group()
+                if indent not in runs:
+                    runs[indent] = block.unterminated_run(text, indent)
+                if text.find("\n", start) + 1 >= runs[indent]:
+                    continue
+            result = block.match(iter_lines(text, start))
+            if result is not None:
+                items.append(result[0])
+                end = start + result[1]
+                if spans is not None:
+                    spans.append((start, end))
+        return items
 
     def find_items(self, text: str, path: Path):
         """
@@ -98,13 +501,10 @@ class LogItem(_AbstractLogItem):
         path
             path to file containing text, for use in parsing.
         """
-        for pattern in self.search_patterns:
-            for item in re.findall(
-                pattern,
-                text,
-                re.MULTILINE | re.IGNORECASE,
-            ):
-                self.matched_items.append((path, item))
+        spans = []
+        for item in self.match(text, spans=spans):
+            self.matched_items.append((path, item))
+        self.matched_lines += line_numbers(text, spans)
 
     def parse_items(self):
         """
@@ -115,7 +515,87 @@ class LogItem(_AbstractLogItem):
             self.parse(idx, filepath, item)
             for idx, (filepath, item) in enumerate(self.matched_items)
         ]
-        self.matched_items = []
+        self.matched_items = MatchedItems()
+        self.matched_lines = LineNumbers()
+
+    def parse_unnumbered(self, file_path, item):
+        """
+        Parse a log item as :meth:`parse` does, without its number, which is added by
+        :meth:`number_item`. Items parsed this way are reused when the log is written again
+        with the same file path and matched text, even if items before them have been added or
+        removed. Returns None by default, for log item types that only parse items with their
+        index.
+
+        Parameters
+        ----------
+        file_path
+            relative path to the file where the item is found.
+        item
+            an item matched using :attribute:`search_patterns`.
+
+        Returns
+        -------
+        str or None
+            the item for the output log without its number.
+        """
+        return None
+
+    def number_item(self, idx, parsed_item):
+        """
+        Add an item's number to an item parsed by :meth:`parse_unnumbered`. Items aren't
+        numbered by default.
+
+        Parameters
+        ----------
+        idx
+            the index of the item in the list of matched items.
+        parsed_item
+            the item parsed without its number.
+
+        Returns
+        -------
+        str
+            the item for the output log.
+        """
+        return parsed_item
+
+    def to_record(self, file_path, item, lines=None):
+        """
+        Return a matched log item as a dictionary, for the item index. Assumes that items are
+        tuples of the indentation, title, any fields and the detailed description, as for the
+        built-in log items. Subclasses with other items should override this method.
+
+        Parameters
+        ----------
+        file_path
+            relative path to the file where the item is found.
+        item
+            an item matched using :attribute:`search_patterns`.
+        lines
+            optional first and last line numbers of the item in the file.
+
+        Returns
+        -------
+        dict
+            the item's type, title, quality and impact ratings (None for items without
+            ratings), file path, first and last line numbers and detailed description.
+        """
+        if isinstance(item, str):
+            title, description = item, ""
+        else:
+            title = item[1] if len(item) > 1 else item[0]
+            description = _clean_description(item[0], item[-1]) if len(item) > 2 else ""
+        first_line, last_line = lines or (None, None)
+        return {
+            "type": self.__class__.__name__,
+            "title": title.strip(),
+            "quality": None,
+            "impact": None,
+            "path": str(file_path),
+            "first_line": first_line,
+            "last_line": last_line,
+            "description": description,
+        }
 
 
 class Assumption(LogItem):
@@ -145,26 +625,32 @@ class Assumption(LogItem):
         ),
     ]
 
+    comment_blocks = [
+        CommentBlock(
+            r"# ?Assumption: ?(.+)",
+            fields=[r"# ?Q(?:uality)?: ?(.+)", r"# ?I(?:mpact)?: ?(.+)"],
+        ),
+        CommentBlock(
+            r"#' @section Assumption: ?(.+)",
+            fields=[r"#' Q(?:uality)?: ?(.+)", r"#' I(?:mpact)?: ?(.+)"],
+            body_prefix="#' ",
+            continuation_prefix="#'",
+        ),
+    ]
+
+    keywords = ["Assumption:"]
     template_marker = "{ assumptions }"
     empty_message = "Currently no assumptions in this analysis.\n"
 
     def parse(self, idx, file_path, item):
-        detailed_description = re.sub(
-            # Remove indentation and comment hash from detailed description
-            f"\n?{item[0]}#'? ?",
-            "\n",
-            item[4],
-        )
-        detailed_description = re.sub(
-            # Reduce whitespace to single spaces and strip
-            "[ ]{2,}",
-            " ",
-            detailed_description.strip(),
-        )
+        return self.number_item(idx, self.parse_unnumbered(file_path, item))
+
+    def parse_unnumbered(self, file_path, item):
+        detailed_description = _clean_description(item[0], item[4])
 
         assumptions_content = "\n".join(
             [
-                f"### Assumption {idx + 1}: {item[1]}",
+                item[1],
                 "",
                 # Relative path to file
                 f"* Location: `{file_path}`",
@@ -177,6 +663,14 @@ class Assumption(LogItem):
         )
         return assumptions_content
 
+    def number_item(self, idx, parsed_item):
+        return f"### Assumption {idx + 1}: {parsed_item}"
+
+    def to_record(self, file_path, item, lines=None):
+        record = super().to_record(file_path, item, lines)
+        record.update(quality=item[2].strip(), impact=item[3].strip())
+        return record
+
 
 class Caveat(LogItem):
     """
@@ -200,26 +694,29 @@ class Caveat(LogItem):
         ),
     ]
 
+    comment_blocks = [
+        CommentBlock(r"# ?Caveat: ?(.+)", body_required=False),
+        CommentBlock(
+            r"#' @section Caveat: ?(.+)",
+            body_prefix="#' ",
+            continuation_prefix="#'",
+            body_required=False,
+        ),
+    ]
+
+    keywords = ["Caveat:"]
     template_marker = "{ caveats }"
     empty_message = "Currently no caveats in this analysis.\n"
 
     def parse(self, idx, file_path, item):
-        detailed_description = re.sub(
-            # Remove indentation and comment hash from detailed description
-            f"\n?{item[0]}#'? ?",
-            "\n",
-            item[2],
-        )
-        detailed_description = re.sub(
-            # Reduce whitespace to single spaces and strip
-            "[ ]{2,}",
-            " ",
-            detailed_description.strip(),
-        )
+        return self.number_item(idx, self.parse_unnumbered(file_path, item))
+
+    def parse_unnumbered(self, file_path, item):
+        detailed_description = _clean_description(item[0], item[2])
 
         caveat_content = "\n".join(
             [
-                f"### Caveat {idx + 1}: {item[1]}",
+                item[1],
                 "",
                 # Relative path to file
                 f"Location: `{file_path}`",
@@ -230,6 +727,9 @@ class Caveat(LogItem):
         )
         return caveat_content
 
+    def number_item(self, idx, parsed_item):
+        return f"### Caveat {idx + 1}: {parsed_item}"
+
 
 class Debt(LogItem):
     """
@@ -251,26 +751,29 @@ class Debt(LogItem):
         ),
     ]
 
+    comment_blocks = [
+        CommentBlock(r"# ?Debt: (.+)", inline_body=True),
+        CommentBlock(
+            r"#' @section Debt: ?(.+)",
+            body_prefix="#' ",
+            continuation_prefix="#'",
+            body_required=False,
+        ),
+    ]
+
+    keywords = ["Debt:"]
     template_marker = "{ debt }"
     empty_message = "Looks like we're debt free!\n"
 
     def parse(self, idx, file_path, item):
-        debt_item = re.sub(
-            # Remove indentation and comment hash from todo item
-            f"\n?{item[0]}#'? ?",
-            "\n",
-            item[2],
-        )
-        debt_item = re.sub(
-            # Reduce whitespace to single spaces and strip
-            "[ ]{2,}",
-            " ",
-            debt_item.strip(),
-        )
+        return self.number_item(idx, self.parse_unnumbered(file_path, item))
+
+    def parse_unnumbered(self, file_path, item):
+        debt_item = _clean_description(item[0], item[2])
 
         debt_content = "\n".join(
             [
-                f"### Debt {idx + 1}: {item[1]}",
+                item[1],
                 "",
                 # Relative path to file
                 f"Location: `{file_path}`",
@@ -281,6 +784,9 @@ class Debt(LogItem):
         )
         return debt_content
 
+    def number_item(self, idx, parsed_item):
+        return f"### Debt {idx + 1}: {parsed_item}"
+
 
 class Todo(LogItem):
     """
@@ -298,21 +804,20 @@ class Todo(LogItem):
         ),
     ]
 
+    comment_blocks = [CommentBlock(r"# ?TODO: (.+)", body_required=False)]
+
+    keywords = ["TODO:"]
     template_marker = "{ todos }"
     empty_message = "Great, there's nothing to do!\n"
 
     def parse(self, idx, file_path, item):
-        todo_item = item[1] + re.sub(
-            # Remove indentation and comment hash from todo item
-            f"\n?{item[0]}#",
-            "",
-            item[2],
-        )
-        todo_item = re.sub(
-            # Reduce whitespace to single spaces and strip
-            "[ ]{2,}",
-            " ",
-            todo_item.strip(),
-        )
+        return self.parse_unnumbered(file_path, item)
+
+    def parse_unnumbered(self, file_path, item):
+        # Join any following lines onto the todo, without indentation and comment hashes
+        todo_item = item[1]
+        if item[2]:
+            todo_item += _comment_prefix(item[0], "#").sub("", item[2])
+        todo_item = _collapse_spaces(todo_item)
 
         return f"- [ ] {todo_item}"
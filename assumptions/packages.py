@@ -0,0 +1,281 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from assumptions.cache import ScanCache
+from assumptions.log import check_logs
+from assumptions.log import find_log_items
+from assumptions.log import list_files
+from assumptions.log import Log
+from assumptions.sources import PathFilter
+from assumptions.stats import ScanStats
+
+# Files that mark the root directory of a package, for Python and R packages
+PACKAGE_MARKERS = ("setup.py", "pyproject.toml", "DESCRIPTION")
+
+
+def package_roots(files: list, markers: tuple = PACKAGE_MARKERS):
+    """
+    Return the relative paths of the directories containing any of the marker files.
+
+    Parameters
+    ----------
+    files
+        ``(relative_path, path)`` pairs from :func:`list_files`.
+    markers
+        names of files that mark the root directory of a package.
+
+    Returns
+    -------
+    list
+        sorted relative paths of package root directories.
+    """
+    roots = set()
+    for relative_path, _ in files:
+        directory, _, name = relative_path.rpartition("/")
+        if name in markers and directory:
+            roots.add(directory)
+    return sorted(roots)
+
+
+def _owners(files: list, roots: list):
+    """
+    Yield the relative path of the nearest package root containing each file, or None for
+    files outside of all packages.
+    """
+    roots = set(roots)
+    directory_owners = {}
+    for relative_path, _ in files:
+        directory = relative_path.rpartition("/")[0]
+        if directory not in directory_owners:
+            owner = directory
+            while owner and owner not in roots:
+                owner = owner.rpartition("/")[0]
+            directory_owners[directory] = owner or None
+        yield directory_owners[directory]
+
+
+def find_package_logs(
+    logs: list,
+    relative_search_path: str = "",
+    pattern: str = None,
+    extension: str = "",
+    cache: ScanCache = None,
+    jobs: int = 1,
+    source: str = "walk",
+    filenames: list = None,
+    max_file_size: int = None,
+    stats: ScanStats = None,
+    report=print,
+    include: list = None,
+    exclude: list = None,
+    file_time_limit: float = None,
+    pattern_time_limit: float = None,
+):
+    """
+    Search for log items once and split them into separate logs for each package under the
+    search path, for repositories containing many packages. Each file's log items are added to
+    the logs of the nearest package containing the file, with paths relative to the parent of
+    the package directory as if the package had been searched on its own. Log items in files
+    outside of all packages are left out.
+
+    Parameters
+    ----------
+    logs
+        :class:`Log` instances to find log items for. Each package gets a log of the same
+        type, with the same file name, in the package directory. These logs are given all log
+        items found, so that they can be used for an index.
+    relative_search_path
+        relative path to directory that should be searched for log items.
+    pattern
+        optional glob pattern, relative to the search path, matching package directories
+        (e.g. 'packages/*'). By default, directories containing any of ``PACKAGE_MARKERS``
+        are packages.
+    extension
+        file extension to reduce search to specific file types (e.g. '.py').
+    cache
+        optional :class:`ScanCache` of matches from previous searches. See
+        :func:`find_log_items`.
+    jobs
+        number of processes used to read and search files. See :func:`find_log_items`.
+    source
+        how files are found. See :func:`find_log_items`.
+    filenames
+        optional paths to files that have changed, for use with a cache. See
+        :func:`find_log_items`.
+    max_file_size
+        optional size in bytes above which files are skipped.
+    stats
+        optional :class:`ScanStats` to record counts and timings of the search in.
+    report
+        function called with progress messages, which are printed by default.
+    include
+        optional glob patterns of files to search. Package markers are found whether or not
+        they are included. See :class:`PathFilter`.
+    exclude
+        optional glob patterns of files and directories not to search, which also aren't
+        searched for package markers. See :class:`PathFilter`.
+    file_time_limit
+        optional time limit in seconds for matching the log items in each file. See
+        :func:`find_log_items`.
+    pattern_time_limit
+        optional time limit in seconds for matching each search pattern in a file.
+
+    Returns
+    -------
+    dict
+        lists of the :class:`Log` instances for each package, keyed by the package directory.
+    """
+    check_logs(logs, source)
+    search_path = (Path(os.getcwd()) / relative_search_path).resolve()
+    excluded_paths = set() if cache is None else {cache.cache_dir.resolve()}
+
+    walk_start = time.perf_counter()
+    if pattern is None:
+        # Listed without the extension and included patterns, so that package markers are
+        # found in the same walk
+        files = list_files(
+            search_path,
+            "",
+            source,
+            exclude=excluded_paths,
+            path_filter=PathFilter(exclude=exclude) if exclude else None,
+        )
+        roots = package_roots(files)
+        include_filter = PathFilter(include) if include else None
+        files = [
+            (relative_path, path)
+            for relative_path, path in files
+            if path.name.endswith(extension)
+            and (
+                include_filter is None
+                or include_filter.includes(relative_path.partition("/")[2], path.name)
+            )
+        ]
+    else:
+        files = list_files(
+            search_path,
+            extension,
+            source,
+            exclude=excluded_paths,
+            path_filter=PathFilter(include, exclude) if include or exclude else None,
+        )
+        roots = sorted(
+            path.relative_to(search_path.parent).as_posix()
+            for path in search_path.glob(pattern)
+            if path.is_dir()
+        )
+    if stats is not None:
+        stats.walk_time += time.perf_counter() - walk_start
+    report(f"Found {len(roots)} packages under: {search_path}")
+
+    find_log_items(
+        logs,
+        relative_search_path,
+        extension,
+        cache,
+        jobs,
+        source,
+        filenames,
+        max_file_size,
+        stats,
+        report,
+        files,
+        file_time_limit=file_time_limit,
+        pattern_time_limit=pattern_time_limit,
+    )
+
+    package_logs = {}
+    for root in roots:
+        package_logs[root] = []
+        for log in logs:
+            package_log = Log(
+                log._log_type,
+                search_path.parent / root / log._log_file_path.name,
+            )
+            for log_item in log._log_item_types:
+                package_log.add_log_item_type(type(log_item))
+            package_log.stats = stats
+            package_logs[root].append(package_log)
+
+    # Owning package and path relative to the package's parent, shared by each file's items
+    package_paths = {}
+    for (relative_path, _), owner in zip(files, _owners(files, roots)):
+        if owner is not None:
+            prefix = owner.rpartition("/")[0]
+            package_start = len(prefix) + 1 if prefix else 0
+            package_path = relative_path[package_start:]
+            package_paths[relative_path] = (owner, package_path)
+    for idx, log in enumerate(logs):
+        for item_idx, log_item in enumerate(log._log_item_types):
+            lines = log_item.matched_lines
+            if len(lines) != len(log_item.matched_items):
+                lines = [None] * len(log_item.matched_items)
+            for (relative_path, item), item_lines in zip(log_item.matched_items, lines):
+                if relative_path not in package_paths:
+                    continue
+                owner, package_path = package_paths[relative_path]
+                package_item = package_logs[owner][idx]._log_item_types[item_idx]
+                package_item.matched_items.append((package_path, item))
+                if item_lines is not None:
+                    package_item.matched_lines.append(item_lines)
+
+    return {
+        search_path.parent / root: root_logs for root, root_logs in package_logs.items()
+    }
+
+
+def write_package_logs(
+    package_logs: dict,
+    template_path: str = None,
+    dry_run: bool = False,
+    jobs: int = 1,
+    report=print,
+):
+    """
+    Write the logs of several packages, several at a time. See :meth:`Log.write_log`.
+
+    Parameters
+    ----------
+    package_logs
+        lists of :class:`Log` instances for each package, from :func:`find_package_logs`.
+    template_path
+        path to the output log template. Uses the built-in template for each log type by
+        default.
+    dry_run
+        whether to skip writing logs.
+    jobs
+        number of logs to write at once. Zero uses four more than the number of CPUs, up to
+        32, as ``ThreadPoolExecutor`` does by default from Python 3.8.
+    report
+        function called with progress messages, which are printed by default.
+
+    Returns
+    -------
+    dict
+        whether each log has changed, keyed by the path to the log.
+    """
+    logs = [log for root_logs in package_logs.values() for log in root_logs]
+    # Logs share their statistics, which aren't thread safe, so each log's write is recorded
+    # separately and added to them once every log is written
+    shared_stats = [log.stats for log in logs]
+    for log in logs:
+        if log.stats is not None:
+            log.stats = ScanStats()
+    try:
+        # Given explicitly, as the default number of threads differs before Python 3.8
+        max_workers = jobs or min(32, (os.cpu_count() or 1) + 4)
+        with ThreadPoolExecutor(max_workers) as executor:
+            changed = list(
+                executor.map(
+                    lambda log: log.write_log(template_path, dry_run, report=report),
+                    logs,
+                ),
+            )
+    finally:
+        for log, stats in zip(logs, shared_stats):
+            if stats is not None:
+                stats.merge(log.stats)
+            log.stats = stats
+    return {log._log_file_path: log_changed for log, log_changed in zip(logs, changed)}
@@ -0,0 +1,155 @@
+import math
+import time
+
+from assumptions.budget import MatchBudget
+from assumptions.budget import MatchTimeout
+
+# Sizes in characters of the sample text that patterns are matched against, doubling each time
+SAMPLE_SIZES = (10_000, 20_000, 40_000, 80_000, 160_000)
+
+# Growth in matching time with the size of text, as the power of the size, above which a pattern
+# is flagged. Linear patterns have a growth of about 1, and quadratic patterns about 2
+MAX_GROWTH = 1.5
+
+# Patterns that match the largest sample faster than this are never flagged, as their timings
+# are mostly noise
+_MIN_FLAGGED_SECONDS = 0.001
+
+
+def _samples(keyword: str):
+    """
+    Return functions that make sample text of about a number of characters, which start with
+    the keyword. Each sample is likely to make a different kind of pattern backtrack, e.g. a
+    long line for patterns with nested repeats, or a long comment for patterns that match the
+    rest of a comment lazily.
+    """
+    header = f"# {keyword} a"
+    return {
+        "long line": lambda size: header + "a" * size + "!\n",
+        "long whitespace": lambda size: header + " \t" * (size // 2) + "!\n",
+        "long comment": lambda size: header + "\n" + "# a a\n" * (size // 6),
+        "many items": lambda size: (header + "\n") * (size // (len(header) + 1)),
+        "indented lines": lambda size: header + "\n" + "    #\n" * (size // 6) + "x\n",
+    }
+
+
+def _growth(sizes: list, seconds: list):
+    """
+    Return the power of the text size that matching time grows with, from a least squares fit
+    of the logs of the times to the logs of the sizes, or None if there are fewer than two
+    timings. Fitting all timings is less affected by noise than comparing two of them.
+    """
+    if len(seconds) < 2 or min(seconds) <= 0:
+        return None
+    xs = [math.log(size) for size in sizes[: len(seconds)]]
+    ys = [math.log(elapsed) for elapsed in seconds]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    return covariance / sum((x - mean_x) ** 2 for x in xs)
+
+
+def profile_patterns(
+    log_item_types: list,
+    sizes: tuple = SAMPLE_SIZES,
+    time_limit: float = 1.0,
+    max_growth: float = MAX_GROWTH,
+    repeat: int = 3,
+):
+    """
+    Measure how the time taken to match each search pattern of some log item types grows with
+    the size of the text searched, to find patterns that backtrack catastrophically before
+    they are used. Each pattern is matched against several kinds of sample text of growing
+    size, starting with the log item type's first keyword, as it is when files are searched
+    without the keyword prefilter. Comment blocks are measured in place of the patterns that
+    they replace.
+
+    Parameters
+    ----------
+    log_item_types
+        :class:`LogItem` subclasses, or instances of them, to profile.
+    sizes
+        increasing sizes in characters of the sample text.
+    time_limit
+        time limit in seconds for matching a pattern against a sample. Larger samples aren't
+        tried once a pattern runs out of time.
+    max_growth
+        power of the text size above which a pattern's growth in matching time is flagged.
+    repeat
+        number of times each sample is matched, taking the fastest time.
+
+    Returns
+    -------
+    list
+        a dictionary for each pattern and kind of sample, with the log item type's class name,
+        the index of the pattern in its :attribute:`search_patterns`, the sample's name, the
+        sizes matched and the fastest time for each, the growth in time with size, whether
+        the pattern ran out of time and the size it ran out of time on, and whether it is
+        flagged as super-linear.
+    """
+    budget = MatchBudget(pattern_seconds=time_limit)
+    profiles = []
+    for log_item in log_item_types:
+        if isinstance(log_item, type):
+            log_item = log_item()
+        class_name = log_item.__class__.__name__
+        keyword = log_item.keywords[0] if log_item.keywords else ""
+        for idx, (match, matcher) in enumerate(log_item._matchers()):
+            name = f"{class_name} pattern {idx + 1}"
+            for sample_name, sample in _samples(keyword).items():
+                seconds = []
+                timed_out = False
+                for size in sizes:
+                    text = sample(size)
+                    fastest = None
+                    try:
+                        for _ in range(repeat):
+                            start = time.perf_counter()
+                            with budget.file(), budget.pattern(name):
+                                match(matcher, text)
+                            elapsed = time.perf_counter() - start
+                            fastest = (
+                                elapsed if fastest is None else min(fastest, elapsed)
+                            )
+                    except MatchTimeout:
+                        timed_out = True
+                        break
+                    seconds.append(fastest)
+
+                growth = _growth(sizes, seconds)
+                profiles.append(
+                    {
+                        "type": class_name,
+                        "pattern": idx,
+                        "sample": sample_name,
+                        "sizes": list(sizes[: len(seconds)]),
+                        "seconds": seconds,
+                        "growth": growth,
+                        "timed_out": timed_out,
+                        "timed_out_size": sizes[len(seconds)] if timed_out else None,
+                        "flagged": timed_out
+                        or (
+                            growth is not None
+                            and growth > max_growth
+                            and seconds[-1] >= _MIN_FLAGGED_SECONDS
+                        ),
+                    },
+                )
+    return profiles
+
+
+def format_profiles(profiles: list):
+    """Return a table of the results of :func:`profile_patterns`, for printing."""
+    lines = [f"{'Pattern':<28}{'Sample':<22}{'Largest':>10}{'Time':>11}{'Growth':>8}"]
+    for profile in profiles:
+        name = f"{profile['type']} pattern {profile['pattern'] + 1}"
+        largest = f"{profile['sizes'][-1]:,}" if profile["sizes"] else "-"
+        seconds = f"{profile['seconds'][-1]:.4f}s" if profile["seconds"] else "-"
+        growth = "-" if profile["growth"] is None else f"n^{profile['growth']:.1f}"
+        line = f"{name:<28}{profile['sample']:<22}{largest:>10}{seconds:>11}{growth:>8}"
+        if profile["timed_out"]:
+            line += f"  TIMED OUT at {profile['timed_out_size']:,}"
+        elif profile["flagged"]:
+            line += "  SUPER-LINEAR"
+        lines.append(line)
+    return "\n".join(lines)
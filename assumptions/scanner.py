@@ -0,0 +1,526 @@
+import itertools
+import locale
+import mmap
+import os
+import re
+import time
+
+from assumptions.budget import MatchBudget
+from assumptions.budget import MatchTimeout
+from assumptions.cache import content_digest
+from assumptions.log_items import line_numbers
+
+# Results of scanning a file that was not searched
+UNCHANGED = "unchanged"
+UNREADABLE = "unreadable"
+BINARY = "binary"
+TOO_LARGE = "too large"
+TIMED_OUT = "timed out"
+
+# Binary files are detected by a null byte near the start of the file, as git does
+_BINARY_SNIFF_SIZE = 8000
+
+# Non-ASCII characters that ``re.IGNORECASE`` matches to ASCII letters
+_NON_ASCII_CASES = {"i": "\u0130\u0131", "k": "\u212a", "s": "\u017f"}
+
+# Number of files taken from an iterable at a time, for each job, when scanning in parallel.
+# Limits how many files are held in memory when scanning a stream of contents
+_STREAM_BATCH_SIZE = 64
+
+# Scanner used by each worker process, see :meth:`Scanner.scan_files`
+_worker_scanner = None
+
+
+def _init_worker(scanner):
+    global _worker_scanner
+    _worker_scanner = scanner
+
+
+def _scan_in_worker(task):
+    method, args = task
+    return getattr(_worker_scanner, method)(*args)
+
+
+def _scan_with_stats_in_worker(task):
+    # Statistics are returned for each file, to be merged in the parent process
+    _worker_scanner.stats = type(_worker_scanner.stats)()
+    return _scan_in_worker(task), _worker_scanner.stats
+
+
+def decode(data, encoding: str = None):
+    """
+    Decode file contents as ``open(path, "r")`` would, with universal newlines. Data can be
+    any bytes-like object, such as a memory-mapped file.
+    """
+    return normalise_newlines(str(data, encoding or locale.getpreferredencoding(False)))
+
+
+def normalise_newlines(text: str):
+    """Replace Windows and old Mac newlines with ``\\n``, as universal newlines mode would."""
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def _byte_pattern(keyword: str, encoding: str):
+    """
+    Return a bytes regex pattern that matches the encoded keyword wherever
+    ``re.IGNORECASE`` would match the keyword in decoded text. Returns None if the keyword
+    isn't ASCII or the encoding isn't ASCII compatible.
+    """
+    try:
+        if keyword.encode(encoding) != keyword.encode("ascii"):
+            return None
+    except UnicodeError:
+        return None
+
+    parts = []
+    for char in keyword:
+        alternatives = [re.escape(char.encode("ascii"))]
+        for variant in _NON_ASCII_CASES.get(char.lower(), ""):
+            try:
+                alternatives.append(re.escape(variant.encode(encoding)))
+            except UnicodeError:
+                pass
+        if len(alternatives) == 1:
+            parts.append(alternatives[0])
+        else:
+            parts.append(b"(?:" + b"|".join(alternatives) + b")")
+    return b"".join(parts)
+
+
+def _check_jobs(jobs: int):
+    """Raise a ValueError for a number of jobs that is negative, before any scanning starts."""
+    if jobs < 0:
+        raise ValueError(
+            f"The number of jobs must be at least 1, or 0 for one per CPU, not {jobs}.",
+        )
+
+
+class Scanner:
+    """
+    Searches text for several :class:`LogItem` types in one pass over the text.
+
+    A case-insensitive search for the literal :attribute:`keywords` of every log item type
+    finds the lines where log items could start. Full search patterns are only tried from
+    those lines, so text without any markers is rejected after a single scan. Log item types
+    without keywords are searched with their full patterns.
+
+    Files are memory-mapped and searched for the encoded keywords before they are decoded, so
+    files without keywords are never decoded or copied into memory. Binary files, which have a
+    null byte near their start, are skipped.
+
+    Parameters
+    ----------
+    log_item_types
+        :class:`LogItem` instances to search for.
+    max_file_size
+        optional size in bytes above which files are skipped.
+    digests
+        whether to compute the content digest of each file read, for caching.
+    stats
+        optional :class:`ScanStats` to record the files read and the time spent matching in.
+    file_time_limit
+        optional time limit in seconds for matching the log items in each file. Files that
+        take longer are skipped. See :class:`MatchBudget`.
+    pattern_time_limit
+        optional time limit in seconds for matching each search pattern in a file. Files that
+        take longer are skipped.
+
+    Methods
+    -------
+    scan(text)
+        find the log items of each type in text.
+    scan_file(path, cached_digest=None)
+        read a file and find the log items of each type in it.
+    scan_files(files, jobs=1)
+        scan several files, optionally in parallel.
+    scan_content(path, data)
+        find the log items of each type in the contents of a file that has already been read.
+    scan_contents(contents, jobs=1)
+        scan the contents of several files, optionally in parallel.
+    scan_archive(path, extension='')
+        find the log items of each type in each file in a zip or tar archive.
+    scan_archives(paths, extension='', jobs=1)
+        scan several archives, optionally in parallel.
+    """
+
+    def __init__(
+        self,
+        log_item_types: list,
+        max_file_size: int = None,
+        digests: bool = True,
+        stats=None,
+        file_time_limit: float = None,
+        pattern_time_limit: float = None,
+    ):
+        if max_file_size is not None and max_file_size < 0:
+            raise ValueError(
+                f"The maximum file size can't be negative, not {max_file_size}.",
+            )
+        self.log_item_types = list(log_item_types)
+        self.max_file_size = max_file_size
+        self.digests = digests
+        self.stats = stats
+        self.budget = None
+        if file_time_limit is not None or pattern_time_limit is not None:
+            self.budget = MatchBudget(file_time_limit, pattern_time_limit)
+        self.encoding = locale.getpreferredencoding(False)
+
+        keywords = []
+        self._keyword_owners = []
+        self._unfiltered = []
+        for idx, log_item in enumerate(self.log_item_types):
+            if log_item.keywords is None:
+                self._unfiltered.append(idx)
+                continue
+            for keyword in log_item.keywords:
+                keywords.append(keyword)
+                self._keyword_owners.append(idx)
+
+        self._prefilter = None
+        self._byte_prefilter = None
+        if keywords:
+            self._prefilter = re.compile(
+                "|".join(f"({re.escape(keyword)})" for keyword in keywords),
+                re.IGNORECASE,
+            )
+            byte_patterns = [
+                _byte_pattern(keyword, self.encoding) for keyword in keywords
+            ]
+            if not self._unfiltered and None not in byte_patterns:
+                self._byte_prefilter = re.compile(
+                    b"|".join(byte_patterns),
+                    re.IGNORECASE,
+                )
+
+    def _candidate_lines(self, text: str):
+        """Map log item type indices to the sorted starts of lines containing their keywords."""
+        candidates = {}
+        if self._prefilter is None:
+            return candidates
+
+        match = self._prefilter.search(text)
+        while match is not None:
+            idx = self._keyword_owners[match.lastindex - 1]
+            line_start = text.rfind("\n", 0, match.start()) + 1
+            line_starts = candidates.setdefault(idx, [])
+            if not line_starts or line_starts[-1] != line_start:
+                line_starts.append(line_start)
+            # Step one character on, so that overlapping keywords are all found
+            match = self._prefilter.search(text, match.start() + 1)
+        return candidates
+
+    def scan(self, text: str, lines: list = None):
+        """
+        Find log items in text.
+
+        Parameters
+        ----------
+        text
+            a string of text to be searched for log items.
+        lines
+            optional list, which a list of the first and last line numbers of each matched
+            item is added to for each log item type.
+
+        Returns
+        -------
+        list
+            a list of matched items for each log item type, in the order of
+            :attribute:`log_item_types`.
+
+        Raises
+        ------
+        MatchTimeout
+            if matching runs out of time, when there are time limits.
+        """
+        if self.budget is None:
+            return self._scan(text, lines)
+        with self.budget.file():
+            return self._scan(text, lines)
+
+    def _scan(self, text: str, lines: list = None):
+        results = [[] for _ in self.log_item_types]
+        spans = [[] for _ in self.log_item_types]
+        to_match = [(idx, None) for idx in self._unfiltered]
+        to_match += self._candidate_lines(text).items()
+        for idx, line_starts in to_match:
+            log_item = self.log_item_types[idx]
+            if self.stats is None:
+                results[idx] = log_item.match(
+                    text,
+                    line_starts,
+                    spans=spans[idx],
+                    budget=self.budget,
+                )
+                continue
+
+            class_name = log_item.__class__.__name__
+            pattern_times = [0.0] * len(log_item.search_patterns)
+            start = time.perf_counter()
+            results[idx] = log_item.match(
+                text,
+                line_starts,
+                pattern_times,
+                spans[idx],
+                self.budget,
+            )
+            self.stats.match_times[class_name] += time.perf_counter() - start
+            for pattern_idx, seconds in enumerate(pattern_times):
+                self.stats.pattern_times[class_name, pattern_idx] += seconds
+
+        if lines is not None:
+            lines += [line_numbers(text, type_spans) for type_spans in spans]
+        return results
+
+    def scan_file(self, path, cached_digest: str = None):
+        """
+        Read a file and find log items in it.
+
+        Parameters
+        ----------
+        path
+            path to the file.
+        cached_digest
+            optional content digest of the file when it was last scanned.
+
+        Returns
+        -------
+        tuple
+            the file's content digest, or None if digests aren't computed, its results from
+            :meth:`scan` and the line numbers of its matches. Results are ``UNCHANGED`` if the
+            digest matches ``cached_digest``, ``TOO_LARGE`` if the file is larger than
+            :attribute:`max_file_size`, ``BINARY`` for binary files, ``UNREADABLE`` if the
+            file could not be decoded, in which case line numbers are None, or ``TIMED_OUT``
+            if matching ran out of time, in which case line numbers are replaced by a
+            description of the time limit that was exceeded.
+        """
+        if self.stats is None:
+            return self._scan_file(path, cached_digest)
+
+        start = time.perf_counter()
+        digest, results, lines = self._scan_file(path, cached_digest)
+        self.stats.add_file(str(path), time.perf_counter() - start, results)
+        return digest, results, lines
+
+    def _scan_file(self, path, cached_digest: str = None):
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if self.max_file_size is not None and size > self.max_file_size:
+                return None, TOO_LARGE, None
+            if self.stats is not None:
+                self.stats.bytes_read += size
+            if size == 0:
+                return self._scan_data(b"", cached_digest)
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # Not all files can be mapped, e.g. on some network file systems
+                return self._scan_data(f.read(), cached_digest)
+            with data:
+                return self._scan_data(data, cached_digest)
+
+    def _scan_data(self, data, cached_digest: str = None):
+        """Scan file contents, which can be any bytes-like object."""
+        digest = content_digest(data) if self.digests else None
+        if digest is not None and digest == cached_digest:
+            return digest, UNCHANGED, None
+        if data.find(b"\0", 0, _BINARY_SNIFF_SIZE) != -1:
+            return digest, BINARY, None
+        if (
+            self._byte_prefilter is not None
+            and self._byte_prefilter.search(data) is None
+        ):
+            return (
+                digest,
+                [[] for _ in self.log_item_types],
+                [[] for _ in self.log_item_types],
+            )
+        try:
+            text = decode(data, self.encoding)
+        except UnicodeDecodeError:
+            return digest, UNREADABLE, None
+        return self._scan_text(text, digest)
+
+    def _scan_text(self, text: str, digest: str = None):
+        """Scan decoded text, skipping it if matching runs out of time."""
+        lines = []
+        try:
+            return digest, self.scan(text, lines), lines
+        except MatchTimeout as error:
+            return digest, TIMED_OUT, str(error)
+
+    def scan_archive(self, path, extension: str = ""):
+        """
+        Find log items in each file in a zip or tar archive, reading one file at a time from
+        the archive without extracting it.
+
+        Parameters
+        ----------
+        path
+            path to the archive.
+        extension
+            file extension to reduce search to specific file types (e.g. '.py').
+
+        Returns
+        -------
+        list
+            the path of each file within the archive, with its result from :meth:`scan_file`.
+            If the archive can't be read, the only file is None, with ``UNREADABLE`` results.
+        """
+        # Only imported when archives are searched, to keep start up fast
+        from assumptions.archives import ARCHIVE_ERRORS
+        from assumptions.archives import archive_members
+        from assumptions.archives import MEMBER_SEPARATOR
+
+        scanned = []
+        try:
+            for member, data in archive_members(path, extension, self.max_file_size):
+                start = time.perf_counter()
+                if data is None:
+                    result = None, TOO_LARGE, None
+                else:
+                    if self.stats is not None:
+                        self.stats.bytes_read += len(data)
+                    result = self._scan_data(data)
+                if self.stats is not None:
+                    member_path = f"{path}{MEMBER_SEPARATOR}{member}"
+                    self.stats.add_file(
+                        member_path,
+                        time.perf_counter() - start,
+                        result[1],
+                    )
+                scanned.append((member, result))
+        except ARCHIVE_ERRORS:
+            return [(None, (None, UNREADABLE, None))]
+        return scanned
+
+    def scan_content(self, path, data):
+        """
+        Find log items in the contents of a file that has already been read, e.g. from a
+        database, without using the file system.
+
+        Parameters
+        ----------
+        path
+            path of the file, used for statistics.
+        data
+            contents of the file, as text or as bytes in :attribute:`encoding`.
+
+        Returns
+        -------
+        tuple
+            as returned by :meth:`scan_file`. Digests aren't computed for text.
+        """
+        start = time.perf_counter()
+        if self.max_file_size is not None and len(data) > self.max_file_size:
+            result = None, TOO_LARGE, None
+        else:
+            if self.stats is not None:
+                self.stats.bytes_read += len(data)
+            if isinstance(data, str):
+                result = self._scan_text(normalise_newlines(data))
+            else:
+                result = self._scan_data(data)
+        if self.stats is not None:
+            self.stats.add_file(str(path), time.perf_counter() - start, result[1])
+        return result
+
+    def _scan_all(self, method: str, tasks, jobs: int = 1):
+        """
+        Call a scanning method with each of the tasks' arguments, optionally in parallel. Tasks
+        can be any iterable, which is read in batches when it has no length.
+        """
+        jobs = jobs or os.cpu_count() or 1
+        if jobs == 1 or (hasattr(tasks, "__len__") and len(tasks) < 2):
+            for args in tasks:
+                yield getattr(self, method)(*args)
+            return
+
+        # Only imported when needed, as it is slow to import
+        import multiprocessing
+
+        if hasattr(tasks, "__len__"):
+            jobs = min(jobs, len(tasks))
+            batches = [tasks]
+            chunksize = max(1, len(tasks) // (jobs * 4))
+        else:
+            tasks = iter(tasks)
+            batches = iter(
+                lambda: list(itertools.islice(tasks, jobs * _STREAM_BATCH_SIZE)),
+                [],
+            )
+            chunksize = _STREAM_BATCH_SIZE // 4
+            # Processes aren't started unless there is more than one task
+            first_batch = next(batches, [])
+            if len(first_batch) < 2:
+                for args in first_batch:
+                    yield getattr(self, method)(*args)
+                return
+            batches = itertools.chain([first_batch], batches)
+        with multiprocessing.Pool(jobs, _init_worker, (self,)) as pool:
+            for batch in batches:
+                batch = [(method, args) for args in batch]
+                if self.stats is None:
+                    yield from pool.imap(_scan_in_worker, batch, chunksize)
+                    continue
+
+                for result, stats in pool.imap(
+                    _scan_with_stats_in_worker,
+                    batch,
+                    chunksize,
+                ):
+                    self.stats.merge(stats)
+                    yield result
+
+    def scan_files(self, files: list, jobs: int = 1):
+        """
+        Scan several files, in parallel when more than one job is used. Results are yielded in
+        the same order as the files, however many jobs are used.
+
+        Parameters
+        ----------
+        files
+            list of ``(path, cached_digest)`` pairs, as taken by :meth:`scan_file`.
+        jobs
+            number of processes to scan files with. Zero uses one process per CPU.
+        """
+        _check_jobs(jobs)
+        return self._scan_all("scan_file", files, jobs)
+
+    def scan_contents(self, contents, jobs: int = 1):
+        """
+        Scan the contents of several files, in parallel when more than one job is used. Results
+        are yielded in the same order as the contents, however many jobs are used.
+
+        Parameters
+        ----------
+        contents
+            iterable of ``(path, data)`` pairs, as taken by :meth:`scan_content`, such as a
+            generator. Only a limited number of files are read from it at a time.
+        jobs
+            number of processes to scan files with. Zero uses one process per CPU.
+        """
+        _check_jobs(jobs)
+        return self._scan_all("scan_content", contents, jobs)
+
+    def scan_archives(self, paths: list, extension: str = "", jobs: int = 1):
+        """
+        Scan the files in several archives, in parallel when more than one job is used. Results
+        from :meth:`scan_archive` are yielded in the same order as the archives.
+
+        Parameters
+        ----------
+        paths
+            paths to the archives.
+        extension
+            file extension to reduce search to specific file types (e.g. '.py').
+        jobs
+            number of processes to scan archives with. Zero uses one process per CPU.
+        """
+        _check_jobs(jobs)
+        return self._scan_all(
+            "scan_archive",
+            [(path, extension) for path in paths],
+            jobs,
+        )
@@ -0,0 +1,340 @@
+import fnmatch
+import os
+import re
+import subprocess
+from pathlib import Path
+
+
+def _glob_pattern(patterns: list):
+    """Compile glob patterns into a single regex, or return None if there are none."""
+    if not patterns:
+        return None
+    return re.compile(
+        "|".join(f"(?:{fnmatch.translate(pattern)})" for pattern in patterns),
+    )
+
+
+class PathFilter:
+    """
+    Glob patterns of files to include in a search and of files and directories to exclude
+    from it. Patterns containing a '/' are matched against paths relative to the search path
+    (e.g. 'src/*.py'), and other patterns against file and directory names (e.g. 'build').
+    Matching is case sensitive, and '*' matches any characters including '/'.
+
+    Parameters
+    ----------
+    include
+        patterns of files to search. All files are searched by default.
+    exclude
+        patterns of files and directories not to search, including all files under excluded
+        directories. Takes precedence over ``include``.
+
+    Methods
+    -------
+    excludes(relative_path, name)
+        return whether a file or directory is excluded.
+    includes(relative_path, name)
+        return whether a file is searched, if its directory isn't excluded.
+    matches(relative_path)
+        return whether a file is searched, checking each of its directories.
+    """
+
+    def __init__(self, include: list = None, exclude: list = None):
+        self._include = _glob_pattern(include)
+        self._exclude = _glob_pattern(exclude)
+
+    def _match(self, pattern, relative_path: str, name: str):
+        # Names are matched on their own, and relative paths in full, by the same regex
+        return (
+            pattern.match(name) is not None or pattern.match(relative_path) is not None
+        )
+
+    def excludes(self, relative_path: str, name: str):
+        """Return whether a file or directory is excluded, given its path and name."""
+        return self._exclude is not None and self._match(
+            self._exclude,
+            relative_path,
+            name,
+        )
+
+    def includes(self, relative_path: str, name: str):
+        """
+        Return whether a file is searched, given its path and name, if the directories it is
+        in aren't excluded.
+        """
+        if self.excludes(relative_path, name):
+            return False
+        return self._include is None or self._match(self._include, relative_path, name)
+
+    def matches(self, relative_path: str):
+        """
+        Return whether a file is searched, given its path relative to the search path, checking
+        whether any of the directories it is in are excluded.
+        """
+        parts = relative_path.split("/")
+        for idx in range(1, len(parts)):
+            if self.excludes("/".join(parts[:idx]), parts[idx - 1]):
+                return False
+        return self.includes(relative_path, parts[-1])
+
+
+def _scandir_files(search_path: Path, extension: str, path_filter: PathFilter):
+    """
+    Yield the files under a directory as they are found, without descending into excluded
+    directories. Whether each entry is a file or directory is usually known from listing its
+    directory, so entries are rarely checked with a separate stat.
+
+    Symlinks to directories aren't followed, so that links back up the tree can't make the
+    walk loop forever. Directories and entries that can't be read are skipped.
+    """
+    directories = [(os.fspath(search_path), "")]
+    while directories:
+        directory, prefix = directories.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    relative_path = prefix + entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if path_filter is None or not path_filter.excludes(
+                                relative_path,
+                                entry.name,
+                            ):
+                                directories.append((entry.path, relative_path + "/"))
+                        elif (
+                            entry.name.endswith(extension)
+                            and (
+                                path_filter is None
+                                or path_filter.includes(relative_path, entry.name)
+                            )
+                            and entry.is_file()
+                        ):
+                            yield Path(entry.path)
+                    except OSError:
+                        # Entries that can't be stat'ed are skipped
+                        continue
+        except OSError:
+            # Includes errors part way through listing a directory
+            continue
+
+
+def walk_files(
+    search_path: Path,
+    extension: str = "",
+    paths: list = None,
+    path_filter: PathFilter = None,
+):
+    """
+    Yield all files under a directory, optionally with a specific file extension, as they are
+    found.
+
+    Parameters
+    ----------
+    search_path
+        directory to search under.
+    extension
+        file extension to reduce search to specific file types (e.g. '.py').
+    paths
+        optional absolute paths to yield, if they are files under the directory, instead of
+        walking the whole directory.
+    path_filter
+        optional :class:`PathFilter` of files to include and exclude. Excluded directories
+        aren't walked.
+    """
+    if paths is None:
+        yield from _scandir_files(search_path, extension, path_filter)
+        return
+
+    for path in paths:
+        if not path.name.endswith(extension) or search_path not in path.parents:
+            continue
+        if path_filter is not None and not path_filter.matches(
+            path.relative_to(search_path).as_posix(),
+        ):
+            continue
+        if path.is_file():
+            yield path
+
+
+def _git(command: list, cwd: Path):
+    return subprocess.run(
+        command,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+    ).stdout
+
+
+def git_commit(search_path: Path, ref: str = "HEAD"):
+    """
+    Return the full ID of a git commit, e.g. of a branch name.
+
+    Raises
+    ------
+    subprocess.CalledProcessError
+        if the directory isn't in a git working tree or ref isn't a commit.
+    """
+    output = _git(
+        ["git", "rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}"],
+        search_path,
+    )
+    return output.decode("utf-8").strip()
+
+
+def git_files(
+    search_path: Path,
+    extension: str = "",
+    paths: list = None,
+    path_filter: PathFilter = None,
+):
+    """
+    Yield the files under a directory that git tracks, or would track, without walking the
+    directory. Lists tracked files from the git index and untracked files that aren't ignored
+    by ``.gitignore``. Tracked files that have been deleted are not included.
+
+    Parameters
+    ----------
+    search_path
+        directory within a git working tree to search under.
+    extension
+        file extension to reduce search to specific file types (e.g. '.py').
+    paths
+        optional absolute paths to yield, if git would list them, instead of listing every
+        file under the directory.
+    path_filter
+        optional :class:`PathFilter` of files to include and exclude.
+
+    Raises
+    ------
+    subprocess.CalledProcessError
+        if the directory isn't in a git working tree.
+    """
+    command = ["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard"]
+    if paths is not None:
+        pathspecs = [
+            f":(literal){path.relative_to(search_path).as_posix()}"
+            for path in paths
+            if search_path in path.parents
+        ]
+        if not pathspecs:
+            return
+        command += ["--", *pathspecs]
+    output = _git(command, search_path)
+    # Files with merge conflicts are listed once for each stage
+    relative_paths = sorted(set(output.decode("utf-8").split("\0")) - {""})
+    for relative_path in relative_paths:
+        if not relative_path.endswith(extension):
+            continue
+        if path_filter is not None and not path_filter.matches(relative_path):
+            continue
+        path = search_path / relative_path
+        if path.is_file():
+            yield path
+
+
+def git_ignored_directories(search_path: Path, directories: list):
+    """
+    Return the directories that git ignores, so that none of the files under them would be
+    listed by :func:`git_files`. Directories with tracked files under them aren't ignored.
+
+    Parameters
+    ----------
+    search_path
+        directory within a git working tree.
+    directories
+        absolute paths of directories under the search path to check.
+
+    Returns
+    -------
+    set
+        absolute paths of the ignored directories.
+
+    Raises
+    ------
+    subprocess.CalledProcessError
+        if the directory isn't in a git working tree.
+    """
+    relative_paths = {
+        directory.relative_to(search_path).as_posix(): directory
+        for directory in directories
+    }
+    if not relative_paths:
+        return set()
+    command = ["git", "check-ignore", "-z", "--stdin"]
+    result = subprocess.run(
+        command,
+        cwd=search_path,
+        input="\0".join(relative_paths).encode("utf-8"),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    # Exits with 1 when none of the paths are ignored
+    if result.returncode not in (0, 1):
+        raise subprocess.CalledProcessError(
+            result.returncode,
+            command,
+            result.stdout,
+            result.stderr,
+        )
+    ignored = set(result.stdout.decode("utf-8").split("\0")) - {""}
+    return {relative_paths[relative_path] for relative_path in ignored}
+
+
+def git_changed_files(search_path: Path, ref: str):
+    """
+    Return the files under a directory that differ from a git commit, including uncommitted
+    changes and untracked files that aren't ignored. Renamed files are given under both their
+    old and new paths, so that the old path is known to have been removed.
+
+    Parameters
+    ----------
+    search_path
+        directory within a git working tree to search under.
+    ref
+        git commit to compare to, e.g. 'main' or a commit hash.
+
+    Returns
+    -------
+    dict
+        git status of each changed file ('A', 'M', 'D', 'R', etc.), keyed by its absolute
+        path. Untracked files have status 'A'. Old paths of renamed files have status 'D'.
+
+    Raises
+    ------
+    subprocess.CalledProcessError
+        if the directory isn't in a git working tree or ref isn't a commit.
+    """
+    output = _git(
+        ["git", "diff", "-z", "--name-status", "-M", "--relative", ref, "--"],
+        search_path,
+    )
+    fields = output.decode("utf-8").split("\0")
+    changed = {}
+    idx = 0
+    while idx < len(fields) and fields[idx]:
+        # Renames and copies have a similarity score, and the old and new paths
+        status = fields[idx][0]
+        if status in "RC":
+            if status == "R":
+                changed[search_path / fields[idx + 1]] = "D"
+            changed[search_path / fields[idx + 2]] = "A" if status == "C" else status
+            idx += 3
+        else:
+            changed[search_path / fields[idx + 1]] = status
+            idx += 2
+
+    untracked = _git(
+        ["git", "ls-files", "-z", "--others", "--exclude-standard"],
+        search_path,
+    )
+    for relative_path in untracked.decode("utf-8").split("\0"):
+        if relative_path:
+            changed[search_path / relative_path] = "A"
+    return changed
+
+
+FILE_SOURCES = {
+    "walk": walk_files,
+    "git": git_files,
+}
@@ -0,0 +1,174 @@
+import heapq
+from collections import Counter
+
+from assumptions.scanner import UNCHANGED
+
+
+class ScanStats:
+    """
+    Counts and timings from searching for log items and writing logs, for finding out what
+    makes a search slow.
+
+    Times are in seconds. When files are searched in parallel, reading and matching times are
+    summed over all processes, so they can add up to more than the elapsed time.
+
+    Attributes
+    ----------
+    files_visited
+        number of files found under the search path.
+    files_cached
+        number of files whose log items were taken from the cache without reading them.
+    files_read
+        number of files opened by the search.
+    files_unchanged
+        number of files that were read, but whose contents were unchanged since they were
+        cached, so weren't searched.
+    files_skipped
+        number of files skipped for each reason (e.g. 'binary').
+    files_matched
+        number of files containing at least one log item.
+    bytes_read
+        total size of the files read.
+    walk_time
+        time spent listing files.
+    scan_time
+        time spent reading and searching files, including matching.
+    match_times
+        time spent matching each :class:`LogItem` class, by class name.
+    pattern_times
+        time spent matching each search pattern, by class name and the index of the pattern in
+        the class' :attribute:`search_patterns`.
+    parse_times
+        time spent parsing the items of each :class:`LogItem` class, by class name.
+    write_times
+        time spent writing each log, other than parsing, by output file path.
+    file_times
+        time spent reading and searching each file, by path.
+
+    Methods
+    -------
+    add_file(path, seconds, results)
+        record a file that was read.
+    merge(other)
+        add the counts and timings of another instance.
+    slowest_files(n=10)
+        return the files that took longest to read and search.
+    report(top=10)
+        return a summary of the statistics.
+    """
+
+    def __init__(self):
+        self.files_visited = 0
+        self.files_cached = 0
+        self.files_read = 0
+        self.files_unchanged = 0
+        self.files_skipped = Counter()
+        self.files_matched = 0
+        self.bytes_read = 0
+        self.walk_time = 0.0
+        self.scan_time = 0.0
+        self.match_times = Counter()
+        self.pattern_times = Counter()
+        self.parse_times = Counter()
+        self.write_times = Counter()
+        self.file_times = {}
+
+    @property
+    def match_time(self):
+        """Total time spent matching."""
+        return sum(self.match_times.values())
+
+    @property
+    def read_time(self):
+        """Time spent reading files, other than matching."""
+        return self.scan_time - self.match_time
+
+    def add_file(self, path: str, seconds: float, results):
+        """
+        Record a file that was read.
+
+        Parameters
+        ----------
+        path
+            path to the file.
+        seconds
+            time spent reading and searching the file.
+        results
+            the file's results from :meth:`Scanner.scan_file`.
+        """
+        self.files_read += 1
+        self.scan_time += seconds
+        self.file_times[path] = self.file_times.get(path, 0.0) + seconds
+        if results == UNCHANGED:
+            self.files_unchanged += 1
+        elif isinstance(results, str):
+            self.files_skipped[results] += 1
+
+    def merge(self, other: "ScanStats"):
+        """Add the counts and timings of another instance, such as one from a worker process."""
+        self.files_visited += other.files_visited
+        self.files_cached += other.files_cached
+        self.files_read += other.files_read
+        self.files_unchanged += other.files_unchanged
+        self.files_skipped.update(other.files_skipped)
+        self.files_matched += other.files_matched
+        self.bytes_read += other.bytes_read
+        self.walk_time += other.walk_time
+        self.scan_time += other.scan_time
+        self.match_times.update(other.match_times)
+        self.pattern_times.update(other.pattern_times)
+        self.parse_times.update(other.parse_times)
+        self.write_times.update(other.write_times)
+        for path, seconds in other.file_times.items():
+            self.file_times[path] = self.file_times.get(path, 0.0) + seconds
+
+    def slowest_files(self, n: int = 10):
+        """Return ``(path, seconds)`` pairs for the files that took longest to read and search."""
+        return heapq.nlargest(
+            n,
+            self.file_times.items(),
+            key=lambda file_time: file_time[1],
+        )
+
+    def report(self, top: int = 10):
+        """
+        Return a summary of the statistics, for printing.
+
+        Parameters
+        ----------
+        top
+            number of the slowest files to list.
+        """
+        skipped = ", ".join(
+            f"{count} {reason}" for reason, count in sorted(self.files_skipped.items())
+        )
+        lines = [
+            "Search statistics:",
+            f"  Files: {self.files_visited} visited, {self.files_cached} from cache,"
+            f" {self.files_read} read ({self.files_unchanged} unchanged),"
+            f" {sum(self.files_skipped.values())} skipped{f' ({skipped})' if skipped else ''},"
+            f" {self.files_matched} with log items",
+            f"  Read: {self.bytes_read / 1e6:.2f} MB",
+            f"  Time: walk {self.walk_time:.3f}s, read {self.read_time:.3f}s,"
+            f" match {self.match_time:.3f}s, parse {sum(self.parse_times.values()):.3f}s,"
+            f" write {sum(self.write_times.values()):.3f}s",
+        ]
+        sections = [
+            ("Match time by log item type", self.match_times.items()),
+            (
+                "Match time by search pattern",
+                (
+                    (f"{class_name} pattern {idx + 1}", seconds)
+                    for (class_name, idx), seconds in self.pattern_times.items()
+                ),
+            ),
+            ("Parse time by log item type", self.parse_times.items()),
+            ("Write time by log", self.write_times.items()),
+            ("Slowest files", self.slowest_files(top)),
+        ]
+        for title, timings in sections:
+            timings = sorted(timings, key=lambda timing: timing[1], reverse=True)
+            if timings:
+                lines.append(f"  {title}:")
+                lines += [f"    {seconds:8.3f}s  {name}" for name, seconds in timings]
+        return "\n".join(lines)
@@ -0,0 +1,544 @@
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+
+from assumptions.log import check_logs
+from assumptions.log import file_items
+from assumptions.log import list_files
+from assumptions.log_items import LineNumbers
+from assumptions.log_items import MatchedItems
+from assumptions.scanner import Scanner
+from assumptions.sources import git_ignored_directories
+from assumptions.sources import PathFilter
+
+# inotify event flags, from <sys/inotify.h>
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_inotify():
+    """Return the C library if it provides inotify, otherwise None."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class InotifyWatcher:
+    """
+    Watches a directory tree for changed files using Linux inotify, so that changes are
+    reported as soon as they happen without checking every file.
+
+    Parameters
+    ----------
+    root
+        absolute path to the directory to watch, including all directories under it.
+    skip_directories
+        optional function called with lists of directories as they are found, returning the
+        set of them that aren't watched, along with all of the directories under them. Each
+        list holds the subdirectories of one level of a tree, so can be checked together.
+
+    Methods
+    -------
+    changes(timeout=None)
+        wait for changes and return the changed paths.
+    close()
+        stop watching.
+
+    Raises
+    ------
+    OSError
+        if inotify isn't available or the directories can't be watched, e.g. because the
+        limit on the number of watches has been reached.
+    """
+
+    def __init__(self, root: Path, skip_directories=None):
+        self._libc = _load_inotify()
+        if self._libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            self._raise_errno(root)
+        self._directories = {}
+        self._skip_directories = skip_directories
+        try:
+            self._add_tree(root)
+        except Exception:
+            self.close()
+            raise
+
+    def _raise_errno(self, path):
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error), str(path))
+
+    def _add_tree(self, root: Path, check_root: bool = False):
+        # Watched a level at a time, so that each level's directories are skipped together
+        level = [root]
+        if check_root and self._skip_directories is not None:
+            level = [root] if root not in self._skip_directories(level) else []
+        while level:
+            subdirectories = []
+            for directory in level:
+                watch = self._libc.inotify_add_watch(
+                    self._fd,
+                    os.fsencode(directory),
+                    _WATCH_MASK,
+                )
+                if watch < 0:
+                    if ctypes.get_errno() in (errno.ENOENT, errno.ENOTDIR):
+                        # Removed since it was listed
+                        continue
+                    self._raise_errno(directory)
+                self._directories[watch] = directory
+                try:
+                    with os.scandir(directory) as entries:
+                        subdirectories += [
+                            Path(entry.path)
+                            for entry in entries
+                            if entry.is_dir(follow_symlinks=False)
+                        ]
+                except OSError:
+                    # Removed or unreadable, like directories skipped by os.walk
+                    continue
+            if subdirectories and self._skip_directories is not None:
+                skipped = self._skip_directories(subdirectories)
+                subdirectories = [
+                    path for path in subdirectories if path not in skipped
+                ]
+            level = subdirectories
+
+    def _remove_tree(self, root: Path):
+        for watch, directory in list(self._directories.items()):
+            if directory == root or root in directory.parents:
+                self._libc.inotify_rm_watch(self._fd, watch)
+                del self._directories[watch]
+
+    def _read_events(self):
+        data = b""
+        while True:
+            try:
+                chunk = os.read(self._fd, 65536)
+            except BlockingIOError:
+                return data
+            if not chunk:
+                return data
+            data += chunk
+
+    def changes(self, timeout: float = None):
+        """
+        Wait for files to change.
+
+        Parameters
+        ----------
+        timeout
+            optional number of seconds to wait for.
+
+        Returns
+        -------
+        set or None
+            paths of the changed files and directories, which is empty if nothing changed
+            before the timeout. None if changes were missed, so that any file may have changed.
+        """
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        data = self._read_events()
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            watch, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name_end = offset + length
+            name = os.fsdecode(data[offset:name_end].rstrip(b"\0"))
+            offset += length
+
+            if mask & _IN_Q_OVERFLOW:
+                return None
+            if mask & _IN_IGNORED:
+                self._directories.pop(watch, None)
+                continue
+            directory = self._directories.get(watch)
+            if directory is None or not name:
+                continue
+            path = directory / name
+            if mask & _IN_ISDIR:
+                if mask & _IN_MOVED_FROM:
+                    self._remove_tree(path)
+                elif mask & (_IN_CREATE | _IN_MOVED_TO):
+                    self._add_tree(path, check_root=True)
+            changed.add(path)
+        return changed
+
+    def close(self):
+        """Stop watching."""
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """
+    Watches files for changes by checking their modification times and sizes at regular
+    intervals. Used where inotify isn't available. Each check lists and stats every file, so
+    it takes time proportional to the number of files.
+
+    Parameters
+    ----------
+    list_paths
+        function returning the paths of the files to watch.
+    interval
+        number of seconds between checks.
+
+    Methods
+    -------
+    changes(timeout=None)
+        wait for changes and return the changed paths.
+    close()
+        stop watching.
+    """
+
+    def __init__(self, list_paths, interval: float = 1.0):
+        self._list_paths = list_paths
+        self.interval = interval
+        self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self):
+        snapshot = {}
+        for path in self._list_paths():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def changes(self, timeout: float = None):
+        """
+        Wait for files to change. See :meth:`InotifyWatcher.changes`.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._take_snapshot()
+            changed = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+            if changed:
+                return changed
+
+            wait = self.interval
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    return set()
+            time.sleep(wait)
+
+    def close(self):
+        """Stop watching."""
+        pass
+
+
+class LogWatcher:
+    """
+    Keeps logs up to date as files change. The log items found in each file are kept in
+    memory, so that only changed files are searched again. Output logs are left out of the
+    search, so that writing them doesn't cause another update.
+
+    Parameters
+    ----------
+    logs
+        :class:`Log` instances to keep up to date.
+    relative_search_path
+        relative path to directory that should be searched for log items.
+    extension
+        file extension to reduce search to specific file types (e.g. '.py').
+    source
+        how files are found. See :func:`find_log_items`.
+    max_file_size
+        optional size in bytes above which files are skipped.
+    jobs
+        number of processes used to read and search files. See :func:`find_log_items`.
+    include
+        optional glob patterns of files to search. See :class:`PathFilter`.
+    exclude
+        optional glob patterns of files and directories not to search. See
+        :class:`PathFilter`.
+    file_time_limit
+        optional time limit in seconds for matching the log items in each file. See
+        :func:`find_log_items`.
+    pattern_time_limit
+        optional time limit in seconds for matching each search pattern in a file.
+
+    Methods
+    -------
+    refresh()
+        search all files for log items.
+    update(paths)
+        search changed files for log items.
+    write_logs(template_path=None, dry_run=False)
+        write all logs with the log items found.
+    watch(template_path=None, dry_run=False, debounce=0.5, poll_interval=1.0)
+        update logs whenever files change, until interrupted.
+    """
+
+    def __init__(
+        self,
+        logs: list,
+        relative_search_path: str = "",
+        extension: str = "",
+        source: str = "walk",
+        max_file_size: int = None,
+        jobs: int = 1,
+        include: list = None,
+        exclude: list = None,
+        file_time_limit: float = None,
+        pattern_time_limit: float = None,
+    ):
+        check_logs(logs, source)
+        self.logs = list(logs)
+        self.search_path = (Path(os.getcwd()) / relative_search_path).resolve()
+        self.extension = extension
+        self.source = source
+        self.max_file_size = max_file_size
+        self.jobs = jobs
+        self._log_item_types = [
+            log_item for log in self.logs for log_item in log._log_item_types
+        ]
+        self._scanner = Scanner(
+            self._log_item_types,
+            max_file_size,
+            digests=False,
+            file_time_limit=file_time_limit,
+            pattern_time_limit=pattern_time_limit,
+        )
+        # Including the temporary and digest files written alongside each log
+        self._exclude = {
+            path.resolve() for log in self.logs for path in log.output_paths()
+        }
+        self._path_filter = PathFilter(include, exclude) if include or exclude else None
+        # Relative paths of all files searched, and the log items and their line numbers for
+        # files that have any
+        self._files = set()
+        self._items = {}
+
+    def _list_files(self, paths: list = None):
+        return list_files(
+            self.search_path,
+            self.extension,
+            self.source,
+            paths=paths,
+            exclude=self._exclude,
+            path_filter=self._path_filter,
+        )
+
+    def _skipped_directories(self, directories: list):
+        """
+        Return the directories that no files would be listed under, so that they aren't
+        watched: those excluded by the path filter and, when files are listed by git, the
+        ``.git`` directory and ignored directories.
+        """
+        skipped = set()
+        if self._path_filter is not None:
+            skipped.update(
+                directory
+                for directory in directories
+                if self._path_filter.excludes(
+                    directory.relative_to(self.search_path).as_posix(),
+                    directory.name,
+                )
+            )
+        if self.source == "git":
+            skipped.update(
+                directory for directory in directories if directory.name == ".git"
+            )
+            skipped |= git_ignored_directories(
+                self.search_path,
+                [directory for directory in directories if directory not in skipped],
+            )
+        return skipped
+
+    def _list_paths(self):
+        return [path for _, path in self._list_files()]
+
+    def _scan(self, files: list):
+        """Search files, returning whether the log items found have changed."""
+        changed = False
+        scanned = self._scanner.scan_files(
+            [(path, None) for _, path in files],
+            self.jobs,
+        )
+        for (relative_path, path), (_, results, lines) in zip(files, scanned):
+            found = file_items(
+                path,
+                results,
+                lines,
+                self._log_item_types,
+                self.max_file_size,
+            )
+            self._files.add(relative_path)
+            if any(found[0]):
+                changed = changed or self._items.get(relative_path) != found
+                self._items[relative_path] = found
+            elif self._items.pop(relative_path, None) is not None:
+                changed = True
+        return changed
+
+    def refresh(self):
+        """Search all files for log items, forgetting any previous results."""
+        print(f"Searching for log items under: {self.search_path}")
+        self._files = set()
+        self._items = {}
+        self._scan(self._list_files())
+
+    def update(self, paths):
+        """
+        Search files that have changed for log items.
+
+        Parameters
+        ----------
+        paths
+            absolute paths to the changed files and directories, as returned by a watcher's
+            ``changes`` method. All files are searched again if None.
+
+        Returns
+        -------
+        bool
+            whether the log items found have changed.
+        """
+        if paths is None:
+            items = self._items
+            self.refresh()
+            return items != self._items
+
+        candidates = set()
+        for path in paths:
+            if path == self.search_path or self.search_path not in path.parents:
+                continue
+            if path in self._exclude:
+                # Written by the logs themselves
+                continue
+            relative_path = path.relative_to(self.search_path.parent).as_posix()
+            candidates.add(path)
+            if path.is_dir():
+                # Created or moved in
+                candidates.update(p for p in path.glob("**/*") if p.is_file())
+            elif relative_path not in self._files and not path.exists():
+                # Possibly a directory that was deleted or moved out
+                prefix = relative_path + "/"
+                candidates.update(
+                    self.search_path.parent / file
+                    for file in self._files
+                    if file.startswith(prefix)
+                )
+        if not candidates:
+            return False
+
+        files = self._list_files(candidates)
+        changed = self._scan(files)
+        listed = {relative_path for relative_path, _ in files}
+        for path in candidates:
+            relative_path = path.relative_to(self.search_path.parent).as_posix()
+            if relative_path in listed:
+                continue
+            self._files.discard(relative_path)
+            if self._items.pop(relative_path, None) is not None:
+                changed = True
+        return changed
+
+    def write_logs(self, template_path: str = None, dry_run: bool = False):
+        """
+        Write each log with the log items found, in order of their relative paths. See
+        :meth:`Log.write_log`.
+        """
+        for idx, log_item in enumerate(self._log_item_types):
+            log_item.matched_items = MatchedItems()
+            log_item.matched_lines = LineNumbers()
+            log_item.parsed_items = []
+            for relative_path in sorted(self._items):
+                items, lines = self._items[relative_path]
+                log_item.matched_items += [(relative_path, item) for item in items[idx]]
+                log_item.matched_lines += lines[idx]
+        for log in self.logs:
+            log.write_log(template_path, dry_run, reuse_parsed=True)
+
+    def watch(
+        self,
+        template_path: str = None,
+        dry_run: bool = False,
+        debounce: float = 0.5,
+        poll_interval: float = 1.0,
+    ):
+        """
+        Write logs, then update them whenever files change until interrupted. Uses inotify
+        where available, otherwise checks files for changes at regular intervals.
+
+        Parameters
+        ----------
+        template_path
+            path to the output log template. See :meth:`Log.write_log`.
+        dry_run
+            whether to skip writing logs.
+        debounce
+            number of seconds without further changes to wait for before updating, so that
+            several changes saved together cause a single update.
+        poll_interval
+            number of seconds between checks for changes, when inotify isn't available.
+        """
+        try:
+            watcher = InotifyWatcher(self.search_path, self._skipped_directories)
+        except OSError as error:
+            print(
+                f"Could not watch files using inotify ({error}), checking for changes instead.",
+            )
+            watcher = PollingWatcher(self._list_paths, poll_interval)
+
+        try:
+            self.refresh()
+            self.write_logs(template_path, dry_run)
+            print(
+                f"Watching for changes under: {self.search_path}. Press Ctrl+C to stop.",
+            )
+            while True:
+                paths = watcher.changes()
+                while paths is not None:
+                    more_paths = watcher.changes(debounce)
+                    if not more_paths:
+                        paths = None if more_paths is None else paths
+                        break
+                    paths |= more_paths
+                if self.update(paths):
+                    self.write_logs(template_path, dry_run)
+        finally:
+            watcher.close()
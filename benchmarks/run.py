@@ -0,0 +1,199 @@
+"""
+Benchmark searching for, parsing and writing log items in synthetic project trees.
+
+Run from the repository root, with assumptions installed::
+
+    python benchmarks/run.py
+    python benchmarks/run.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run.py --baseline benchmarks/baseline.json --tolerance 0.25
+
+Timings depend on the machine, so baselines should be saved and compared on the same machine.
+When comparing with a baseline, the exit code is 1 if any stage is slower than the baseline by
+more than the tolerance (and by more than 10 milliseconds, to ignore timer noise).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic import generate_tree
+
+from assumptions.log import _BUILTIN_ITEM_TYPES
+from assumptions.log import find_log_items
+from assumptions.log import Log
+
+SCENARIOS = {
+    # Most files in large projects have no log items at all
+    "sparse": {"files": 2000, "file_size": 4000, "marker_density": 0.001},
+    "dense": {"files": 500, "file_size": 4000, "marker_density": 0.1},
+    # Long comment blocks catch patterns that backtrack
+    "long_blocks": {
+        "files": 50,
+        "file_size": 40000,
+        "marker_density": 0.01,
+        "block_length": 500,
+    },
+    "binary": {
+        "files": 500,
+        "file_size": 20000,
+        "marker_density": 0.01,
+        "binary_share": 0.5,
+    },
+}
+
+STAGES = ["find_items", "parse_items", "write_log"]
+
+# Differences smaller than this are timer noise, however large they are relative to the baseline
+_MIN_REGRESSION = 0.01
+
+
+def _new_logs(output_dir):
+    logs = []
+    for log_type, item_types in _BUILTIN_ITEM_TYPES.items():
+        log = Log(log_type, str(Path(output_dir) / f"{log_type}.md"))
+        for item_type in item_types:
+            log.add_log_item_type(item_type)
+        logs.append(log)
+    return logs
+
+
+def run_scenario(tree_dir, output_dir, repeat: int = 3):
+    """
+    Time each stage of generating all built-in logs for a tree, returning the fastest time for
+    each stage and the number of items found.
+    """
+    timings = {stage: float("inf") for stage in STAGES}
+    for _ in range(repeat):
+        for log_file in Path(output_dir).glob("*.md"):
+            log_file.unlink()
+        logs = _new_logs(output_dir)
+        log_items = [log_item for log in logs for log_item in log._log_item_types]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            find_log_items(logs, tree_dir)
+            timings["find_items"] = min(
+                timings["find_items"],
+                time.perf_counter() - start,
+            )
+
+            items = sum(len(log_item.matched_items) for log_item in log_items)
+            start = time.perf_counter()
+            for log_item in log_items:
+                log_item.parse_items()
+            timings["parse_items"] = min(
+                timings["parse_items"],
+                time.perf_counter() - start,
+            )
+
+            start = time.perf_counter()
+            for log in logs:
+                log.write_log()
+            timings["write_log"] = min(
+                timings["write_log"],
+                time.perf_counter() - start,
+            )
+    return timings, items
+
+
+def _report(name, tree, timings, items):
+    megabytes = tree["bytes"] / 1e6
+    find_time, parse_time, write_time = (timings[stage] for stage in STAGES)
+    print(
+        f"{name:<12} {tree['files']:>6} files {megabytes:>8.1f} MB {items:>7} items | "
+        f"find {find_time:>7.3f}s ({megabytes / find_time:>7.1f} MB/s) | "
+        f"parse {parse_time:>7.3f}s ({items / max(parse_time, 1e-9):>9.0f} items/s) | "
+        f"write {write_time:>7.3f}s ({items / max(write_time, 1e-9):>9.0f} items/s)",
+    )
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """Return a description of each stage that is slower than the baseline by more than the tolerance."""
+    regressions = []
+    for name, timings in results.items():
+        for stage, seconds in timings.items():
+            baseline_seconds = baseline.get(name, {}).get(stage)
+            if baseline_seconds is None:
+                continue
+            slowdown = seconds - baseline_seconds
+            if slowdown > baseline_seconds * tolerance and slowdown > _MIN_REGRESSION:
+                regressions.append(
+                    f"{name} {stage}: {seconds:.3f}s, baseline {baseline_seconds:.3f}s",
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument(
+        "-s",
+        "--scenario",
+        action="append",
+        choices=list(SCENARIOS),
+        help="scenario to run. Can be passed more than once. Runs all scenarios by default.",
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="multiplier for the number of files in each scenario. Default is 1.",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=3,
+        help="number of times to time each stage, keeping the fastest. Default is 3.",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        help="baseline timings to compare against.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="fraction by which a stage can be slower than the baseline. Default is 0.25.",
+    )
+    parser.add_argument("--save-baseline", type=str, help="file to save timings to.")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        options = dict(SCENARIOS[name])
+        options["files"] = max(1, int(options["files"] * args.scale))
+        with tempfile.TemporaryDirectory() as tree_dir, tempfile.TemporaryDirectory() as output_dir:
+            tree = generate_tree(tree_dir, **options)
+            cwd = os.getcwd()
+            os.chdir(tree_dir)
+            try:
+                timings, items = run_scenario(".", output_dir, args.repeat)
+            finally:
+                os.chdir(cwd)
+        _report(name, tree, timings, items)
+        results[name] = timings
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to: {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            print("\n".join(regressions))
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
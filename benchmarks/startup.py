@@ -0,0 +1,99 @@
+"""
+Benchmark the start up time of the command line tool, which dominates pre-commit hooks and
+runs on small projects.
+
+Run from the repository root, with assumptions installed::
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --save-baseline benchmarks/startup_baseline.json
+    python benchmarks/startup.py --baseline benchmarks/startup_baseline.json --tolerance 0.25
+
+Each command is run in a new Python process. As with ``run.py``, baselines should be saved and
+compared on the same machine, and the exit code is 1 if any command is slower than the baseline
+by more than the tolerance.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+
+from run import compare
+from synthetic import generate_tree
+
+COMMANDS = {
+    "import": ["-c", "import assumptions"],
+    "help": ["-m", "assumptions.cli", "--help"],
+    "small_project": ["-m", "assumptions.cli", "-l", "all", "--dry-run"],
+}
+
+# Small enough that start up time dominates
+SMALL_PROJECT = {"files": 20, "file_size": 2000, "marker_density": 0.02}
+
+
+def time_command(args: list, cwd: str, repeat: int = 10):
+    """Return the fastest time to run Python with the arguments, in seconds."""
+    fastest = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *args],
+            cwd=cwd,
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        fastest = min(fastest, time.perf_counter() - start)
+    return fastest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=10,
+        help="number of times to run each command, keeping the fastest. Default is 10.",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        help="baseline timings to compare against.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="fraction by which a command can be slower than the baseline. Default is 0.25.",
+    )
+    parser.add_argument("--save-baseline", type=str, help="file to save timings to.")
+    args = parser.parse_args(argv)
+
+    # Python's own start up time, for reference
+    results = {"python": {"seconds": time_command(["-c", "pass"], ".", args.repeat)}}
+    with tempfile.TemporaryDirectory() as tree_dir:
+        generate_tree(tree_dir, **SMALL_PROJECT)
+        for name, command in COMMANDS.items():
+            results[name] = {"seconds": time_command(command, tree_dir, args.repeat)}
+    for name, timings in results.items():
+        print(f"{name:<14} {timings['seconds']:>7.3f}s")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to: {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            print("\n".join(regressions))
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Generate synthetic project trees for benchmarking assumptions.
+"""
+import random
+from pathlib import Path
+
+_CODE_LINES = [
+    "x = load_data(path)",
+    "result = model.fit(x, y)",
+    "    for row in rows:",
+    "        total += row.value",
+    "def summarise(data):",
+    "    return data.groupby('region').sum()",
+    "",
+]
+
+_BLOCKS = [
+    ["# Assumption: Synthetic assumption {n}", "# Quality: RED", "# Impact: AMBER"],
+    ["# Caveat: Synthetic caveat {n}"],
+    ["# Debt: Synthetic debt {n}"],
+    ["# TODO: Synthetic todo {n}"],
+    ["#' @section Assumption: Roxygen assumption {n}", "#' Q: GREEN", "#' I: RED"],
+]
+
+
+def _comment_block(rng, n, block_length):
+    header = [line.format(n=n) for line in rng.choice(_BLOCKS)]
+    prefix = "#' " if header[0].startswith("#'") else "# "
+    body = [f"{prefix}Detail line {i} of block {n}." for i in range(block_length)]
+    return header + body
+
+
+def generate_tree(
+    root,
+    files: int = 1000,
+    file_size: int = 4000,
+    marker_density: float = 0.05,
+    block_length: int = 3,
+    binary_share: float = 0.0,
+    seed: int = 0,
+):
+    """
+    Write a synthetic project tree of Python files, spread over nested directories.
+
+    Parameters
+    ----------
+    root
+        directory to write the tree under.
+    files
+        number of files.
+    file_size
+        approximate size of each file in bytes.
+    marker_density
+        probability that each line starts a log item comment block.
+    block_length
+        number of detail lines in each comment block.
+    binary_share
+        share of files that are binary data instead of code.
+    seed
+        random seed, so that trees are reproducible.
+
+    Returns
+    -------
+    dict
+        the number of files, total bytes and number of log item comment blocks written.
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    total_bytes = 0
+    markers = 0
+    for file_number in range(files):
+        directory = root / f"package_{file_number % 10}" / f"module_{file_number % 7}"
+        directory.mkdir(parents=True, exist_ok=True)
+
+        if rng.random() < binary_share:
+            path = directory / f"data_{file_number}.bin"
+            data = b"\0" + rng.getrandbits(8 * file_size).to_bytes(file_size, "little")
+            path.write_bytes(data)
+            total_bytes += len(data)
+            continue
+
+        lines = []
+        size = 0
+        while size < file_size:
+            if rng.random() < marker_density:
+                # Comment blocks end at the next line that isn't a comment
+                new_lines = _comment_block(rng, markers, block_length) + ["pass"]
+                markers += 1
+            else:
+                new_lines = [rng.choice(_CODE_LINES)]
+            lines += new_lines
+            size += sum(len(line) + 1 for line in new_lines)
+
+        path = directory / f"code_{file_number}.py"
+        text = "\n".join(lines) + "\n"
+        path.write_text(text)
+        total_bytes += len(text.encode("utf-8"))
+
+    return {"files": files, "bytes": total_bytes, "markers": markers}
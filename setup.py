@@ -55,6 +55,10 @@ setup(
         "Topic :: Text Processing",
     ],
     entry_points={
-        "console_scripts": ["assumptions=assumptions.cli:cli"],
+        "console_scripts": [
+            "assumptions=assumptions.cli:cli",
+            "assumptions-query=assumptions.cli:query_cli",
+            "assumptions-profile-patterns=assumptions.cli:profile_patterns_cli",
+        ],
     },
 )
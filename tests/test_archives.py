@@ -0,0 +1,80 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from assumptions.archives import archive_members
+from assumptions.log import Log
+from assumptions.log_items import Todo
+from assumptions.scanner import Scanner
+from assumptions.scanner import TOO_LARGE
+from assumptions.scanner import UNREADABLE
+
+FILES = {
+    "package/a.py": b"# TODO: zipped a\n",
+    "package/b.py": b"x = 1\n",
+    "package/notes.txt": b"# TODO: notes\n",
+}
+
+
+def _write_zip(path):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in FILES.items():
+            archive.writestr(name, data)
+
+
+def _write_tar(path):
+    with tarfile.open(path, "w:gz") as archive:
+        for name, data in FILES.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+@pytest.fixture
+def archive_tree(tmp_path, monkeypatch):
+    (tmp_path / "dist").mkdir()
+    _write_zip(tmp_path / "dist" / "package-1.0-py3-none-any.whl")
+    _write_tar(tmp_path / "dist" / "package-1.0.tar.gz")
+    (tmp_path / "dist" / "broken.zip").write_bytes(b"not a zip")
+    (tmp_path / "code.py").write_text("# TODO: unzipped\n")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.mark.parametrize("name", ["package-1.0-py3-none-any.whl", "package-1.0.tar.gz"])
+def test_archive_members(archive_tree, name):
+    path = archive_tree / "dist" / name
+    assert dict(archive_members(path)) == FILES
+    assert dict(archive_members(path, ".py", max_file_size=10)) == {
+        "package/a.py": None,
+        "package/b.py": b"x = 1\n",
+    }
+
+
+def test_scan_archive(archive_tree):
+    scanner = Scanner([Todo()], max_file_size=10)
+    scanned = dict(
+        scanner.scan_archive(archive_tree / "dist" / "package-1.0.tar.gz", ".py"),
+    )
+    assert scanned["package/a.py"][1] == TOO_LARGE
+    assert scanned["package/b.py"][1] == [[]]
+    assert scanner.scan_archive(archive_tree / "dist" / "broken.zip") == [
+        (None, (None, UNREADABLE, None)),
+    ]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_find_items_in_archives(archive_tree, jobs, capsys):
+    log = Log("todo_list", "todo_list.md")
+    log.add_log_item_type(Todo)
+    log.find_items(extension=".py", jobs=jobs, archives=True)
+
+    root = archive_tree.name
+    assert [path for path, _ in log._log_item_types[0].matched_items] == [
+        f"{root}/code.py",
+        f"{root}/dist/package-1.0-py3-none-any.whl!package/a.py",
+        f"{root}/dist/package-1.0.tar.gz!package/a.py",
+    ]
+    assert "File could not be read, skipping" in capsys.readouterr().out
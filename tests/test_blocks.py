@@ -0,0 +1,103 @@
+import random
+import re
+
+import pytest
+
+from assumptions.blocks import CommentBlock
+from assumptions.blocks import iter_lines
+from assumptions.log_items import Assumption
+from assumptions.log_items import Caveat
+from assumptions.log_items import Debt
+from assumptions.log_items import Todo
+from assumptions.scanner import Scanner
+
+LINES = [
+    "# Assumption: title",
+    "#assumption:title",
+    "#' @section Assumption: roxygen",
+    "  # Assumption: indented",
+    "# Q: RED",
+    "# Quality: GREEN",
+    "#' Q: AMBER",
+    "  # Q: RED",
+    "# I: AMBER",
+    "# Impact: RED",
+    "#' I: GREEN",
+    "  # I: GREEN",
+    "# Caveat: a caveat",
+    "# Caveat: ",
+    "#' @section Caveat: roxygen caveat",
+    "# Debt: some debt",
+    "# Debt: debt # with hash",
+    "  # Debt: indented # debt",
+    "#' @section Debt: roxygen debt",
+    "# TODO: a todo",
+    "  # TODO: indented todo",
+    "# todo: lower case",
+    "# detail",
+    "#' roxygen detail",
+    "#'",
+    "  # indented detail",
+    "    # more indented",
+    "x = 1",
+    "",
+]
+
+
+def _findall(log_item, text):
+    items = []
+    for pattern in log_item.search_patterns:
+        items += re.findall(pattern, text, re.MULTILINE | re.IGNORECASE)
+    return items
+
+
+def _random_text(rng):
+    lines = [rng.choice(LINES) for _ in range(rng.randint(0, 12))]
+    return "\n".join(lines) + rng.choice(["", "\n"])
+
+
+@pytest.mark.parametrize("log_item_class", [Assumption, Caveat, Debt, Todo])
+def test_blocks_match_patterns(log_item_class):
+    rng = random.Random(log_item_class.__name__)
+    log_item = log_item_class()
+    for _ in range(3000):
+        text = _random_text(rng)
+        expected = _findall(log_item, text)
+        assert log_item.match(text) == expected, text
+        assert Scanner([log_item]).scan(text) == [expected], text
+
+
+def test_match_reads_only_block():
+    lines = iter(["# TODO: todo\n", "# detail\n", "x = 1\n", "y = 2\n"])
+    block = CommentBlock(r"# ?TODO: (.+)", body_required=False)
+    assert block.match(lines) == (("", "todo", "# detail\n"), 22)
+    assert list(lines) == ["y = 2\n"]
+
+
+def test_iter_lines():
+    assert list(iter_lines("a\nb\nc", 2)) == ["b\n", "c"]
+    assert list(iter_lines("a\n", 2)) == []
+
+
+def test_invalid_block():
+    with pytest.raises(ValueError):
+        CommentBlock(r"# ?TODO: (.+)", body_prefix="# ", continuation_prefix="#'")
+
+
+@pytest.mark.parametrize("log_item_class", [Assumption, Caveat, Debt, Todo])
+def test_unterminated_run_read_once(log_item_class, monkeypatch):
+    lines_read = []
+
+    def counting_iter_lines(text, start=0):
+        for line in iter_lines(text, start):
+            lines_read.append(line)
+            yield line
+
+    monkeypatch.setattr("assumptions.log_items.iter_lines", counting_iter_lines)
+    log_item = log_item_class()
+    for n in [2000, 8000]:
+        lines_read.clear()
+        text = ("# TODO: a\n# Caveat: b\n# Debt: c\n# Assumption: d\n" * n)[:-1]
+        assert log_item.match(text) == []
+        # Linear in the length of the text, rather than reading to the end for every header
+        assert len(lines_read) <= 4 * n
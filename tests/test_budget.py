@@ -0,0 +1,43 @@
+import re
+import time
+
+import pytest
+
+from assumptions.budget import MatchBudget
+from assumptions.budget import MatchTimeout
+
+CATASTROPHIC = re.compile(r"(a+)+$")
+
+
+def test_pattern_interrupted():
+    budget = MatchBudget(pattern_seconds=0.1)
+    start = time.perf_counter()
+    with pytest.raises(MatchTimeout, match="Slow pattern 1 took longer than 0.1s"):
+        with budget.file(), budget.pattern("Slow pattern 1"):
+            CATASTROPHIC.match("a" * 40 + "b")
+    assert time.perf_counter() - start < 5
+
+
+def test_file_interrupted():
+    budget = MatchBudget(file_seconds=0.1, pattern_seconds=10)
+    with pytest.raises(MatchTimeout, match="matching took longer than 0.1s"):
+        with budget.file():
+            with budget.pattern("Fast pattern 1"):
+                pass
+            with budget.pattern("Slow pattern 2"):
+                CATASTROPHIC.match("a" * 40 + "b")
+
+
+def test_checked_without_interrupting():
+    # Without an enclosing file, patterns can't be interrupted, so are checked afterwards
+    budget = MatchBudget(pattern_seconds=0.01)
+    with pytest.raises(MatchTimeout):
+        with budget.pattern("Sleepy pattern 1"):
+            time.sleep(0.05)
+    with budget.pattern("Fast pattern 1"):
+        pass
+
+
+def test_invalid_limit():
+    with pytest.raises(ValueError, match="Time limits must be positive"):
+        MatchBudget(file_seconds=0)
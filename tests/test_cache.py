@@ -0,0 +1,186 @@
+import gc
+import os
+import subprocess
+import weakref
+from pathlib import Path
+
+import pytest
+
+from assumptions.cache import content_digest
+from assumptions.cache import item_type_key
+from assumptions.cache import ScanCache
+from assumptions.log import Log
+from assumptions.log import LogError
+from assumptions.log_items import Todo
+from assumptions.stats import ScanStats
+
+
+class OtherTodo(Todo):
+    search_patterns = [r"^([ \t]*)# ?TODO: (.+)\n?()"]
+
+
+class RegexTodo(Todo):
+    # Matched with the pattern rather than Todo's comment blocks
+    search_patterns = Todo.search_patterns
+
+
+class PropertyTodo(Todo):
+    @property
+    def search_patterns(self):
+        return OtherTodo.search_patterns
+
+
+@pytest.fixture
+def todo_tree(tmp_path, monkeypatch):
+    (tmp_path / "src").mkdir()
+    todo_file = tmp_path / "src" / "code.py"
+    todo_file.write_text("# TODO: write code\nx = 1\n")
+    # Old enough to trust the modification time
+    os.utime(todo_file, (1_000_000_000, 1_000_000_000))
+    monkeypatch.chdir(tmp_path)
+    return todo_file
+
+
+def _find_todos(cache):
+    log = Log("todo_list", "todo_list.md")
+    log.add_log_item_type(Todo)
+    log.find_items("src", cache=cache)
+    return log._log_item_types[0].matched_items
+
+
+def test_item_type_key():
+    todo_key = item_type_key(Todo())
+    assert todo_key.startswith("assumptions.log_items.Todo:")
+    assert item_type_key(Todo()) == todo_key
+    # Keys differ by matching mode, not just by patterns and class name
+    regex_digest = item_type_key(RegexTodo()).rpartition(":")[2]
+    assert regex_digest != todo_key.rpartition(":")[2]
+    property_key = item_type_key(PropertyTodo())
+    assert property_key.endswith(item_type_key(OtherTodo()).rpartition(":")[2])
+
+    # Instances aren't kept alive by the key cache
+    todo = Todo()
+    todo_ref = weakref.ref(todo)
+    assert item_type_key(todo) == todo_key
+    del todo
+    gc.collect()
+    assert todo_ref() is None
+
+
+def test_cache_round_trip(todo_tree):
+    stat = todo_tree.stat()
+    digest = content_digest(todo_tree.read_bytes())
+    results = [[("", "write code", "")]]
+
+    cache = ScanCache()
+    cache.put("src/code.py", stat, digest, [Todo()], results, [[[1, 1]]])
+    cache.save()
+
+    cache = ScanCache()
+    assert cache.get("src/code.py", stat, [Todo()]) == results
+    assert cache.lines("src/code.py", [Todo()]) == [[[1, 1]]]
+    # Patterns changed
+    assert cache.get("src/code.py", stat, [OtherTodo()]) is None
+
+
+def test_unchanged_files_not_read(todo_tree, monkeypatch):
+    expected = [("src/code.py", ("", "write code", ""))]
+    assert _find_todos(ScanCache()) == expected
+
+    def fail(self):
+        raise AssertionError(f"{self} should not be read")
+
+    monkeypatch.setattr(Path, "read_bytes", fail)
+    assert _find_todos(ScanCache()) == expected
+
+
+def test_changed_files_rescanned(todo_tree):
+    _find_todos(ScanCache())
+    todo_tree.write_text("# TODO: write tests\nx = 1\n")
+    assert _find_todos(ScanCache()) == [("src/code.py", ("", "write tests", ""))]
+
+
+def test_touched_files_not_rescanned(todo_tree):
+    _find_todos(ScanCache())
+    os.utime(todo_tree, (1_100_000_000, 1_100_000_000))
+    cache = ScanCache()
+    assert cache.get("src/code.py", todo_tree.stat(), [Todo()]) is None
+    digest = content_digest(todo_tree.read_bytes())
+    assert cache.get("src/code.py", todo_tree.stat(), [Todo()], digest) == [
+        [("", "write code", "")],
+    ]
+
+
+def test_deleted_files_pruned(todo_tree):
+    cache = ScanCache()
+    _find_todos(cache)
+    todo_tree.unlink()
+    _find_todos(cache)
+    assert "src/code.py" not in ScanCache()
+
+
+def test_unchanged_filenames_trusted(todo_tree):
+    (todo_tree.parent / "other.py").write_text("# TODO: other\n")
+    _find_todos(ScanCache())
+    todo_tree.write_text("# TODO: changed\n")
+
+    log = Log("todo_list", "todo_list.md")
+    log.add_log_item_type(Todo)
+    log.find_items("src", cache=ScanCache(), filenames=["src/other.py"])
+    assert [item[1] for _, item in log._log_item_types[0].matched_items] == [
+        "write code",
+        "other",
+    ]
+
+
+def test_changed_since_commit(todo_tree, monkeypatch):
+    src = todo_tree.parent
+    (src / "old.py").write_text(
+        "# TODO: renamed\n# with enough text to detect the rename\n",
+    )
+    (src / "deleted.py").write_text("# TODO: deleted\n")
+    for command in [["init", "-q"], ["add", "-A"], ["commit", "-qm", "."]]:
+        subprocess.run(
+            [
+                "git",
+                "-c",
+                "user.name=test",
+                "-c",
+                "user.email=test@example.com",
+                *command,
+            ],
+            check=True,
+        )
+    _find_todos(ScanCache())
+
+    (src / "old.py").rename(src / "new.py")
+    (src / "deleted.py").unlink()
+    (src / "added.py").write_text("# TODO: added\n")
+
+    def no_walk(path):
+        raise AssertionError(f"Directory listed: {path}")
+
+    scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", no_walk)
+    log = Log("todo_list", "todo_list.md")
+    log.add_log_item_type(Todo)
+    stats = ScanStats()
+    log.find_items("src", cache=ScanCache(), stats=stats, since="HEAD")
+
+    assert [(path, item[1]) for path, item in log._log_item_types[0].matched_items] == [
+        ("src/added.py", "added"),
+        ("src/code.py", "write code"),
+        ("src/new.py", "renamed"),
+    ]
+    assert stats.files_read == 2
+    with pytest.raises(LogError):
+        log.find_items("src", since="HEAD")
+    monkeypatch.setattr(os, "scandir", scandir)
+
+    # Caches that don't hold every file at the commit fall back to listing every file
+    expected = log._log_item_types[0].matched_items
+    for cache_dir in ["empty_cache", ".assumptions_cache"]:
+        log = Log("todo_list", "todo_list.md")
+        log.add_log_item_type(Todo)
+        log.find_items("src", cache=ScanCache(cache_dir), since="HEAD")
+        assert log._log_item_types[0].matched_items == expected
@@ -0,0 +1,31 @@
+import pytest
+
+from assumptions.config import read_config
+
+
+def test_read_config(tmp_path):
+    path = tmp_path / "config.cfg"
+    path.write_text(
+        "[assumptions]\ninclude = *.py, *.R\nexclude =\n    build\n    docs/*\n",
+    )
+    assert read_config(path) == {
+        "include": ["*.py", "*.R"],
+        "exclude": ["build", "docs/*"],
+    }
+
+    path.write_text("[other]\nexclude = build\n")
+    assert read_config(path) == {}
+
+
+@pytest.mark.parametrize(
+    "content, message",
+    [
+        ("[assumptions]\nextension = .py\n", "Unknown option in config file"),
+        ("exclude = build\n", "Could not read config file"),
+    ],
+)
+def test_invalid_config(tmp_path, content, message):
+    path = tmp_path / "config.cfg"
+    path.write_text(content)
+    with pytest.raises(ValueError, match=message):
+        read_config(path)
@@ -0,0 +1,89 @@
+import subprocess
+
+import pytest
+
+from assumptions.history import GitHistory
+from assumptions.log import Log
+from assumptions.log import LogFindError
+from assumptions.log_items import Todo
+from assumptions.stats import ScanStats
+
+
+def _git(*args):
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        check=True,
+        stdout=subprocess.PIPE,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _git("init", "-q")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.py").write_text("# TODO: a\n")
+    (tmp_path / "src" / "b.py").write_text("# TODO: b\n")
+    (tmp_path / "src" / "notes.txt").write_text("# TODO: notes\n")
+    _git("add", "-A")
+    _git("commit", "-qm", "first")
+    (tmp_path / "src" / "b.py").write_text("# TODO: b changed\n")
+    _git("commit", "-qam", "second")
+    (tmp_path / "src" / "a.py").unlink()
+    (tmp_path / "src" / "b.py").write_text("# TODO: b\n")
+    _git("commit", "-qam", "third")
+    # Uncommitted changes aren't searched
+    (tmp_path / "src" / "c.py").write_text("# TODO: c\n")
+    return tmp_path
+
+
+def _todo_log():
+    log = Log("todo_list", "todo_list.md")
+    log.add_log_item_type(Todo)
+    return log
+
+
+def test_find_items_in_commits(repo):
+    log = _todo_log()
+    stats = ScanStats()
+    titles = []
+    with GitHistory([log], "src", ".py", stats=stats) as history:
+        commits = history.commits("HEAD~2") + history.commits("HEAD~2..HEAD")
+        assert len(commits) == 3
+        for commit in commits:
+            history.find_items(commit)
+            titles.append(
+                [
+                    (path, item[1])
+                    for path, item in log._log_item_types[0].matched_items
+                ],
+            )
+
+    assert titles == [
+        [("src/a.py", "a"), ("src/b.py", "b")],
+        [("src/a.py", "a"), ("src/b.py", "b changed")],
+        [("src/b.py", "b")],
+    ]
+    # Each version of each file is only searched once
+    assert stats.files_read == 3
+    assert stats.files_visited == 5
+
+
+def test_write_logs(repo):
+    log = _todo_log()
+    with GitHistory([log]) as history:
+        (commit,) = history.commits("HEAD~1")
+        history.find_items(commit)
+        assert history.write_logs(commit) == [True]
+
+    content = (repo / f"todo_list_{commit[:8]}.md").read_text()
+    assert content.endswith("\n- [ ] a\n- [ ] b changed\n- [ ] notes\n")
+    assert not (repo / "todo_list.md").exists()
+    # Logs for each commit are written once, so don't leave digest files
+    assert list(repo.glob("*.digest")) == []
+
+
+def test_missing_commit(repo):
+    with GitHistory([_todo_log()]) as history:
+        with pytest.raises(LogFindError, match="Could not read commits using git"):
+            history.commits("missing")
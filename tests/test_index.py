@@ -0,0 +1,85 @@
+import pytest
+
+from assumptions.index import index_records
+from assumptions.index import query_index
+from assumptions.index import write_index
+from assumptions.log import find_log_items
+from assumptions.log import Log
+from assumptions.log_items import Assumption
+from assumptions.log_items import Caveat
+from assumptions.log_items import Todo
+
+
+@pytest.fixture
+def records(tmp_path, monkeypatch):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "model.py").write_text(
+        "x = 1\n"
+        "# Assumption: Linear growth\n"
+        "# Q: red\n"
+        "# I: AMBER\n"
+        "# Growth is  linear\n"
+        "# over time.\n"
+        "y = 2\n"
+        "    # TODO: check\n",
+    )
+    (tmp_path / "README.md").write_text("# Caveat: Sample data\n")
+    monkeypatch.chdir(tmp_path)
+
+    assumptions_log = Log("assumptions_caveats_log", "assumptions_caveats_log.md")
+    assumptions_log.add_log_item_type(Assumption)
+    assumptions_log.add_log_item_type(Caveat)
+    todo_log = Log("todo_list", "todo_list.md")
+    todo_log.add_log_item_type(Todo)
+    find_log_items([assumptions_log, todo_log])
+    return index_records([assumptions_log, todo_log], search_path=".")
+
+
+def test_index_records(records):
+    assert records == [
+        {
+            "type": "Assumption",
+            "title": "Linear growth",
+            "quality": "red",
+            "impact": "AMBER",
+            "path": "src/model.py",
+            "first_line": 2,
+            "last_line": 6,
+            "description": "Growth is linear\nover time.",
+        },
+        {
+            "type": "Caveat",
+            "title": "Sample data",
+            "quality": None,
+            "impact": None,
+            "path": "README.md",
+            "first_line": 1,
+            "last_line": 1,
+            "description": "",
+        },
+        {
+            "type": "Todo",
+            "title": "check",
+            "quality": None,
+            "impact": None,
+            "path": "src/model.py",
+            "first_line": 8,
+            "last_line": 8,
+            "description": "",
+        },
+    ]
+
+
+@pytest.mark.parametrize("file_name", ["index.jsonl", "index.db"])
+def test_query_index(records, tmp_path, file_name):
+    path = tmp_path / file_name
+    write_index(path, records)
+    # Replaces existing indexes
+    write_index(path, records)
+
+    assert query_index(path) == records
+    assert query_index(path, quality="RED") == records[:1]
+    assert query_index(path, item_type="todo") == records[2:]
+    # Paths are relative to the search path, as in the documented --path prefix
+    assert query_index(path, path_prefix="src/") == [records[0], records[2]]
+    assert query_index(path, impact="RED") == []
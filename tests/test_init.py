@@ -0,0 +1,38 @@
+import subprocess
+import sys
+from pathlib import Path
+
+
+def test_lazy_imports():
+    code = (
+        "import sys, assumptions\n"
+        "assert 'assumptions.log' not in sys.modules\n"
+        "assert 'pkg_resources' not in sys.modules\n"
+        "from assumptions import cli, Log, LogItem\n"
+        "assert 'asyncio' not in sys.modules\n"
+        "assert 'Log' in dir(assumptions)\n"
+    )
+    subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).parents[1],
+        check=True,
+    )
+
+
+def test_cli_usage_errors_skip_log_import():
+    code = (
+        "import sys\n"
+        "from assumptions.cli import cli\n"
+        "for argv in (['--help'], ['-j', '-1'], ['--watch', '--index', 'index.json']):\n"
+        "    sys.argv = ['assumptions'] + argv\n"
+        "    try:\n"
+        "        cli()\n"
+        "    except SystemExit:\n"
+        "        pass\n"
+        "    assert 'assumptions.log' not in sys.modules, argv\n"
+    )
+    subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).parents[1],
+        check=True,
+    )
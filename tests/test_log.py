@@ -1,12 +1,20 @@
+import asyncio
+import os
+import re
 from typing import List
 
 import pytest
 
+from assumptions.log import _strip_joined
+from assumptions.log import afind_log_items
+from assumptions.log import find_log_items
 from assumptions.log import Log
 from assumptions.log import LogError
 from assumptions.log_items import Assumption
 from assumptions.log_items import Caveat
+from assumptions.log_items import Debt
 from assumptions.log_items import Todo
+from assumptions.stats import ScanStats
 
 
 @pytest.fixture(scope="function")
@@ -38,3 +46,318 @@ def test_invalid_log_item_type(basic_log):
 def test_find_with_no_types(basic_log):
     with pytest.raises(LogError):
         basic_log.find_items()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_find_items_sorted_by_path(tmp_path, monkeypatch, jobs):
+    for name in ["b.py", "a/c.py", "a.py"]:
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_text(f"# TODO: {name}\n")
+    (tmp_path / "binary.dat").write_bytes(b"\xff\xfe\x00")
+    monkeypatch.chdir(tmp_path)
+
+    log = Log("todo_list", "todo_list.md")
+    log.add_log_item_type(Todo)
+    log.find_items(jobs=jobs)
+    assert [item[1] for _, item in log._log_item_types[0].matched_items] == [
+        "a.py",
+        "a/c.py",
+        "b.py",
+    ]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_find_items_include_exclude(tmp_path, monkeypatch, jobs):
+    for relative_path in ["src/a.py", "src/vendor/b.py", "tests/c.py", "notes.txt"]:
+        (tmp_path / relative_path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / relative_path).write_text(f"# TODO: {relative_path}\n")
+    monkeypatch.chdir(tmp_path)
+    log = Log("todo_list", "todo_list.md")
+    log.add_log_item_type(Todo)
+    stats = ScanStats()
+    log.find_items(
+        jobs=jobs,
+        stats=stats,
+        include=["*.py"],
+        exclude=["vendor", "tests/*"],
+    )
+
+    root = tmp_path.name
+    assert log._log_item_types[0].matched_items == [
+        (f"{root}/src/a.py", ("", "src/a.py", "")),
+    ]
+    assert stats.files_visited == 1
+
+
+class SlowTodo(Todo):
+    # Backtracks catastrophically on long lines that don't match
+    search_patterns = [r"^([ \t]*)# ?TODO: ((?:\w+ ?)+)$()"]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_find_items_time_limit(tmp_path, monkeypatch, capsys, jobs):
+    (tmp_path / "fast.py").write_text("# TODO: fast\n")
+    (tmp_path / "slow.py").write_text("# TODO: " + "a" * 40 + "!\n")
+    monkeypatch.chdir(tmp_path)
+    log = Log("todo_list", "todo_list.md")
+    log.add_log_item_type(SlowTodo)
+    stats = ScanStats()
+    log.find_items(extension=".py", jobs=jobs, stats=stats, pattern_time_limit=0.1)
+
+    assert log._log_item_types[0].matched_items == [
+        (f"{tmp_path.name}/fast.py", ("", "fast", "")),
+    ]
+    assert stats.files_skipped == {"timed out": 1}
+    assert (
+        "File search timed out, SlowTodo pattern 1 took longer than 0.1s, skipping:"
+        in capsys.readouterr().out
+    )
+
+
+def test_find_log_items_for_several_logs(tmp_path, monkeypatch):
+    (tmp_path / "code.py").write_text("# TODO: todo\n# Debt: debt\n# detail\nx = 1\n")
+    monkeypatch.chdir(tmp_path)
+
+    todo_log = Log("todo_list", "todo_list.md")
+    todo_log.add_log_item_type(Todo)
+    debt_log = Log("technical_debt_log", "technical_debt_log.md")
+    debt_log.add_log_item_type(Debt)
+    find_log_items([todo_log, debt_log])
+
+    assert [item[1] for _, item in todo_log._log_item_types[0].matched_items] == [
+        "todo",
+    ]
+    assert [item[1] for _, item in debt_log._log_item_types[0].matched_items] == [
+        "debt",
+    ]
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_afind_log_items(tmp_path, capsys):
+    for name in ["b.py", "a/c.py", "a.py"]:
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_text(f"# TODO: {name}\n")
+    (tmp_path / "unreadable.py").write_bytes(b"# TODO: \xff\n")
+
+    todo_log = Log("todo_list", str(tmp_path / "todo_list.md"))
+    todo_log.add_log_item_type(Todo)
+    debt_log = Log("technical_debt_log", str(tmp_path / "technical_debt_log.md"))
+    debt_log.add_log_item_type(Debt)
+    messages = []
+    progress = []
+    _run(
+        afind_log_items(
+            [todo_log, debt_log],
+            tmp_path,
+            concurrency=2,
+            report=messages.append,
+            progress=lambda searched, total: progress.append((searched, total)),
+        ),
+    )
+
+    assert [item[1] for _, item in todo_log._log_item_types[0].matched_items] == [
+        "a.py",
+        "a/c.py",
+        "b.py",
+    ]
+    assert debt_log._log_item_types[0].matched_items == []
+    assert any("unreadable.py" in message for message in messages)
+    assert progress[-1] == (4, 4)
+
+    assert _run(todo_log.awrite_log(report=messages.append))
+    assert "- [ ] a/c.py" in (tmp_path / "todo_list.md").read_text()
+    assert capsys.readouterr().out == ""
+
+
+@pytest.mark.parametrize(
+    "items",
+    [[], ["", " "], [" a ", "b\n"], ["a", " ", "\n", "b"], ["a", "  ", ""]],
+)
+def test_strip_joined(items):
+    assert "".join(_strip_joined(items)) == "\n".join(items).strip()
+
+
+def test_write_log(tmp_path, monkeypatch):
+    (tmp_path / "code.py").write_text("# TODO: first\nx = 1\n# TODO: second\n")
+    monkeypatch.chdir(tmp_path)
+    template = tmp_path / "template.md"
+    template.write_text("Updated { current_date }\n\n{ todos }\n\nEnd { todos }\n")
+
+    log = Log("todo_list", "todo_list.md")
+    log.add_log_item_type(Todo)
+    log.find_items(extension=".py")
+    assert log.write_log(str(template))
+    content = (tmp_path / "todo_list.md").read_text()
+    assert content.endswith(
+        "\n\n- [ ] first\n- [ ] second\n\nEnd - [ ] first\n- [ ] second\n",
+    )
+
+    # Only the date differs
+    (tmp_path / "todo_list.md").write_text(
+        re.sub(r"\d\d/\d\d/\d{4}", "01/01/2000", content),
+    )
+    assert not log.write_log(str(template))
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "code.py",
+        "template.md",
+        "todo_list.md",
+        "todo_list.md.digest",
+    ]
+
+
+def test_write_log_digest(tmp_path, monkeypatch):
+    code = tmp_path / "code.py"
+    code.write_text("# TODO: due 01/01/2000\n")
+    monkeypatch.chdir(tmp_path)
+    log_path = tmp_path / "todo_list.md"
+    digest_path = tmp_path / "todo_list.md.digest"
+
+    def write_log(dry_run=False):
+        log = Log("todo_list", "todo_list.md")
+        log.add_log_item_type(Todo)
+        log.find_items(extension=".py")
+        return log.write_log(dry_run=dry_run)
+
+    assert write_log()
+    digest_format = rf"[0-9a-f]{{32}} {log_path.stat().st_size} [0-9a-f]{{32}}\n"
+    assert re.fullmatch(digest_format, digest_path.read_text())
+    assert log_path.read_text().startswith("# Todo List")
+
+    # Dates in log items are content too
+    code.write_text("# TODO: due 02/02/2000\n")
+    assert write_log(dry_run=True)
+    assert "due 01/01/2000" in log_path.read_text()
+    assert write_log()
+    assert "due 02/02/2000" in log_path.read_text()
+
+    # Nothing is written when the digest matches
+    times = [path.stat().st_mtime_ns for path in (log_path, digest_path)]
+    assert not write_log()
+    assert [path.stat().st_mtime_ns for path in (log_path, digest_path)] == times
+
+    # Logs without a digest are compared ignoring dates
+    digest_path.unlink()
+    assert not write_log()
+    assert digest_path.exists()
+
+    # Logs modified since the digest was saved are compared too, even if their size and
+    # modification time haven't changed
+    content = log_path.read_text()
+    log_path.write_text(content.replace("due", "DUE"))
+    os.utime(log_path, ns=(times[0], times[0]))
+    assert write_log()
+    assert log_path.read_text() == content
+
+    # Modification times aren't used, as they change when files are checked out or copied
+    os.utime(log_path, ns=(times[1] + 10 ** 9, times[1] + 10 ** 9))
+    digest = digest_path.read_text()
+    os.utime(digest_path, ns=(times[1], times[1]))
+    assert not write_log()
+    assert digest_path.read_text() == digest
+
+
+def test_write_log_reuses_parsed_items(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    parsed = []
+
+    class CountingTodo(Todo):
+        def parse(self, idx, file_path, item):
+            parsed.append(item[1])
+            return super().parse(idx, file_path, item)
+
+    log = Log("todo_list", "todo_list.md")
+    log.add_log_item_type(CountingTodo)
+    todos = log._log_item_types[0]
+
+    def write_log(matched_items, reuse_parsed):
+        todos.matched_items = matched_items
+        todos.parsed_items = []
+        return log.write_log(reuse_parsed=reuse_parsed)
+
+    assert write_log([("a.py", ("", "a", "")), ("b.py", ("", "b", ""))], True)
+    assert write_log([("a.py", ("", "a", "")), ("b.py", ("", "b changed", ""))], True)
+    assert parsed == ["a", "b", "b changed"]
+
+    # Items are parsed again when their index changes, and aren't kept by default
+    assert write_log([("b.py", ("", "b changed", "")), ("a.py", ("", "a", ""))], False)
+    assert parsed[3:] == ["b changed", "a"]
+    assert todos._rendered == {}
+    assert (
+        (tmp_path / "todo_list.md").read_text().endswith("\n- [ ] b changed\n- [ ] a\n")
+    )
+
+
+def test_write_log_numbers_reused_items(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    parsed = []
+
+    class CountingCaveat(Caveat):
+        def parse_unnumbered(self, file_path, item):
+            parsed.append(item[1])
+            return super().parse_unnumbered(file_path, item)
+
+    log = Log("assumptions_caveats_log", "log.md")
+    log.add_log_item_type(CountingCaveat)
+    caveats = log._log_item_types[0]
+
+    caveats.matched_items = [("b.py", ("", "b", "# b\n"))]
+    assert log.write_log(reuse_parsed=True)
+    # Reused after an item is added before it, with its number changed
+    caveats.matched_items = [("a.py", ("", "a", "# a\n")), ("b.py", ("", "b", "# b\n"))]
+    assert log.write_log(reuse_parsed=True)
+    assert parsed == ["b", "a"]
+    content = (tmp_path / "log.md").read_text()
+    assert "### Caveat 1: a\n" in content
+    assert "### Caveat 2: b\n" in content
+    assert caveats.parse(1, "b.py", ("", "b", "# b\n")).startswith("### Caveat 2: b\n")
+
+
+def test_write_log_parses_matched_items(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    log = Log("todo_list", "todo_list.md")
+    log.add_log_item_type(Todo)
+    todos = log._log_item_types[0]
+    todos.matched_items = [("a.py", ("", "a", ""))]
+    assert log.write_log()
+
+    # Parsed items aren't kept by default
+    assert todos.matched_items == [("a.py", ("", "a", ""))]
+    assert todos.parsed_items == []
+    assert not log.write_log()
+
+    # Kept matched items are moved to the parsed items, which are written again as they are
+    assert not log.write_log(keep_parsed=True)
+    assert todos.matched_items == []
+    assert todos.parsed_items == ["- [ ] a"]
+    assert not log.write_log()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_find_items_in_contents(jobs, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    log = Log("todo_list", "todo_list.md")
+    log.add_log_item_type(Todo)
+    stats = ScanStats()
+
+    def contents():
+        yield "src/b.py", b"# TODO: b\r\n"
+        yield "src/a.py", "# TODO: a\n"
+        yield "src/empty.py", ""
+        yield "src/large.py", "# TODO: large" + " " * 100 + "\n"
+
+    log.find_items_in_contents(contents(), jobs=jobs, max_file_size=100, stats=stats)
+    assert log._log_item_types[0].matched_items == [
+        ("src/a.py", ("", "a", "")),
+        ("src/b.py", ("", "b", "")),
+    ]
+    assert log._log_item_types[0].matched_lines == [[1, 1], [1, 1]]
+    assert stats.files_visited == 4
+    assert stats.files_matched == 2
+    assert list(tmp_path.iterdir()) == []
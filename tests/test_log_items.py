@@ -1,6 +1,10 @@
 import pytest
 
+from assumptions.log_items import _clean_description
+from assumptions.log_items import LineNumbers
 from assumptions.log_items import LogItem
+from assumptions.log_items import MatchedItems
+from assumptions.log_items import Todo
 
 
 def test_incomplete_subclass():
@@ -14,3 +18,77 @@ def test_incomplete_subclass():
         match="empty_message, parse, search_patterns, template_marker",
     ):
         instance = LazyLogItem()  # noqa: F841
+
+
+def test_invalid_pattern_at_definition():
+    with pytest.raises(ValueError, match="BrokenLogItem"):
+
+        class BrokenLogItem(Todo):
+            search_patterns = [r"# TODO: (.+"]
+
+
+def test_invalid_keywords_at_definition():
+    with pytest.raises(TypeError, match="keywords"):
+
+        class BrokenLogItem(Todo):
+            keywords = "TODO:"
+
+
+def test_patterns_compiled_once():
+    assert Todo()._patterns[0] is Todo()._patterns[0]
+
+
+def test_line_numbers():
+    lines = LineNumbers([[1, 2]])
+    lines += [[3, 3], (5, 8)]
+    lines.append([10, 10])
+    lines.extend(LineNumbers([[12, 13]]))
+
+    assert len(lines) == 5
+    assert lines == [[1, 2], [3, 3], [5, 8], [10, 10], [12, 13]]
+    assert lines[2] == [5, 8]
+    assert lines[-1] == [12, 13]
+    with pytest.raises(IndexError):
+        lines[5]
+
+
+def test_matched_items():
+    matched_items = MatchedItems([("a.py", ("", "a"))])
+    matched_items += [("a.py", ("", "b")), ("b.py", ("", "c"))]
+    matched_items.append(("a.py", ("", "d")))
+
+    assert len(matched_items) == 4
+    assert matched_items == [
+        ("a.py", ("", "a")),
+        ("a.py", ("", "b")),
+        ("b.py", ("", "c")),
+        ("a.py", ("", "d")),
+    ]
+    assert matched_items[-1] == ("a.py", ("", "d"))
+    # Each path is stored once
+    assert matched_items._paths == ["a.py", "b.py"]
+    with pytest.raises(IndexError):
+        matched_items[4]
+
+
+def test_find_items_shares_repeated_text():
+    todo = Todo()
+    todo.find_items("x = 1\n    # TODO: a\n    # more\n", "a.py")
+    todo.find_items("    # TODO: b\n", "b.py")
+    indents = [item[0] for _, item in todo.matched_items]
+    assert indents == ["    "] * 2
+    assert indents[0] is indents[1]
+    assert todo.matched_lines == [[2, 3], [1, 1]]
+
+
+@pytest.mark.parametrize(
+    "indent, description, expected",
+    [
+        ("", "", ""),
+        ("", "# a  b\n#\n#'  c\n", "a b\n\n c"),
+        ("    ", "    # a\n    #  b   c\n", "a\n b c"),
+        ("  ", "  # a   # b\n", "a \nb"),
+    ],
+)
+def test_clean_description(indent, description, expected):
+    assert _clean_description(indent, description) == expected
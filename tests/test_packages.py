@@ -0,0 +1,85 @@
+import pytest
+
+from assumptions.log import Log
+from assumptions.log_items import Todo
+from assumptions.packages import find_package_logs
+from assumptions.packages import package_roots
+from assumptions.packages import write_package_logs
+from assumptions.stats import ScanStats
+
+
+@pytest.fixture
+def monorepo(tmp_path, monkeypatch):
+    for package in ["a", "b", "b/nested"]:
+        (tmp_path / "packages" / package).mkdir(parents=True)
+        (tmp_path / "packages" / package / "model.py").write_text(
+            f"# TODO: {package}\n",
+        )
+    (tmp_path / "packages" / "a" / "setup.py").write_text("")
+    (tmp_path / "packages" / "b" / "DESCRIPTION").write_text("")
+    (tmp_path / "packages" / "b" / "nested" / "pyproject.toml").write_text("")
+    (tmp_path / "script.py").write_text("# TODO: outside\n")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _package_items(package_logs):
+    return {
+        root.name: log._log_item_types[0].matched_items
+        for root, (log,) in package_logs.items()
+    }
+
+
+def test_package_roots():
+    files = [(path, None) for path in ["r/setup.py", "r/a/b/DESCRIPTION", "r/a/x.py"]]
+    assert package_roots(files) == ["r", "r/a/b"]
+
+
+def test_find_package_logs(monorepo):
+    log = Log("todo_list", "todo_list.md")
+    log.add_log_item_type(Todo)
+    package_logs = find_package_logs([log], extension=".py")
+
+    assert _package_items(package_logs) == {
+        "a": [("a/model.py", ("", "a", ""))],
+        "b": [("b/model.py", ("", "b", ""))],
+        "nested": [("nested/model.py", ("", "b/nested", ""))],
+    }
+    # All items are kept for the searched logs
+    assert len(log._log_item_types[0].matched_items) == 4
+
+    changed = write_package_logs(package_logs, jobs=2)
+    assert list(changed.values()) == [True, True, True]
+    assert (
+        (monorepo / "packages" / "b" / "todo_list.md")
+        .read_text()
+        .endswith("\n- [ ] b\n")
+    )
+    assert not (monorepo / "todo_list.md").exists()
+
+
+def test_write_package_logs_stats(monorepo):
+    log = Log("todo_list", "todo_list.md")
+    log.add_log_item_type(Todo)
+    stats = ScanStats()
+    package_logs = find_package_logs([log], extension=".py", stats=stats)
+    write_package_logs(package_logs, jobs=2)
+
+    # Each log's write is added to the shared statistics
+    assert sorted(stats.write_times) == sorted(
+        str(monorepo / "packages" / package / "todo_list.md")
+        for package in ["a", "b", "b/nested"]
+    )
+    assert all(
+        package_log.stats is stats
+        for root_logs in package_logs.values()
+        for package_log in root_logs
+    )
+
+
+def test_find_package_logs_pattern(monorepo):
+    log = Log("todo_list", "todo_list.md")
+    log.add_log_item_type(Todo)
+    package_logs = find_package_logs([log], pattern="packages/*")
+    assert sorted(_package_items(package_logs)) == ["a", "b"]
+    assert len(_package_items(package_logs)["b"]) == 2
@@ -0,0 +1,38 @@
+from assumptions.log_items import LogItem
+from assumptions.log_items import Todo
+from assumptions.profiling import format_profiles
+from assumptions.profiling import profile_patterns
+
+SIZES = (2_000, 4_000, 8_000)
+
+
+class Catastrophic(LogItem):
+    search_patterns = [r"^# ?Slow: ((?:\w+\s?)+)$"]
+    keywords = ["Slow:"]
+    template_marker = "{ slow }"
+    empty_message = ""
+
+    def parse(self, idx, file_path, item):
+        return item
+
+
+def test_profile_patterns():
+    profiles = profile_patterns(
+        [Todo, Catastrophic()],
+        sizes=SIZES,
+        time_limit=0.2,
+        # The fastest of several timings, so that noise doesn't make Todo look super-linear
+        repeat=3,
+    )
+
+    todo = [profile for profile in profiles if profile["type"] == "Todo"]
+    assert todo and not any(profile["flagged"] for profile in todo)
+    assert all(profile["sizes"] == list(SIZES) for profile in todo)
+
+    (long_line,) = [
+        profile
+        for profile in profiles
+        if profile["type"] == "Catastrophic" and profile["sample"] == "long line"
+    ]
+    assert long_line["flagged"] and long_line["timed_out"]
+    assert "TIMED OUT at 2,000" in format_profiles(profiles)
@@ -0,0 +1,120 @@
+import re
+from pathlib import Path
+
+import pytest
+
+from assumptions import scanner as scanner_module
+from assumptions.log_items import Assumption
+from assumptions.log_items import Caveat
+from assumptions.log_items import Debt
+from assumptions.log_items import LogItem
+from assumptions.log_items import Todo
+from assumptions.scanner import BINARY
+from assumptions.scanner import Scanner
+from assumptions.scanner import TOO_LARGE
+
+EXAMPLES = sorted(
+    (Path(__file__).parent.parent / "docs" / "source").glob("example_*.py"),
+)
+
+TRICKY_TEXT = """\
+x = 1  # TODO: not at the start of a line
+# TODO: first
+# TODO: swallowed by the first todo
+# continued
+
+  #' @section Caveat: roxygen caveat
+  #' with detail
+  # Assumption: indented
+  # Q: RED
+  # I: GREEN
+  # detail
+# debt: lower case keyword with # in title
+z = 2
+# Caveat: no newline at end"""
+
+
+def _findall(log_item, text):
+    items = []
+    for pattern in log_item.search_patterns:
+        items += re.findall(pattern, text, re.MULTILINE | re.IGNORECASE)
+    return items
+
+
+@pytest.mark.parametrize(
+    "text",
+    [path.read_text() for path in EXAMPLES] + [TRICKY_TEXT, "", "no markers here\n"],
+)
+def test_scan_matches_findall(text):
+    log_items = [Assumption(), Caveat(), Debt(), Todo()]
+    results = Scanner(log_items).scan(text)
+    assert results == [_findall(log_item, text) for log_item in log_items]
+
+
+def test_scan_without_keywords():
+    class Pokemon(LogItem):
+        search_patterns = [r"^# ?(Pikachu|Squirtle)$"]
+        template_marker = "{ pokemon }"
+        empty_message = "No pokemon."
+
+        def parse(self, idx, file_path, item):
+            return item
+
+    results = Scanner([Pokemon(), Todo()]).scan(
+        "# Pikachu\n# TODO: catch\n# Squirtle\n",
+    )
+    assert results == [["Pikachu", "Squirtle"], [("", "catch", "# Squirtle\n")]]
+
+
+def test_overlapping_keywords():
+    class Do(Todo):
+        keywords = ["DO:"]
+
+    results = Scanner([Todo(), Do()]).scan("# TODO: both\n")
+    assert results == [[("", "both", "")], [("", "both", "")]]
+
+
+def test_scan_file(tmp_path):
+    path = tmp_path / "code.py"
+    path.write_bytes(b"# TODO: windows\r\n# line endings\r\nx = 1\r\n")
+    digest, results, lines = Scanner([Todo()]).scan_file(path)
+    assert results == [[("", "windows", "# line endings\n")]]
+    assert lines == [[[1, 2]]]
+
+
+def test_scan_file_skips(tmp_path, monkeypatch):
+    binary = tmp_path / "binary.dat"
+    binary.write_bytes(b"\x00\x01# TODO: not text\n")
+    large = tmp_path / "large.csv"
+    large.write_text("# TODO: too big\n" + "1,2,3\n" * 100)
+    unmarked = tmp_path / "unmarked.py"
+    unmarked.write_text("x = 1\n")
+
+    def fail(*args):
+        raise AssertionError("File should not be decoded")
+
+    monkeypatch.setattr(scanner_module, "decode", fail)
+    scanner = Scanner([Todo()], max_file_size=100)
+    assert scanner.scan_file(binary)[1] == BINARY
+    assert scanner.scan_file(large)[1] == TOO_LARGE
+    assert scanner.scan_file(unmarked)[1] == [[]]
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError, match="maximum file size"):
+        Scanner([Todo()], max_file_size=-5)
+    scanner = Scanner([Todo()])
+    for scan_all in (scanner.scan_files, scanner.scan_contents, scanner.scan_archives):
+        with pytest.raises(ValueError, match="number of jobs"):
+            scan_all([], jobs=-1)
+
+
+def test_byte_prefilter_case_insensitive(tmp_path):
+    path = tmp_path / "code.py"
+    # Long s matches s when ignoring case
+    path.write_text(
+        "# AſſUMPTION: a\n# Q: RED\n# I: RED\n# detail\nx = 1\n",
+        encoding="utf-8",
+    )
+    results = Scanner([Assumption()]).scan_file(path)[1]
+    assert results == [[("", "a", "RED", "RED", "# detail\n")]]
@@ -0,0 +1,170 @@
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from assumptions.sources import git_changed_files
+from assumptions.sources import git_files
+from assumptions.sources import PathFilter
+from assumptions.sources import walk_files
+
+
+@pytest.fixture
+def git_tree(tmp_path):
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    (tmp_path / ".gitignore").write_text("build/\n")
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "ignored.py").write_text("")
+    (tmp_path / "tracked.py").write_text("")
+    (tmp_path / "deleted.py").write_text("")
+    (tmp_path / "notes.txt").write_text("")
+    subprocess.run(["git", "add", "."], cwd=tmp_path, check=True)
+    (tmp_path / "deleted.py").unlink()
+    (tmp_path / "untracked.py").write_text("")
+    return tmp_path
+
+
+def test_walk_files(git_tree):
+    found = {
+        path.relative_to(git_tree).as_posix() for path in walk_files(git_tree, ".py")
+    }
+    assert found == {"build/ignored.py", "tracked.py", "untracked.py"}
+
+
+def test_git_files(git_tree):
+    found = [
+        path.relative_to(git_tree).as_posix() for path in git_files(git_tree, ".py")
+    ]
+    assert found == ["tracked.py", "untracked.py"]
+
+
+def test_git_files_outside_repo(tmp_path):
+    with pytest.raises(subprocess.CalledProcessError):
+        list(git_files(tmp_path))
+
+
+def _commit(path):
+    subprocess.run(["git", "add", "-A"], cwd=path, check=True)
+    subprocess.run(
+        [
+            "git",
+            "-c",
+            "user.name=test",
+            "-c",
+            "user.email=test@example.com",
+            "commit",
+            "-qm",
+            ".",
+        ],
+        cwd=path,
+        check=True,
+    )
+
+
+def test_git_changed_files(tmp_path):
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    (tmp_path / "src").mkdir()
+    for name in ["same.py", "modified.py", "deleted.py", "old.py"]:
+        (tmp_path / "src" / name).write_text(
+            f"# {name} with enough text to detect renames\n",
+        )
+    (tmp_path / "outside.py").write_text("")
+    _commit(tmp_path)
+
+    src = tmp_path / "src"
+    (src / "modified.py").write_text("changed\n")
+    (src / "deleted.py").unlink()
+    (src / "old.py").rename(src / "new.py")
+    _commit(tmp_path)
+    (src / "untracked.py").write_text("")
+    (tmp_path / "outside.py").write_text("changed\n")
+
+    assert git_changed_files(src, "HEAD~1") == {
+        src / "modified.py": "M",
+        src / "deleted.py": "D",
+        src / "old.py": "D",
+        src / "new.py": "R",
+        src / "untracked.py": "A",
+    }
+    with pytest.raises(subprocess.CalledProcessError):
+        git_changed_files(src, "missing")
+
+
+@pytest.fixture
+def filtered_tree(tmp_path):
+    for relative_path in [
+        "src/a.py",
+        "src/a.min.py",
+        "src/build/b.py",
+        "build/c.py",
+        "docs/d.py",
+        "docs/notes.txt",
+    ]:
+        (tmp_path / relative_path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / relative_path).write_text("")
+    return tmp_path
+
+
+def test_path_filter():
+    path_filter = PathFilter(include=["src/*", "*.txt"], exclude=["build", "*.min.py"])
+    assert path_filter.matches("src/a.py")
+    assert path_filter.matches("docs/notes.txt")
+    assert not path_filter.matches("docs/d.py")
+    assert not path_filter.matches("src/a.min.py")
+    assert not path_filter.matches("src/build/b.py")
+    assert path_filter.excludes("src/build", "build")
+
+
+def test_walk_files_filtered(filtered_tree, monkeypatch):
+    scanned = []
+    scandir = os.scandir
+
+    def recording_scandir(path):
+        scanned.append(Path(path).relative_to(filtered_tree).as_posix())
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", recording_scandir)
+    path_filter = PathFilter(exclude=["build", "*.min.py"])
+    found = {
+        path.relative_to(filtered_tree).as_posix()
+        for path in walk_files(filtered_tree, ".py", path_filter=path_filter)
+    }
+    assert found == {"src/a.py", "docs/d.py"}
+    # Excluded directories aren't listed
+    assert sorted(scanned) == [".", "docs", "src"]
+
+    paths = [filtered_tree / "src" / "a.py", filtered_tree / "src" / "build" / "b.py"]
+    assert (
+        list(walk_files(filtered_tree, paths=paths, path_filter=path_filter))
+        == paths[:1]
+    )
+
+
+def test_walk_files_skips_symlinked_dirs(tmp_path, monkeypatch):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.py").write_text("")
+    (tmp_path / "src" / "loop").symlink_to(tmp_path, target_is_directory=True)
+    (tmp_path / "src" / "link.py").symlink_to(tmp_path / "src" / "a.py")
+    (tmp_path / "unreadable").mkdir()
+    scandir = os.scandir
+
+    def failing_scandir(path):
+        if Path(path).name == "unreadable":
+            raise PermissionError(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", failing_scandir)
+    found = {
+        path.relative_to(tmp_path).as_posix() for path in walk_files(tmp_path, ".py")
+    }
+    assert found == {"src/a.py", "src/link.py"}
+
+
+def test_git_files_filtered(git_tree):
+    path_filter = PathFilter(include=["*.py"], exclude=["untracked.py"])
+    found = [
+        path.relative_to(git_tree).as_posix()
+        for path in git_files(git_tree, path_filter=path_filter)
+    ]
+    assert found == ["tracked.py"]
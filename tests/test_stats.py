@@ -0,0 +1,52 @@
+import pytest
+
+from assumptions.log import Log
+from assumptions.log_items import Todo
+from assumptions.stats import ScanStats
+
+
+@pytest.fixture
+def todo_tree(tmp_path, monkeypatch):
+    (tmp_path / "todo.py").write_text("# TODO: todo\nx = 1\n")
+    (tmp_path / "empty.py").write_text("x = 1\n")
+    (tmp_path / "binary.dat").write_bytes(b"\0\1\2")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_find_items_stats(todo_tree, jobs):
+    log = Log("todo_list", "todo_list.md")
+    log.add_log_item_type(Todo)
+    stats = ScanStats()
+    log.find_items(jobs=jobs, stats=stats)
+    log.write_log()
+
+    assert log.stats is stats
+    assert stats.files_visited == 3
+    assert stats.files_read == 3
+    assert stats.files_skipped == {"binary": 1}
+    assert stats.files_matched == 1
+    assert stats.bytes_read == 28
+    assert set(stats.match_times) == {"Todo"}
+    assert set(stats.pattern_times) == {("Todo", 0)}
+    assert set(stats.parse_times) == {"Todo"}
+    assert set(stats.write_times) == {"todo_list.md"}
+    assert {path for path, _ in stats.slowest_files(2)} <= {
+        str(todo_tree / name) for name in ["todo.py", "empty.py", "binary.dat"]
+    }
+    assert "3 visited" in stats.report()
+
+
+def test_merge():
+    stats = ScanStats()
+    other = ScanStats()
+    other.add_file("a.py", 0.5, "binary")
+    other.match_times["Todo"] += 0.25
+    stats.merge(other)
+    stats.merge(other)
+
+    assert stats.files_read == 2
+    assert stats.files_skipped == {"binary": 2}
+    assert stats.file_times == {"a.py": 1.0}
+    assert stats.read_time == 0.5
@@ -0,0 +1,153 @@
+import subprocess
+
+import pytest
+
+from assumptions.log import Log
+from assumptions.log_items import Todo
+from assumptions.watch import _load_inotify
+from assumptions.watch import InotifyWatcher
+from assumptions.watch import LogWatcher
+from assumptions.watch import PollingWatcher
+
+
+@pytest.fixture
+def todo_watcher(tmp_path, monkeypatch):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.py").write_text("# TODO: a\n")
+    (tmp_path / "src" / "b.py").write_text("x = 1\n")
+    monkeypatch.chdir(tmp_path)
+
+    log = Log("todo_list", "todo_list.md")
+    log.add_log_item_type(Todo)
+    watcher = LogWatcher([log], "src")
+    watcher.refresh()
+    return watcher
+
+
+def _titles(watcher):
+    return {
+        relative_path: [item[1] for item in items[0]]
+        for relative_path, (items, _) in watcher._items.items()
+    }
+
+
+def test_update_changed_files(todo_watcher, tmp_path):
+    src = tmp_path / "src"
+    assert _titles(todo_watcher) == {"src/a.py": ["a"]}
+
+    (src / "b.py").write_text("# TODO: b\n")
+    assert todo_watcher.update({src / "b.py"})
+    assert _titles(todo_watcher) == {"src/a.py": ["a"], "src/b.py": ["b"]}
+
+    (src / "b.py").write_text("# TODO: b\nx = 1\n")
+    assert not todo_watcher.update({src / "b.py"})
+
+    (src / "a.py").unlink()
+    assert todo_watcher.update({src / "a.py"})
+    assert _titles(todo_watcher) == {"src/b.py": ["b"]}
+
+
+def test_update_moved_directory(todo_watcher, tmp_path):
+    src = tmp_path / "src"
+    (src / "package").mkdir()
+    (src / "package" / "c.py").write_text("# TODO: c\n")
+    assert todo_watcher.update({src / "package"})
+    assert "src/package/c.py" in _titles(todo_watcher)
+
+    (src / "package").rename(tmp_path / "moved")
+    assert todo_watcher.update({src / "package"})
+    assert _titles(todo_watcher) == {"src/a.py": ["a"]}
+
+
+def test_write_logs(todo_watcher, tmp_path):
+    todo_watcher.write_logs()
+    (tmp_path / "src" / "b.py").write_text("# TODO: b\n")
+    todo_watcher.update({tmp_path / "src" / "b.py"})
+    todo_watcher.write_logs()
+
+    log = (tmp_path / "todo_list.md").read_text()
+    assert log.endswith("\n- [ ] a\n- [ ] b\n")
+
+
+def test_polling_watcher(tmp_path):
+    path = tmp_path / "a.py"
+    path.write_text("")
+    watcher = PollingWatcher(lambda: list(tmp_path.iterdir()), interval=0.01)
+    assert watcher.changes(0.05) == set()
+
+    path.write_text("changed")
+    (tmp_path / "b.py").write_text("")
+    assert watcher.changes(1) == {path, tmp_path / "b.py"}
+
+
+@pytest.mark.skipif(_load_inotify() is None, reason="inotify is not available")
+def test_inotify_watcher(tmp_path):
+    watcher = InotifyWatcher(tmp_path)
+    try:
+        assert watcher.changes(0.05) == set()
+        (tmp_path / "package").mkdir()
+        assert watcher.changes(1) == {tmp_path / "package"}
+        # New directories are watched too
+        (tmp_path / "package" / "a.py").write_text("")
+        assert tmp_path / "package" / "a.py" in watcher.changes(1)
+    finally:
+        watcher.close()
+
+
+@pytest.mark.skipif(_load_inotify() is None, reason="inotify is not available")
+def test_inotify_watcher_skips_directories(tmp_path):
+    for directory in ["src/build/lib", "src/package", "build"]:
+        (tmp_path / directory).mkdir(parents=True)
+    levels = []
+
+    def skip_directories(directories):
+        levels.append(
+            sorted(path.relative_to(tmp_path).as_posix() for path in directories),
+        )
+        return {path for path in directories if path.name == "build"}
+
+    watcher = InotifyWatcher(tmp_path, skip_directories)
+    try:
+        assert sorted(
+            path.relative_to(tmp_path).as_posix()
+            for path in watcher._directories.values()
+        ) == [".", "src", "src/package"]
+        # Each level is checked together, and skipped directories aren't walked
+        assert levels == [["build", "src"], ["src/build", "src/package"]]
+
+        (tmp_path / "src" / "package" / "build").mkdir()
+        assert watcher.changes(1) == {tmp_path / "src" / "package" / "build"}
+        assert len(watcher._directories) == 3
+    finally:
+        watcher.close()
+
+
+def test_skipped_directories(tmp_path, monkeypatch):
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    (tmp_path / ".gitignore").write_text("venv/\n")
+    for directory in ["venv", "vendor", "src"]:
+        (tmp_path / directory).mkdir()
+    monkeypatch.chdir(tmp_path)
+
+    log = Log("todo_list", "todo_list.md")
+    log.add_log_item_type(Todo)
+    directories = [tmp_path / name for name in [".git", "venv", "vendor", "src"]]
+    watcher = LogWatcher([log], source="git", exclude=["vendor"])
+    assert watcher._skipped_directories(directories) == set(directories[:3])
+    watcher = LogWatcher([log], exclude=["vendor"])
+    assert watcher._skipped_directories(directories) == {tmp_path / "vendor"}
+
+
+def test_update_ignores_log_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    log = Log("todo_list", "todo_list.md")
+    log.add_log_item_type(Todo)
+    watcher = LogWatcher([log])
+    watcher.refresh()
+    watcher.write_logs()
+
+    # Writing the logs doesn't cause another update
+    monkeypatch.setattr(watcher, "_list_files", None)
+    assert not watcher.update({tmp_path / "todo_list.md"})
+    assert not watcher.update({tmp_path / "todo_list.md.tmp"})
+    assert not watcher.update({tmp_path / "todo_list.md.digest"})